@@ -0,0 +1,344 @@
+"""
+asyncio versions of the SQLAlchemy storages, with the same methods as
+TaskStorageSqlAlchemy, UserStorageSqlAlchemy and SessionStorageSqlAlchemy
+but awaitable. They use the asyncpg driver through get_async_engine().
+Task changes update the per-user counters (Storage/task_counters.py) in the
+same transaction, through session.run_sync().
+"""
+
+import asyncio
+import datetime
+import time
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import case, delete, func, insert, select, text, update
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from config_reader import get_settings
+from entity.session import UserSession
+from entity.task import Task
+from entity.user import User
+from password_hasher import get_password_hasher
+from Storage.engine import get_async_engine
+from Storage.session_storage_sql_alchemy import expires_before, seconds_left
+from Storage.task_counters import change_counter, read_counter
+from Storage.task_storage_sql_alchemy import search_statement
+from Storage.ttl_cache import MISSING, TTLCache
+
+
+class AsyncTaskStorageSqlAlchemy:
+    def __init__(self, engine: Optional[AsyncEngine] = None):
+        self.engine = engine or get_async_engine()
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    async def read_all(self, user_id: int) -> List[Task]:
+        async with self.sessionmaker() as session:
+            stmt = select(Task).where(Task.user_id == user_id).order_by(Task.id)
+            return (await session.scalars(stmt)).all()
+
+    async def iter_all(
+        self, user_id: int, batch_size: int = 500
+    ) -> AsyncIterator[Task]:
+        async with self.sessionmaker() as session:
+            stmt = (
+                select(Task)
+                .where(Task.user_id == user_id)
+                .order_by(Task.id)
+                .execution_options(yield_per=batch_size)
+            )
+            async for task in await session.stream_scalars(stmt):
+                yield task
+
+    async def read_page(
+        self, user_id: int, after_id: Optional[int], limit: int
+    ) -> List[Task]:
+        async with self.sessionmaker() as session:
+            stmt = select(Task).where(Task.user_id == user_id)
+            if after_id is not None:
+                stmt = stmt.where(Task.id > after_id)
+            stmt = stmt.order_by(Task.id).limit(limit)
+            return (await session.scalars(stmt)).all()
+
+    async def read_version(self, user_id: int) -> str:
+        async with self.sessionmaker() as session:
+            counter = await session.run_sync(read_counter, user_id)
+            return f"{counter.task_count}:{counter.version}"
+
+    async def count_tasks(self, user_id: int) -> int:
+        async with self.sessionmaker() as session:
+            return (await session.run_sync(read_counter, user_id)).task_count
+
+    async def search(
+        self, user_id: int, query: str, offset: int, limit: int
+    ) -> List[Task]:
+        async with self.sessionmaker() as session:
+            stmt = search_statement(self.engine.dialect, user_id, query)
+            return (await session.scalars(stmt.offset(offset).limit(limit))).all()
+
+    async def read_by_id(self, task_id: int, user_id: int) -> Optional[Task]:
+        async with self.sessionmaker() as session:
+            stmt = (
+                select(Task)
+                .where(Task.user_id == user_id)
+                .where(Task.id == task_id)
+            )
+            return (await session.execute(stmt)).scalar_one_or_none()
+
+    async def create(self, task: Task) -> int:
+        async with self.sessionmaker() as session:
+            session.add(task)
+            await session.flush()
+            await session.run_sync(change_counter, task.user_id, +1)
+            await session.commit()
+            return task.id
+
+    async def update(self, task: Task) -> None:
+        async with self.sessionmaker() as session:
+            await session.merge(task)
+            await session.flush()
+            await session.run_sync(change_counter, task.user_id, 0)
+            await session.commit()
+
+    async def delete(self, task: Task) -> None:
+        async with self.sessionmaker() as session:
+            await session.delete(await session.merge(task))
+            await session.flush()
+            await session.run_sync(change_counter, task.user_id, -1)
+            await session.commit()
+
+    async def update_name(self, task_id: int, user_id: int, name: str) -> bool:
+        async with self.sessionmaker() as session:
+            stmt = (
+                update(Task)
+                .where(Task.user_id == user_id)
+                .where(Task.id == task_id)
+                .values(name=name)
+                .returning(Task.id)
+                .execution_options(synchronize_session=False)
+            )
+            if await session.scalar(stmt) is None:
+                return False
+            await session.run_sync(change_counter, user_id, 0)
+            await session.commit()
+            return True
+
+    async def delete_by_id(self, task_id: int, user_id: int) -> bool:
+        async with self.sessionmaker() as session:
+            stmt = (
+                delete(Task)
+                .where(Task.user_id == user_id)
+                .where(Task.id == task_id)
+                .returning(Task.id)
+                .execution_options(synchronize_session=False)
+            )
+            if await session.scalar(stmt) is None:
+                return False
+            await session.run_sync(change_counter, user_id, -1)
+            await session.commit()
+            return True
+
+    async def apply_batch(
+        self,
+        user_id: int,
+        names_to_create: List[str],
+        names_to_update: Dict[int, str],
+        ids_to_delete: List[int],
+    ) -> Tuple[List[int], Set[int], Set[int]]:
+        created_ids: List[int] = []
+        updated_ids: Set[int] = set()
+        deleted_ids: Set[int] = set()
+
+        async with self.sessionmaker() as session:
+            if names_to_create:
+                created_ids = list(
+                    await session.scalars(
+                        insert(Task).returning(Task.id, sort_by_parameter_order=True),
+                        [{"name": name, "user_id": user_id} for name in names_to_create],
+                    )
+                )
+            if names_to_update:
+                stmt = (
+                    update(Task)
+                    .where(Task.user_id == user_id)
+                    .where(Task.id.in_(names_to_update.keys()))
+                    .values(name=case(names_to_update, value=Task.id))
+                    .returning(Task.id)
+                    .execution_options(synchronize_session=False)
+                )
+                updated_ids = set(await session.scalars(stmt))
+            if ids_to_delete:
+                stmt = (
+                    delete(Task)
+                    .where(Task.user_id == user_id)
+                    .where(Task.id.in_(ids_to_delete))
+                    .returning(Task.id)
+                    .execution_options(synchronize_session=False)
+                )
+                deleted_ids = set(await session.scalars(stmt))
+            if created_ids or updated_ids or deleted_ids:
+                await session.run_sync(
+                    change_counter, user_id, len(created_ids) - len(deleted_ids)
+                )
+            await session.commit()
+
+        return created_ids, updated_ids, deleted_ids
+
+
+class AsyncUserStorageSqlAlchemy:
+    def __init__(self, engine: Optional[AsyncEngine] = None):
+        self.engine = engine or get_async_engine()
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    async def create_user(self, login: str, hashed_password: str) -> None:
+        async with self.sessionmaker() as session:
+            session.add(User(login=login, db_hashed_password=hashed_password))
+            await session.commit()
+
+    async def update_password(self, user_id: int, hashed_password: str) -> None:
+        async with self.sessionmaker() as session:
+            stmt = (
+                update(User)
+                .where(User.id == user_id)
+                .values(db_hashed_password=hashed_password)
+            )
+            await session.execute(stmt)
+            await session.commit()
+
+    async def find_or_verify_user(
+        self, username: str, password: Optional[str]
+    ) -> Optional[User]:
+        async with self.sessionmaker() as session:
+            stmt = select(User).where(User.login == username)
+            user = (await session.execute(stmt)).scalar_one_or_none()
+        if user is None or password is None:
+            return user
+        # hashing is CPU-bound, keep it off the event loop
+        password_hasher = get_password_hasher()
+        if not await asyncio.to_thread(
+            password_hasher.verify, user.db_hashed_password, password
+        ):
+            return None
+
+        if password_hasher.needs_rehash(user.db_hashed_password):
+            user.db_hashed_password = await asyncio.to_thread(
+                password_hasher.hash, password
+            )
+            await self.update_password(user.id, user.db_hashed_password)
+        return user
+
+
+class AsyncSessionStorageSqlAlchemy:
+    def __init__(self, engine: Optional[AsyncEngine] = None):
+        self.engine = engine or get_async_engine()
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+        env_config = get_settings()
+        self.ttl = datetime.timedelta(seconds=env_config.session_ttl)
+        self.renew_interval = env_config.session_renew_interval
+        self.cache: Optional[TTLCache] = None
+        if env_config.session_cache_enabled:
+            self.cache = TTLCache(
+                maxsize=env_config.session_cache_size,
+                ttl=env_config.session_cache_ttl,
+                negative_ttl=env_config.session_cache_negative_ttl,
+            )
+
+    async def create_session(self, session_uuid: str, user_id: int) -> str:
+        async with self.sessionmaker() as session:
+            session.add(UserSession(session_uuid=session_uuid, user_id=user_id))
+            await session.commit()
+        if self.cache is not None:
+            self.cache.invalidate(session_uuid)
+        return session_uuid
+
+    async def find_session(self, session_uuid: Optional[str]) -> Optional[UserSession]:
+        if not session_uuid:
+            return None
+
+        if self.cache is not None:
+            cached = self.cache.get(session_uuid)
+            if cached is not MISSING:
+                return cached
+
+        dialect = self.engine.dialect
+        async with self.sessionmaker() as session:
+            stmt = (
+                select(UserSession, seconds_left(dialect, self.ttl))
+                .where(UserSession.session_uuid == session_uuid)
+                .where(UserSession.created_at > expires_before(dialect, self.ttl))
+            )
+            row = (await session.execute(stmt)).one_or_none()
+
+        if row is None:
+            if self.cache is not None:
+                self.cache.set(session_uuid, None)
+            return None
+
+        result, time_left = row
+        result.renew_at = time.monotonic() + self._renew_in(float(time_left))
+        if self.cache is not None:
+            self.cache.set(
+                session_uuid, result, ttl=min(self.cache.ttl, float(time_left))
+            )
+        return result
+
+    def _renew_in(self, time_left: float) -> float:
+        return time_left - self.ttl.total_seconds() + self.renew_interval
+
+    async def renew_session(self, user_session: UserSession, cookie_value: str) -> str:
+        renew_at = getattr(user_session, "renew_at", None)
+        if renew_at is None or time.monotonic() < renew_at:
+            return cookie_value
+
+        async with self.sessionmaker() as session:
+            stmt = (
+                update(UserSession)
+                .where(UserSession.session_uuid == user_session.session_uuid)
+                .values(created_at=func.now())
+                .execution_options(synchronize_session=False)
+            )
+            await session.execute(stmt)
+            await session.commit()
+        user_session.renew_at = time.monotonic() + self._renew_in(
+            self.ttl.total_seconds()
+        )
+        return cookie_value
+
+    async def delete_session(self, session_uuid: str) -> None:
+        async with self.sessionmaker() as session:
+            stmt = delete(UserSession).where(UserSession.session_uuid == session_uuid)
+            await session.execute(stmt)
+            await session.commit()
+        if self.cache is not None:
+            self.cache.invalidate(session_uuid)
+
+    async def delete_expired(self, limit: int) -> int:
+        expired = UserSession.created_at < expires_before(self.engine.dialect, self.ttl)
+        async with self.sessionmaker() as session:
+            expired_ids = (
+                select(UserSession.id)
+                .where(expired)
+                .order_by(UserSession.created_at)
+                .limit(limit)
+            )
+            stmt = (
+                delete(UserSession)
+                .where(UserSession.id.in_(expired_ids.scalar_subquery()))
+                .returning(UserSession.session_uuid)
+                .execution_options(synchronize_session=False)
+            )
+            deleted_uuids = (await session.scalars(stmt)).all()
+            await session.commit()
+        if self.cache is not None:
+            for session_uuid in deleted_uuids:
+                self.cache.invalidate(session_uuid)
+        return len(deleted_uuids)
+
+    async def count_sessions(self) -> int:
+        async with self.sessionmaker() as session:
+            if self.engine.dialect.name == "postgresql":
+                estimate = await session.scalar(
+                    text("SELECT reltuples FROM pg_class WHERE oid = 'sessions'::regclass")
+                )
+                if estimate is not None and estimate >= 0:
+                    return int(estimate)
+            return await session.scalar(select(func.count()).select_from(UserSession))
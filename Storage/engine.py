@@ -0,0 +1,336 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from sqlalchemy import URL, Engine, create_engine, event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import QueuePool
+
+from config_reader import get_settings
+
+
+class PoolStats:
+    """
+    Counters for connection checkouts from one pool.
+    wait time = how long a thread waited for a free (or newly opened) connection
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            if seconds > self.wait_seconds_max:
+                self.wait_seconds_max = seconds
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that measures how long each checkout waits for a connection."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            entry = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record_timeout()
+            raise
+        self.stats.record_wait(time.perf_counter() - started)
+        return entry
+
+    def recreate(self) -> "TimedQueuePool":
+        pool = super().recreate()
+        pool.stats = self.stats  # keep counters after engine.dispose()
+        return pool
+
+
+_engines: Dict[str, Engine] = {}
+_engines_lock = threading.Lock()
+EngineListener = Callable[[Engine], None]
+# key -> (listener, detach)
+_engine_listeners: Dict[str, Tuple[EngineListener, Optional[EngineListener]]] = {}
+
+
+def get_engine(url: Optional[URL] = None) -> Engine:
+    """
+    Return the process-wide engine for `url` (the main database by default).
+    Every storage shares it, so there is one connection pool per database.
+    """
+    if url is None:
+        url = get_settings().database_url
+    key = url.render_as_string(hide_password=False)
+
+    engine = _engines.get(key)
+    if engine is not None:
+        return engine
+
+    created = False
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _create_engine(url)
+            _engines[key] = engine
+            created = True
+    if created:
+        for listener, _ in list(_engine_listeners.values()):
+            listener(engine)
+    return engine
+
+
+def on_engine_created(
+    key: str, listener: EngineListener, detach: Optional[EngineListener] = None
+) -> None:
+    """
+    Call `listener(engine)` for every engine get_engine() has created and will
+    create: engines are created on first use, so instrumentation can't be
+    attached to them when the app is built.
+    One listener per `key`: registering the key again (create_app() called
+    twice) replaces the earlier listener, whose `detach(engine)` is called
+    for every engine first.
+    """
+    with _engines_lock:
+        previous = _engine_listeners.get(key)
+        _engine_listeners[key] = (listener, detach)
+        engines = list(_engines.values())
+    if previous is not None and previous[1] is not None:
+        for engine in engines:
+            previous[1](engine)
+    for engine in engines:
+        listener(engine)
+
+
+class StorageEngine:
+    """
+    The `engine` attribute of the SQL storages: get_engine() on first use,
+    so building the app opens no pool (a prefork server forks after that).
+    Tests assign their own engine.
+    """
+
+    def __get__(self, storage, owner=None):
+        if storage is None:
+            return self
+        engine = storage.__dict__.get("engine")
+        if engine is None:
+            engine = storage.__dict__["engine"] = get_engine()
+        return engine
+
+    def __set__(self, storage, engine: Engine) -> None:
+        storage.__dict__["engine"] = engine
+
+
+def _create_engine(url: URL) -> Engine:
+    if url.get_backend_name() == "sqlite":
+        return _create_sqlite_engine(url)
+
+    env_config = get_settings()
+    engine = create_engine(
+        url,
+        echo=env_config.db_echo,
+        poolclass=TimedQueuePool,
+        pool_size=env_config.db_pool_size,
+        max_overflow=env_config.db_max_overflow,
+        pool_timeout=env_config.db_pool_timeout,
+        pool_pre_ping=env_config.db_pool_pre_ping,
+        pool_recycle=env_config.db_pool_recycle,
+    )
+
+    statement_timeout_ms = env_config.db_statement_timeout_ms
+    if statement_timeout_ms > 0 and engine.dialect.name == "postgresql":
+
+        @event.listens_for(engine, "connect")
+        def set_statement_timeout(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"SET statement_timeout = {int(statement_timeout_ms)}")
+            cursor.close()
+            dbapi_connection.commit()
+
+    return engine
+
+
+def _unicode_lower(value):
+    return value.lower() if isinstance(value, str) else value
+
+
+_sqlite_writer_locks: Dict[Engine, threading.RLock] = {}
+_writing = threading.local()
+
+
+def _create_sqlite_engine(url: URL) -> Engine:
+    """
+    SQLite for single-node deployments: WAL journal so readers never wait for
+    the writer, synchronous=NORMAL (safe with WAL, fsync only at checkpoints)
+    and a bigger page cache. Every request thread checks a connection out of
+    the pool for itself; writes go one at a time through write_transaction().
+    """
+    env_config = get_settings()
+    engine = create_engine(
+        url,
+        echo=env_config.db_echo,
+        poolclass=TimedQueuePool,
+        pool_size=env_config.db_pool_size,
+        max_overflow=env_config.db_max_overflow,
+        pool_timeout=env_config.db_pool_timeout,
+        connect_args={
+            "check_same_thread": False,
+            "timeout": env_config.sqlite_busy_timeout_ms / 1000,
+        },
+    )
+
+    @event.listens_for(engine, "connect")
+    def configure_connection(dbapi_connection, connection_record):
+        # transactions are started in begin_transaction() below
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode = WAL")
+        cursor.execute("PRAGMA synchronous = NORMAL")
+        cursor.execute(f"PRAGMA cache_size = -{int(env_config.sqlite_cache_size_kib)}")
+        cursor.execute(f"PRAGMA busy_timeout = {int(env_config.sqlite_busy_timeout_ms)}")
+        cursor.execute("PRAGMA temp_store = MEMORY")
+        cursor.execute("PRAGMA foreign_keys = ON")
+        cursor.close()
+        # the built-in lower() only knows ASCII, search needs it for any letters
+        dbapi_connection.create_function(
+            "lower", 1, _unicode_lower, deterministic=True
+        )
+
+    @event.listens_for(engine, "begin")
+    def begin_transaction(connection):
+        # a writer takes the database write lock up front, instead of failing
+        # with "database is locked" when upgrading from a read transaction
+        if getattr(_writing, "depth", 0):
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+        else:
+            connection.exec_driver_sql("BEGIN")
+
+    _sqlite_writer_locks[engine] = threading.RLock()
+    return engine
+
+
+@contextmanager
+def write_transaction(engine: Engine) -> Iterator[None]:
+    """
+    Wrap storage methods that write. On SQLite the threads of this process
+    queue here, so there is only one writer at a time (other processes are
+    waited for with busy_timeout). For other databases it does nothing.
+    """
+    lock = _sqlite_writer_locks.get(engine)
+    if lock is None:
+        yield
+        return
+    with lock:
+        _writing.depth = getattr(_writing, "depth", 0) + 1
+        try:
+            yield
+        finally:
+            _writing.depth -= 1
+
+
+_async_engines: Dict[str, AsyncEngine] = {}
+
+
+def get_async_engine(url: Optional[URL] = None) -> AsyncEngine:
+    """
+    Same as get_engine() for the asyncio storages (Storage/async_storage_sql_alchemy.py).
+    Must be used from one event loop only: asyncpg connections are bound to it.
+    """
+    env_config = get_settings()
+    if url is None:
+        url = env_config.async_database_url
+    key = url.render_as_string(hide_password=False)
+
+    with _engines_lock:
+        engine = _async_engines.get(key)
+        if engine is None:
+            connect_args = {}
+            statement_timeout_ms = env_config.db_statement_timeout_ms
+            if statement_timeout_ms > 0 and url.get_backend_name() == "postgresql":
+                connect_args["server_settings"] = {
+                    "statement_timeout": str(statement_timeout_ms)
+                }
+            pool_args = {}
+            if url.get_backend_name() != "sqlite":  # aiosqlite has no pool to size
+                pool_args = dict(
+                    pool_size=env_config.db_pool_size,
+                    max_overflow=env_config.db_max_overflow,
+                    pool_timeout=env_config.db_pool_timeout,
+                    pool_pre_ping=env_config.db_pool_pre_ping,
+                    pool_recycle=env_config.db_pool_recycle,
+                )
+            engine = create_async_engine(
+                url, echo=env_config.db_echo, connect_args=connect_args, **pool_args
+            )
+            if url.get_backend_name() == "sqlite":
+                event.listen(engine.sync_engine, "connect", _configure_aiosqlite)
+            _async_engines[key] = engine
+    return engine
+
+
+def _configure_aiosqlite(dbapi_connection, connection_record) -> None:
+    # the same functions and constraints as _create_sqlite_engine() connections
+    dbapi_connection.create_function("lower", 1, _unicode_lower, deterministic=True)
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys = ON")
+    cursor.close()
+
+
+def pool_stats() -> Dict[str, dict]:
+    """Snapshot of every pool: size, active (checked out) connections, waits."""
+    result = {}
+    for engine in list(_engines.values()):
+        pool = engine.pool
+        stats = getattr(pool, "stats", None)
+        snapshot = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+        }
+        if stats is not None:
+            snapshot.update(
+                checkouts=stats.checkouts,
+                timeouts=stats.timeouts,
+                wait_seconds_total=stats.wait_seconds_total,
+                wait_seconds_max=stats.wait_seconds_max,
+            )
+        result[engine.url.render_as_string(hide_password=True)] = snapshot
+    return result
+
+
+def dispose_engines() -> None:
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+
+
+def _reset_after_fork() -> None:
+    """
+    In a forked child (a prefork server's worker): forget the connections
+    inherited from the parent without closing them, the parent still uses
+    them. The child opens its own on first use.
+    """
+    global _engines_lock
+    _engines_lock = threading.Lock()  # may have been held by a parent thread
+    for engine in _engines.values():
+        engine.dispose(close=False)
+        if engine in _sqlite_writer_locks:
+            _sqlite_writer_locks[engine] = threading.RLock()
+    for async_engine in _async_engines.values():
+        async_engine.sync_engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,264 @@
+"""
+Storages that keep everything in process memory. Data is lost on restart and
+not shared between processes, so they are meant for development, tests and
+benchmarks (a lower bound for the SQL backend), not for production.
+Select them with STORAGE_BACKEND=memory.
+"""
+
+import bisect
+import datetime
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from entity.session import UserSession
+from entity.task import Task
+from entity.user import User
+from password_hasher import get_password_hasher
+
+
+def _copy_task(task: Task) -> Task:
+    # callers get detached copies, like rows loaded from a database
+    return Task(
+        id=task.id,
+        name=task.name,
+        user_id=task.user_id,
+        created_at=task.created_at,
+        updated_at=task.updated_at,
+    )
+
+
+class TaskStorageMemory:
+    """Tasks indexed per user: id -> task, plus the user's task ids in order."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self._tasks: Dict[int, Dict[int, Task]] = {}  # user_id -> {task_id: task}
+        self._ordered_ids: Dict[int, List[int]] = {}  # user_id -> sorted task ids
+        self._versions: Dict[int, int] = {}  # user_id -> changes counter
+
+    def _changed(self, user_id: int) -> None:
+        self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def read_all(self, user_id: int) -> List[Task]:
+        with self._lock:
+            tasks = self._tasks.get(user_id, {})
+            return [_copy_task(tasks[i]) for i in self._ordered_ids.get(user_id, [])]
+
+    def iter_all(self, user_id: int, batch_size: int = 500) -> Iterator[Task]:
+        after_id = None
+        while True:
+            page = self.read_page(user_id, after_id, batch_size)
+            yield from page
+            if len(page) < batch_size:
+                return
+            after_id = page[-1].id
+
+    def read_page(
+        self, user_id: int, after_id: Optional[int], limit: int
+    ) -> List[Task]:
+        with self._lock:
+            ordered_ids = self._ordered_ids.get(user_id, [])
+            start = 0 if after_id is None else bisect.bisect_right(ordered_ids, after_id)
+            tasks = self._tasks.get(user_id, {})
+            return [_copy_task(tasks[i]) for i in ordered_ids[start : start + limit]]
+
+    def read_version(self, user_id: int) -> str:
+        with self._lock:
+            return str(self._versions.get(user_id, 0))
+
+    def search(
+        self, user_id: int, query: str, offset: int, limit: int
+    ) -> List[Task]:
+        """Case-insensitive substring match, newest first."""
+        query = query.casefold()
+        with self._lock:
+            tasks = self._tasks.get(user_id, {})
+            matches = [
+                tasks[i]
+                for i in reversed(self._ordered_ids.get(user_id, []))
+                if query in tasks[i].name.casefold()
+            ]
+            return [_copy_task(task) for task in matches[offset : offset + limit]]
+
+    def count_tasks(self, user_id: int) -> int:
+        return len(self._tasks.get(user_id, {}))
+
+    def read_by_id(self, task_id: int, user_id: int) -> Optional[Task]:
+        with self._lock:
+            task = self._tasks.get(user_id, {}).get(task_id)
+            return _copy_task(task) if task is not None else None
+
+    def _insert(self, name: str, user_id: int) -> int:
+        now = datetime.datetime.now()
+        task_id = next(self._ids)
+        self._tasks.setdefault(user_id, {})[task_id] = Task(
+            id=task_id, name=name, user_id=user_id, created_at=now, updated_at=now
+        )
+        self._ordered_ids.setdefault(user_id, []).append(task_id)  # ids only grow
+        self._changed(user_id)
+        return task_id
+
+    def _rename(self, task_id: int, user_id: int, name: str) -> bool:
+        task = self._tasks.get(user_id, {}).get(task_id)
+        if task is None:
+            return False
+        task.name = name
+        task.updated_at = datetime.datetime.now()
+        self._changed(user_id)
+        return True
+
+    def _remove(self, task_id: int, user_id: int) -> bool:
+        if self._tasks.get(user_id, {}).pop(task_id, None) is None:
+            return False
+        ordered_ids = self._ordered_ids[user_id]
+        del ordered_ids[bisect.bisect_left(ordered_ids, task_id)]
+        self._changed(user_id)
+        return True
+
+    def create(self, task: Task) -> int:
+        with self._lock:
+            task.id = self._insert(task.name, task.user_id)
+            return task.id
+
+    def update(self, task: Task) -> None:
+        with self._lock:
+            self._rename(task.id, task.user_id, task.name)
+
+    def delete(self, task: Task) -> None:
+        with self._lock:
+            self._remove(task.id, task.user_id)
+
+    def update_name(self, task_id: int, user_id: int, name: str) -> bool:
+        with self._lock:
+            return self._rename(task_id, user_id, name)
+
+    def delete_by_id(self, task_id: int, user_id: int) -> bool:
+        with self._lock:
+            return self._remove(task_id, user_id)
+
+    def apply_batch(
+        self,
+        user_id: int,
+        names_to_create: List[str],
+        names_to_update: Dict[int, str],
+        ids_to_delete: List[int],
+    ) -> Tuple[List[int], Set[int], Set[int]]:
+        with self._lock:
+            created_ids = [self._insert(name, user_id) for name in names_to_create]
+            updated_ids = {
+                task_id
+                for task_id, name in names_to_update.items()
+                if self._rename(task_id, user_id, name)
+            }
+            deleted_ids = {
+                task_id for task_id in ids_to_delete if self._remove(task_id, user_id)
+            }
+            return created_ids, updated_ids, deleted_ids
+
+
+class UserStorageMemory:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._users: Dict[str, User] = {}  # login -> user
+        self._users_by_id: Dict[int, User] = {}
+
+    def create_user(self, login: str, hashed_password: str) -> None:
+        with self._lock:
+            user = User(
+                id=next(self._ids), login=login, db_hashed_password=hashed_password
+            )
+            self._users[login] = user
+            self._users_by_id[user.id] = user
+
+    def update_password(self, user_id: int, hashed_password: str) -> None:
+        with self._lock:
+            user = self._users_by_id.get(user_id)
+            if user is not None:
+                user.db_hashed_password = hashed_password
+
+    def find_or_verify_user(
+        self, username: str, password: Optional[str]
+    ) -> Optional[User]:
+        with self._lock:
+            user = self._users.get(username)
+            if user is None:
+                return None
+            user = User(
+                id=user.id, login=user.login, db_hashed_password=user.db_hashed_password
+            )
+        if password is None:
+            return user
+
+        password_hasher = get_password_hasher()
+        if not password_hasher.verify(user.db_hashed_password, password):
+            return None
+        if password_hasher.needs_rehash(user.db_hashed_password):
+            user.db_hashed_password = password_hasher.hash(password)
+            self.update_password(user.id, user.db_hashed_password)
+        return user
+
+
+class SessionStorageMemory:
+    """Sessions hashed by session_uuid, kept in creation order for expiry."""
+
+    def __init__(self, ttl: int, renew_interval: int = 300):
+        self.ttl = datetime.timedelta(seconds=ttl)
+        self.renew_interval = datetime.timedelta(seconds=renew_interval)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._sessions: "OrderedDict[str, UserSession]" = OrderedDict()
+
+    def create_session(self, session_uuid: str, user_id: int) -> str:
+        with self._lock:
+            self._sessions[session_uuid] = UserSession(
+                id=next(self._ids),
+                session_uuid=session_uuid,
+                user_id=user_id,
+                created_at=datetime.datetime.now(),
+            )
+        return session_uuid
+
+    def find_session(self, session_uuid: Optional[str]) -> Optional[UserSession]:
+        if not session_uuid:
+            return None
+        user_session = self._sessions.get(session_uuid)
+        if user_session is None:
+            return None
+        if user_session.created_at + self.ttl <= datetime.datetime.now():
+            return None
+        return user_session
+
+    def renew_session(self, user_session: UserSession, cookie_value: str) -> str:
+        now = datetime.datetime.now()
+        if user_session.created_at + self.renew_interval > now:
+            return cookie_value
+        with self._lock:
+            if user_session.session_uuid in self._sessions:
+                user_session.created_at = now
+                # keep the creation order delete_expired relies on
+                self._sessions.move_to_end(user_session.session_uuid)
+        return cookie_value
+
+    def delete_session(self, session_uuid: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_uuid, None)
+
+    def delete_expired(self, limit: int) -> int:
+        expires_before = datetime.datetime.now() - self.ttl
+        deleted = 0
+        with self._lock:
+            # oldest first, so stop at the first session that is still valid
+            while self._sessions and deleted < limit:
+                session_uuid, user_session = next(iter(self._sessions.items()))
+                if user_session.created_at > expires_before:
+                    break
+                del self._sessions[session_uuid]
+                deleted += 1
+        return deleted
+
+    def count_sessions(self) -> int:
+        return len(self._sessions)
@@ -0,0 +1,75 @@
+"""
+Interfaces of the storages used by app.py. Every backend (SQLAlchemy, memory,
+signed session tokens) implements them; see STORAGE.md for what each method does.
+"""
+
+from typing import Dict, Iterator, List, Optional, Protocol, Set, Tuple, runtime_checkable
+
+from entity.session import UserSession
+from entity.task import Task
+from entity.user import User
+
+
+@runtime_checkable
+class TaskStorage(Protocol):
+    def read_all(self, user_id: int) -> List[Task]: ...
+
+    def iter_all(self, user_id: int, batch_size: int = 500) -> Iterator[Task]: ...
+
+    def read_page(
+        self, user_id: int, after_id: Optional[int], limit: int
+    ) -> List[Task]: ...
+
+    def read_version(self, user_id: int) -> str: ...
+
+    def count_tasks(self, user_id: int) -> int: ...
+
+    def search(
+        self, user_id: int, query: str, offset: int, limit: int
+    ) -> List[Task]: ...
+
+    def read_by_id(self, task_id: int, user_id: int) -> Optional[Task]: ...
+
+    def create(self, task: Task) -> int: ...
+
+    def update(self, task: Task) -> None: ...
+
+    def delete(self, task: Task) -> None: ...
+
+    def update_name(self, task_id: int, user_id: int, name: str) -> bool: ...
+
+    def delete_by_id(self, task_id: int, user_id: int) -> bool: ...
+
+    def apply_batch(
+        self,
+        user_id: int,
+        names_to_create: List[str],
+        names_to_update: Dict[int, str],
+        ids_to_delete: List[int],
+    ) -> Tuple[List[int], Set[int], Set[int]]: ...
+
+
+@runtime_checkable
+class UserStorage(Protocol):
+    def create_user(self, login: str, hashed_password: str) -> None: ...
+
+    def update_password(self, user_id: int, hashed_password: str) -> None: ...
+
+    def find_or_verify_user(
+        self, username: str, password: Optional[str]
+    ) -> Optional[User]: ...
+
+
+@runtime_checkable
+class SessionStorage(Protocol):
+    def create_session(self, session_uuid: str, user_id: int) -> str: ...
+
+    def find_session(self, cookie_value: Optional[str]) -> Optional[UserSession]: ...
+
+    def renew_session(self, user_session: UserSession, cookie_value: str) -> str: ...
+
+    def delete_session(self, session_uuid: str) -> None: ...
+
+    def delete_expired(self, limit: int) -> int: ...
+
+    def count_sessions(self) -> int: ...
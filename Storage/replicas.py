@@ -0,0 +1,101 @@
+"""
+Read replicas of a primary database. Storage reads (session_scope without
+write=True) are sent to a healthy replica, round-robin; everything else, and
+every read that follows a write, goes to the primary (see unit_of_work.py).
+
+A replica is taken out of rotation when one of its connections fails, and
+ReplicaHealthChecker puts it back once "SELECT 1" succeeds again.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import Engine, event, text
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaSet:
+    def __init__(
+        self, replicas: List[Engine], retry_interval: float, read_after_write: float
+    ) -> None:
+        self.replicas = replicas
+        self.retry_interval = retry_interval
+        # after a write, the client's reads go to the primary for this long,
+        # so it sees its own change even if the replicas lag behind
+        self.read_after_write = read_after_write
+        self._counter = itertools.count()
+        self._down_until: Dict[Engine, float] = {engine: 0.0 for engine in replicas}
+        self.failovers = 0
+        for engine in replicas:
+            event.listen(engine, "handle_error", self._on_error)
+
+    def pick(self) -> Optional[Engine]:
+        """Next healthy replica, or None if all are down."""
+        now = time.monotonic()
+        start = next(self._counter)
+        for i in range(len(self.replicas)):
+            engine = self.replicas[(start + i) % len(self.replicas)]
+            if self._down_until[engine] <= now:
+                return engine
+        return None
+
+    def is_healthy(self, engine: Engine) -> bool:
+        return self._down_until[engine] <= time.monotonic()
+
+    def mark_down(self, engine: Engine) -> None:
+        if self.is_healthy(engine):
+            logger.warning("Replica %s is down", engine.url.render_as_string())
+            self.failovers += 1
+        self._down_until[engine] = time.monotonic() + self.retry_interval
+
+    def _on_error(self, context) -> None:
+        if context.is_disconnect or context.connection is None:
+            self.mark_down(context.engine)
+
+    def check_health(self) -> None:
+        for engine in self.replicas:
+            try:
+                with engine.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+            except Exception:
+                self.mark_down(engine)
+            else:
+                if not self.is_healthy(engine):
+                    logger.info("Replica %s is back", engine.url.render_as_string())
+                self._down_until[engine] = 0.0
+
+
+_replica_sets: Dict[Engine, ReplicaSet] = {}
+
+
+def register_replicas(primary: Engine, replica_set: ReplicaSet) -> None:
+    _replica_sets[primary] = replica_set
+
+
+def get_replica_set(primary: Engine) -> Optional[ReplicaSet]:
+    return _replica_sets.get(primary)
+
+
+def replica_sets() -> List[ReplicaSet]:
+    return list(_replica_sets.values())
+
+
+class ReplicaHealthChecker(threading.Thread):
+    """Checks all replicas every `interval` seconds."""
+
+    def __init__(self, interval: float) -> None:
+        super().__init__(name="replica-health-checker", daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            for replica_set in replica_sets():
+                replica_set.check_health()
+
+    def stop(self) -> None:
+        self._stop_event.set()
@@ -1,33 +1,178 @@
-from sqlalchemy import create_engine, select
-from sqlalchemy.orm import Session
-from config_reader import env_config
+import datetime
+import time
+from sqlalchemy import delete, func, select, text, update
+from config_reader import get_settings
+from Storage.engine import StorageEngine
+from Storage.unit_of_work import after_commit, session_scope
+from Storage.ttl_cache import MISSING, TTLCache
 from entity.session import UserSession
 from typing import Optional
 
 
+def expires_before(dialect, ttl: datetime.timedelta):
+    """Sessions created before this (database) time are expired."""
+    if dialect.name == "sqlite":
+        # SQLite has no interval arithmetic, datetime() does the same
+        return func.datetime("now", f"-{int(ttl.total_seconds())} seconds")
+    return func.now() - ttl
+
+
+def seconds_left(dialect, ttl: datetime.timedelta):
+    """
+    Seconds until the session expires, computed by the database: on
+    PostgreSQL created_at is a naive timestamp but now() is timestamptz,
+    which Python can't subtract from each other.
+    """
+    ttl_seconds = ttl.total_seconds()
+    if dialect.name == "sqlite":
+        return (
+            func.julianday(UserSession.created_at) - func.julianday("now")
+        ) * 86400 + ttl_seconds
+    return func.extract("epoch", UserSession.created_at - func.now()) + ttl_seconds
+
+
 class SessionStorageSqlAlchemy:
+    engine = StorageEngine()
+
     def __init__(self):
-        connection_str = f"postgresql+pg8000://{env_config.postgresql_username}:{env_config.postgresql_password}@{env_config.postgresql_hostname}:{env_config.postgresql_port}/{env_config.postgresql_database}"
-        self.engine = create_engine(connection_str, echo=True)
+        env_config = get_settings()
+        self.ttl = datetime.timedelta(seconds=env_config.session_ttl)
+        self.renew_interval = env_config.session_renew_interval
+        # find_session runs on every request, so lookups are cached in-process.
+        # Another worker's logout is only seen here after session_cache_ttl.
+        self.cache: Optional[TTLCache] = None
+        if env_config.session_cache_enabled:
+            self.cache = TTLCache(
+                maxsize=env_config.session_cache_size,
+                ttl=env_config.session_cache_ttl,
+                negative_ttl=env_config.session_cache_negative_ttl,
+            )
+
+    def _expires_before(self):
+        return expires_before(self.engine.dialect, self.ttl)
+
+    def _seconds_left(self):
+        return seconds_left(self.engine.dialect, self.ttl)
 
     def create_session(
         self, session_uuid: str, user_id: int
-    ) -> None:  # when logging in
-        with Session(self.engine) as session:
+    ) -> str:  # when logging in, returns the cookie value
+        with session_scope(self.engine, write=True) as session:
             user_session = UserSession(session_uuid=session_uuid, user_id=user_id)
             session.add(user_session)
-            session.commit()
+        if self.cache is not None:
+            # drop a cached "not found"
+            after_commit(lambda: self.cache.invalidate(session_uuid))
+        return session_uuid
+
+    def find_session(self, session_uuid: Optional[str]) -> Optional[UserSession]:
+        if not session_uuid:
+            return None  # no cookie, nothing to look up
+
+        if self.cache is not None:
+            cached = self.cache.get(session_uuid)
+            if cached is not MISSING:
+                return cached
 
-    def find_session(self, session_uuid: str) -> Optional[UserSession]:
-        with Session(self.engine) as session:
-            stmt = select(UserSession).where(UserSession.session_uuid == session_uuid)
-            result = session.execute(stmt).scalar_one_or_none()
-            return result
+        with session_scope(self.engine) as session:
+            # the database clock, the same one that set created_at
+            stmt = (
+                select(UserSession, self._seconds_left())
+                .where(UserSession.session_uuid == session_uuid)
+                .where(UserSession.created_at > self._expires_before())
+            )
+            row = session.execute(stmt).one_or_none()
+
+        if row is None:
+            if self.cache is not None:
+                self.cache.set(session_uuid, None)
+            return None
+
+        result, seconds_left = row
+        # when renew_session should move created_at, on this process's clock
+        # (the database clock can't be compared with ours); PostgreSQL
+        # returns a Decimal
+        result.renew_at = time.monotonic() + self._renew_in(float(seconds_left))
+        if self.cache is not None:
+            # never keep a session in the cache after it has expired
+            self.cache.set(
+                session_uuid,
+                result,
+                ttl=min(self.cache.ttl, float(seconds_left)),
+            )
+        return result
+
+    def _renew_in(self, seconds_left: float) -> float:
+        return seconds_left - self.ttl.total_seconds() + self.renew_interval
+
+    def renew_session(self, user_session: UserSession, cookie_value: str) -> str:
+        """
+        Sliding expiry: moves created_at to now once the session is older than
+        renew_interval, so an active user stays logged in without a write on
+        every request. Returns the cookie value, which doesn't change.
+        """
+        renew_at = getattr(user_session, "renew_at", None)
+        if renew_at is None or time.monotonic() < renew_at:
+            return cookie_value
+
+        with session_scope(self.engine, write=True) as session:
+            stmt = (
+                update(UserSession)
+                .where(UserSession.session_uuid == user_session.session_uuid)
+                .values(created_at=func.now())
+                .execution_options(synchronize_session=False)
+            )
+            session.execute(stmt)
+        # also updates the cached object, the other requests don't renew again
+        user_session.renew_at = time.monotonic() + self._renew_in(
+            self.ttl.total_seconds()
+        )
+        return cookie_value
 
     def delete_session(self, session_uuid: str) -> None:
-        with Session(self.engine) as session:
-            stmt = select(UserSession).where(UserSession.session_uuid == session_uuid)
-            session_to_delete = session.execute(stmt).scalar_one_or_none()
-            if session_to_delete:
-                session.delete(session_to_delete)
-                session.commit()
+        with session_scope(self.engine, write=True) as session:
+            stmt = (
+                delete(UserSession)
+                .where(UserSession.session_uuid == session_uuid)
+                .execution_options(synchronize_session=False)
+            )
+            session.execute(stmt)
+        if self.cache is not None:
+            # after commit, so it can't be re-cached
+            after_commit(lambda: self.cache.invalidate(session_uuid))
+
+    def delete_expired(self, limit: int) -> int:
+        """Deletes up to `limit` oldest expired sessions, returns how many."""
+        with session_scope(self.engine, write=True) as session:
+            expired_ids = (
+                select(UserSession.id)
+                .where(UserSession.created_at < self._expires_before())
+                .order_by(UserSession.created_at)
+                .limit(limit)
+            )
+            stmt = (
+                delete(UserSession)
+                .where(UserSession.id.in_(expired_ids.scalar_subquery()))
+                .returning(UserSession.session_uuid)
+                .execution_options(synchronize_session=False)
+            )
+            deleted_uuids = session.scalars(stmt).all()
+        if self.cache is not None:
+
+            def invalidate_deleted() -> None:
+                for session_uuid in deleted_uuids:
+                    self.cache.invalidate(session_uuid)
+
+            after_commit(invalidate_deleted)
+        return len(deleted_uuids)
+
+    def count_sessions(self) -> int:
+        with session_scope(self.engine) as session:
+            if self.engine.dialect.name == "postgresql":
+                # planner estimate instead of a full scan, good enough for a metric
+                estimate = session.scalar(
+                    text("SELECT reltuples FROM pg_class WHERE oid = 'sessions'::regclass")
+                )
+                if estimate is not None and estimate >= 0:
+                    return int(estimate)
+            return session.scalar(select(func.count()).select_from(UserSession))
@@ -0,0 +1,67 @@
+import logging
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SessionSweeper(threading.Thread):
+    """
+    Background thread that deletes expired sessions.
+    Every `interval` seconds it calls session_storage.delete_expired(batch_size)
+    until a batch comes back short, sleeping `pause` seconds between batches
+    so that no transaction holds locks on the sessions table for long.
+    """
+
+    def __init__(
+        self,
+        session_storage,
+        interval: float,
+        batch_size: int,
+        pause: float,
+    ) -> None:
+        super().__init__(name="session-sweeper", daemon=True)
+        self.session_storage = session_storage
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self._stop_event = threading.Event()
+
+        self.rows_purged = 0
+        self.runs = 0
+        self.sessions_count: Optional[int] = None  # table size after the last run
+        self.last_run_seconds: Optional[float] = None
+
+    def purge_expired(self) -> int:
+        """One sweep: deletes expired sessions batch by batch."""
+        started = time.perf_counter()
+        purged = 0
+        while not self._stop_event.is_set():
+            deleted = self.session_storage.delete_expired(self.batch_size)
+            purged += deleted
+            self.rows_purged += deleted
+            if deleted < self.batch_size:
+                break
+            self._stop_event.wait(self.pause)
+
+        self.runs += 1
+        self.sessions_count = self.session_storage.count_sessions()
+        self.last_run_seconds = time.perf_counter() - started
+        logger.info(
+            "Purged %d expired sessions in %.2fs, %d left",
+            purged,
+            self.last_run_seconds,
+            self.sessions_count,
+        )
+        return purged
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.purge_expired()
+            except Exception:
+                logger.exception("Failed to purge expired sessions")
+
+    def stop(self) -> None:
+        self._stop_event.set()
@@ -0,0 +1,154 @@
+import base64
+import datetime
+import hashlib
+import hmac
+import logging
+import threading
+import time
+from typing import List, Optional, Set
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from entity.revoked_session import RevokedSession
+from entity.session import UserSession
+from Storage.engine import StorageEngine
+from Storage.unit_of_work import session_scope
+
+logger = logging.getLogger(__name__)
+
+TOKEN_VERSION = "v1"
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class SignedSessionStorage:
+    """
+    Same interface as SessionStorageSqlAlchemy, but the cookie is a signed token
+    "v1.<user_id:session_uuid:expires>.<HMAC-SHA256>" and find_session checks
+    it without the database.
+
+    Tokens are signed with the current secret key and verified with it or any
+    of `old_keys`, so the key can be rotated without logging everybody out.
+    Logout stores the session uuid in revoked_sessions; every process keeps
+    these in memory and reloads them every `revocation_refresh` seconds, so a
+    logout in another process takes effect after at most that delay.
+
+    A token can't be changed, so renew_session issues a new one for the same
+    session uuid once the current one is older than `renew_interval`.
+    """
+
+    engine = StorageEngine()
+
+    def __init__(
+        self,
+        secret_key: str,
+        old_keys: List[str],
+        ttl: int,
+        revocation_refresh: float,
+        renew_interval: int = 300,
+    ) -> None:
+        self.keys = [key.encode() for key in [secret_key, *old_keys]]
+        self.ttl = ttl
+        self.revocation_refresh = revocation_refresh
+        self.renew_interval = datetime.timedelta(seconds=renew_interval)
+
+        self._revoked: Set[str] = set()
+        self._revoked_loaded_at: Optional[float] = None
+        self._refresh_lock = threading.Lock()
+
+    def _sign(self, payload: bytes, key: bytes) -> bytes:
+        return hmac.new(key, payload, hashlib.sha256).digest()
+
+    def create_session(self, session_uuid: str, user_id: int) -> str:
+        """Returns the token to put in the session cookie."""
+        expires = int(time.time()) + self.ttl
+        payload = f"{user_id}:{session_uuid}:{expires}".encode()
+        signature = self._sign(payload, self.keys[0])
+        return f"{TOKEN_VERSION}.{_b64encode(payload)}.{_b64encode(signature)}"
+
+    def find_session(self, token: Optional[str]) -> Optional[UserSession]:
+        if not token:
+            return None
+        try:
+            version, payload_b64, signature_b64 = token.split(".")
+            payload = _b64decode(payload_b64)
+            signature = _b64decode(signature_b64)
+            user_id, session_uuid, expires = payload.decode().split(":")
+            user_id, expires = int(user_id), int(expires)
+        except ValueError:
+            return None  # not a token we issued
+
+        if version != TOKEN_VERSION:
+            return None
+        if not any(
+            hmac.compare_digest(signature, self._sign(payload, key))
+            for key in self.keys
+        ):
+            return None
+        if expires <= time.time():
+            return None
+        if session_uuid in self._revoked_sessions():
+            return None
+
+        created_at = datetime.datetime.fromtimestamp(expires - self.ttl)
+        return UserSession(
+            session_uuid=session_uuid, user_id=user_id, created_at=created_at
+        )
+
+    def renew_session(self, user_session: UserSession, token: str) -> str:
+        """Returns the token to put in the session cookie, a new one if renewed."""
+        if user_session.created_at + self.renew_interval > datetime.datetime.now():
+            return token
+        return self.create_session(user_session.session_uuid, user_session.user_id)
+
+    def delete_session(self, session_uuid: str) -> None:
+        expires_at = datetime.datetime.now() + datetime.timedelta(seconds=self.ttl)
+        with session_scope(self.engine, write=True) as session:
+            session.merge(RevokedSession(session_uuid=session_uuid, expires_at=expires_at))
+        self._revoked.add(session_uuid)
+
+    def _revoked_sessions(self) -> Set[str]:
+        loaded_at = self._revoked_loaded_at
+        is_stale = (
+            loaded_at is None or time.monotonic() - loaded_at > self.revocation_refresh
+        )
+        # one thread reloads, the others keep using the current set meanwhile
+        if is_stale and self._refresh_lock.acquire(blocking=False):
+            try:
+                with Session(self.engine) as session:
+                    stmt = select(RevokedSession.session_uuid).where(
+                        RevokedSession.expires_at > datetime.datetime.now()
+                    )
+                    self._revoked = set(session.scalars(stmt))
+            except Exception:
+                logger.exception("Failed to load revoked sessions")
+            finally:
+                self._revoked_loaded_at = time.monotonic()
+                self._refresh_lock.release()
+        return self._revoked
+
+    def delete_expired(self, limit: int) -> int:
+        """Forgets up to `limit` revocations of tokens that have expired anyway."""
+        with session_scope(self.engine, write=True) as session:
+            expired_uuids = (
+                select(RevokedSession.session_uuid)
+                .where(RevokedSession.expires_at < datetime.datetime.now())
+                .order_by(RevokedSession.expires_at)
+                .limit(limit)
+            )
+            stmt = delete(RevokedSession).where(
+                RevokedSession.session_uuid.in_(expired_uuids.scalar_subquery())
+            )
+            deleted = session.execute(stmt).rowcount
+        return deleted
+
+    def count_sessions(self) -> int:
+        with session_scope(self.engine) as session:
+            return session.scalar(select(func.count()).select_from(RevokedSession))
@@ -0,0 +1,118 @@
+"""
+Per-user task counters (user_task_counters): the number of tasks and a
+version that grows with every change, so /tasks can show "N tasks" and
+build its ETag with a primary-key lookup instead of aggregating tasks.
+
+TaskStorageSqlAlchemy calls change_counter() in the same transaction as the
+change itself. reconcile() recounts the tasks and fixes counters that drifted
+(rows changed by hand, bulk loads that bypassed the storage).
+"""
+
+import time
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+from entity.task import Task
+from entity.task_counter import UserTaskCounter
+from entity.user import User
+from Storage.unit_of_work import session_scope
+
+_UPSERTS = {"postgresql": postgresql_insert, "sqlite": sqlite_insert}
+
+
+def change_counter(session: Session, user_id: int, count_delta: int) -> None:
+    """Adds count_delta to the user's task count and increments the version."""
+    dialect = session.get_bind().dialect.name
+    if dialect in _UPSERTS:
+        stmt = (
+            _UPSERTS[dialect](UserTaskCounter)
+            .values(user_id=user_id, task_count=count_delta, version=1)
+            .on_conflict_do_update(
+                index_elements=[UserTaskCounter.user_id],
+                set_={
+                    "task_count": UserTaskCounter.task_count + count_delta,
+                    "version": UserTaskCounter.version + 1,
+                },
+            )
+        )
+        session.execute(stmt)
+    else:
+        stmt = (
+            update(UserTaskCounter)
+            .where(UserTaskCounter.user_id == user_id)
+            .values(
+                task_count=UserTaskCounter.task_count + count_delta,
+                version=UserTaskCounter.version + 1,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if session.execute(stmt).rowcount == 0:
+            session.add(UserTaskCounter(user_id=user_id, task_count=count_delta, version=1))
+            session.flush()
+
+    # a counter loaded earlier in this session is stale now
+    session.info.get("task_counters", {}).pop(user_id, None)
+    counter = session.identity_map.get(identity_key(UserTaskCounter, user_id))
+    if counter is not None:
+        session.expire(counter)
+
+
+def read_counter(session: Session, user_id: int) -> UserTaskCounter:
+    """The user's counter, loaded once per session (i.e. once per request)."""
+    # the identity map only holds weak references, session.info keeps it loaded
+    counters = session.info.setdefault("task_counters", {})
+    counter = counters.get(user_id)
+    if counter is None:
+        counter = session.get(UserTaskCounter, user_id) or UserTaskCounter(
+            user_id=user_id, task_count=0, version=0
+        )
+        counters[user_id] = counter
+    return counter
+
+
+def reconcile(engine, batch_size: int = 1000, pause: float = 0.0) -> int:
+    """
+    Recounts the tasks of all users, `batch_size` users per transaction, and
+    fixes the counters that differ. Returns how many were fixed.
+    The counters of a batch are locked (SELECT ... FOR UPDATE) before the
+    tasks are counted, so concurrent task changes wait and are not lost.
+    """
+    fixed = 0
+    after_user_id = 0
+    while True:
+        with session_scope(engine, write=True) as session:
+            user_ids = session.scalars(
+                select(User.id)
+                .where(User.id > after_user_id)
+                .order_by(User.id)
+                .limit(batch_size)
+            ).all()
+            if not user_ids:
+                return fixed
+
+            stored = dict(
+                session.execute(
+                    select(UserTaskCounter.user_id, UserTaskCounter.task_count)
+                    .where(UserTaskCounter.user_id.in_(user_ids))
+                    .with_for_update()
+                ).all()
+            )
+            actual = dict(
+                session.execute(
+                    select(Task.user_id, func.count())
+                    .where(Task.user_id.in_(user_ids))
+                    .group_by(Task.user_id)
+                ).all()
+            )
+            for user_id in user_ids:
+                task_count = actual.get(user_id, 0)
+                if stored.get(user_id, 0) != task_count:
+                    change_counter(session, user_id, task_count - stored.get(user_id, 0))
+                    fixed += 1
+        after_user_id = user_ids[-1]
+        if pause:
+            time.sleep(pause)
@@ -1,22 +1,118 @@
-from sqlalchemy import create_engine, select
+from sqlalchemy import case, delete, func, insert, literal_column, or_, select, update
 from sqlalchemy.orm import Session
-from config_reader import env_config
+from Storage.engine import StorageEngine
+from Storage.task_counters import change_counter, read_counter
+from Storage.unit_of_work import read_engine, session_scope
 from entity.task import Task
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+
+def search_statement(dialect, user_id: int, query: str):
+    """The SELECT of TaskStorageSqlAlchemy.search, without offset and limit."""
+    if dialect.name != "postgresql":
+        return (
+            select(Task)
+            .where(Task.user_id == user_id)
+            .where(Task.name.icontains(query, autoescape=True))
+            .order_by(Task.id.desc())
+        )
+    # the same expressions as in the indexes, so the planner can use them
+    config = literal_column("'simple'::regconfig")
+    document = func.to_tsvector(config, Task.name)
+    ts_query = func.websearch_to_tsquery(config, query)
+    # pg8000 needs "%%" for a literal "%", SQLAlchemy doesn't escape it there
+    similar_to = Task.name.op(
+        "%%" if dialect.driver == "pg8000" else "%", is_comparison=True
+    )
+    rank = func.ts_rank(document, ts_query) + func.similarity(Task.name, query)
+    return (
+        select(Task)
+        .where(Task.user_id == user_id)
+        .where(
+            or_(
+                document.bool_op("@@")(ts_query),
+                Task.name.icontains(query, autoescape=True),
+                similar_to(query),
+            )
+        )
+        .order_by(rank.desc(), Task.id.desc())
+    )
 
 
 class TaskStorageSqlAlchemy:
-    def __init__(self):
-        connection_str = f"postgresql+pg8000://{env_config.postgresql_username}:{env_config.postgresql_password}@{env_config.postgresql_hostname}:{env_config.postgresql_port}/{env_config.postgresql_database}"
-        self.engine = create_engine(connection_str, echo=True)
+    engine = StorageEngine()
 
     def read_all(self, user_id: int) -> List[Task]:
-        with Session(self.engine) as session:
+        with session_scope(self.engine) as session:
             stmt = select(Task).where(Task.user_id == user_id).order_by(Task.id)
             return session.scalars(stmt).all()
 
+    def iter_all(self, user_id: int, batch_size: int = 500) -> Iterator[Task]:
+        """
+        Like read_all, but yields tasks while reading them from a server-side
+        cursor, `batch_size` rows at a time, so memory use does not grow with
+        the number of tasks. The connection is held until the iterator is
+        exhausted or closed.
+        Has its own session, not the request's: a streamed response is read
+        after the request has ended. The engine (replica or primary) is chosen
+        now, while the request is still there.
+        """
+        return self._iter_all(read_engine(self.engine), user_id, batch_size)
+
+    @staticmethod
+    def _iter_all(engine, user_id: int, batch_size: int) -> Iterator[Task]:
+        with Session(engine) as session:
+            stmt = (
+                select(Task)
+                .where(Task.user_id == user_id)
+                .order_by(Task.id)
+                .execution_options(yield_per=batch_size)
+            )
+            yield from session.scalars(stmt)
+
+    def read_page(
+        self, user_id: int, after_id: Optional[int], limit: int
+    ) -> List[Task]:
+        """
+        Keyset pagination: up to `limit` tasks with id > after_id, ordered by id.
+        Uses the (user_id, id) order, so a page costs the same on any page number.
+        """
+        with session_scope(self.engine) as session:
+            stmt = select(Task).where(Task.user_id == user_id)
+            if after_id is not None:
+                stmt = stmt.where(Task.id > after_id)
+            stmt = stmt.order_by(Task.id).limit(limit)
+            return session.scalars(stmt).all()
+
+    def read_version(self, user_id: int) -> str:
+        """
+        A value that changes whenever the user's task list changes: the version
+        of the user's counter, which every change increments.
+        """
+        with session_scope(self.engine) as session:
+            counter = read_counter(session, user_id)
+            return f"{counter.task_count}:{counter.version}"
+
+    def count_tasks(self, user_id: int) -> int:
+        """From the counter, no COUNT(*); free after read_version in a request."""
+        with session_scope(self.engine) as session:
+            return read_counter(session, user_id).task_count
+
+    def search(
+        self, user_id: int, query: str, offset: int, limit: int
+    ) -> List[Task]:
+        """
+        Tasks whose name matches `query`, best matches first.
+        PostgreSQL: full-text match, substring or trigram similarity, ranked by
+        ts_rank + similarity; uses the GIN indexes of migration v0005.
+        Other databases: case-insensitive substring, newest first.
+        """
+        with session_scope(self.engine) as session:
+            stmt = search_statement(self.engine.dialect, user_id, query)
+            return session.scalars(stmt.offset(offset).limit(limit)).all()
+
     def read_by_id(self, task_id: int, user_id: int) -> Optional[Task]:
-        with Session(self.engine) as session:
+        with session_scope(self.engine) as session:
             stmt = (
                 select(Task)
                 .where(Task.user_id == user_id)
@@ -25,17 +121,103 @@ class TaskStorageSqlAlchemy:
             return session.execute(stmt).scalar_one_or_none()
 
     def create(self, task: Task) -> int:
-        with Session(self.engine) as session:
+        with session_scope(self.engine, write=True) as session:
             session.add(task)
-            session.commit()
+            session.flush()
+            change_counter(session, task.user_id, +1)
             return task.id
 
     def update(self, task: Task) -> None:
-        with Session(self.engine) as session:
+        with session_scope(self.engine, write=True) as session:
             session.add(task)
-            session.commit()
+            session.flush()
+            change_counter(session, task.user_id, 0)
 
     def delete(self, task: Task) -> None:
-        with Session(self.engine) as session:
+        with session_scope(self.engine, write=True) as session:
             session.delete(task)
-            session.commit()
+            session.flush()
+            change_counter(session, task.user_id, -1)
+
+    def update_name(self, task_id: int, user_id: int, name: str) -> bool:
+        """
+        Renames the task with one UPDATE ... RETURNING, without reading it first.
+        Returns False if the user has no task with this id.
+        """
+        with session_scope(self.engine, write=True) as session:
+            stmt = (
+                update(Task)
+                .where(Task.user_id == user_id)
+                .where(Task.id == task_id)
+                .values(name=name)
+                .returning(Task.id)
+                .execution_options(synchronize_session=False)
+            )
+            if session.scalar(stmt) is None:
+                return False
+            change_counter(session, user_id, 0)
+            return True
+
+    def delete_by_id(self, task_id: int, user_id: int) -> bool:
+        """Like update_name, with DELETE ... RETURNING."""
+        with session_scope(self.engine, write=True) as session:
+            stmt = (
+                delete(Task)
+                .where(Task.user_id == user_id)
+                .where(Task.id == task_id)
+                .returning(Task.id)
+                .execution_options(synchronize_session=False)
+            )
+            if session.scalar(stmt) is None:
+                return False
+            change_counter(session, user_id, -1)
+            return True
+
+    def apply_batch(
+        self,
+        user_id: int,
+        names_to_create: List[str],
+        names_to_update: Dict[int, str],
+        ids_to_delete: List[int],
+    ) -> Tuple[List[int], Set[int], Set[int]]:
+        """
+        Applies many changes in one transaction with one statement per kind:
+        a multi-row INSERT, an UPDATE ... SET name = CASE id ... WHERE id IN (...)
+        and a DELETE ... WHERE id IN (...), all scoped to the user.
+        Returns (ids of created tasks in input order, updated ids, deleted ids).
+        """
+        created_ids: List[int] = []
+        updated_ids: Set[int] = set()
+        deleted_ids: Set[int] = set()
+
+        with session_scope(self.engine, write=True) as session:
+            if names_to_create:
+                created_ids = list(
+                    session.scalars(
+                        insert(Task).returning(Task.id, sort_by_parameter_order=True),
+                        [{"name": name, "user_id": user_id} for name in names_to_create],
+                    )
+                )
+            if names_to_update:
+                stmt = (
+                    update(Task)
+                    .where(Task.user_id == user_id)
+                    .where(Task.id.in_(names_to_update.keys()))
+                    .values(name=case(names_to_update, value=Task.id))
+                    .returning(Task.id)
+                    .execution_options(synchronize_session=False)
+                )
+                updated_ids = set(session.scalars(stmt))
+            if ids_to_delete:
+                stmt = (
+                    delete(Task)
+                    .where(Task.user_id == user_id)
+                    .where(Task.id.in_(ids_to_delete))
+                    .returning(Task.id)
+                    .execution_options(synchronize_session=False)
+                )
+                deleted_ids = set(session.scalars(stmt))
+            if created_ids or updated_ids or deleted_ids:
+                change_counter(session, user_id, len(created_ids) - len(deleted_ids))
+
+        return created_ids, updated_ids, deleted_ids
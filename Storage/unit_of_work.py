@@ -0,0 +1,187 @@
+"""
+Request-scoped unit of work: inside a Flask request every storage call on an
+engine shares one Session, i.e. one connection checkout and one transaction,
+and the ORM identity map (a task loaded by read_by_id is the same object
+update() later writes). UnitOfWork.init_app commits when the response status
+is below 400 and rolls back otherwise.
+
+Storages get their session from session_scope(). Outside a request (scripts,
+the session sweeper, tests calling storages directly) it opens a session for
+the block and commits it at the end, as before.
+
+If the engine has read replicas (Storage/replicas.py), reads use a session on
+one replica, chosen once per request, until the request writes; from then on
+everything goes to the primary. A successful write also sets a short-lived
+cookie that keeps the client's next requests on the primary.
+"""
+
+import math
+from contextlib import ExitStack, contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Set
+
+from flask import Flask, Response, current_app, g, has_request_context, request
+from sqlalchemy import Engine
+from sqlalchemy.orm import Session
+
+from Storage.engine import write_transaction
+from Storage.replicas import get_replica_set
+
+EXTENSION_NAME = "unit_of_work"
+READ_PRIMARY_COOKIE = "task_tracker_read_primary"
+
+
+class UnitOfWork:
+    """Sessions of one request, one per engine."""
+
+    def __init__(self, read_primary: bool = False) -> None:
+        self.sessions: Dict[Engine, Session] = {}
+        self.read_primary = read_primary
+        self._writing: Set[Engine] = set()
+        self._replicas: Dict[Engine, Optional[Engine]] = {}  # primary -> replica
+        self._writer_locks = ExitStack()
+        self._after_commit: List[Callable[[], None]] = []
+
+    def _session(self, engine: Engine) -> Session:
+        session = self.sessions.get(engine)
+        if session is None:
+            # loaded objects stay usable after commit and after the request
+            session = self.sessions[engine] = Session(engine, expire_on_commit=False)
+        return session
+
+    def read_engine(self, engine: Engine) -> Engine:
+        """Where reads of `engine` go in this request: a replica or the primary."""
+        if self.read_primary or engine in self._writing:
+            return engine
+        if engine not in self._replicas:
+            replica_set = get_replica_set(engine)
+            self._replicas[engine] = replica_set.pick() if replica_set else None
+        return self._replicas[engine] or engine
+
+    def session_for(self, engine: Engine, write: bool) -> Session:
+        if not write:
+            return self._session(self.read_engine(engine))
+        session = self._session(engine)
+        if write and engine not in self._writing:
+            self._writing.add(engine)
+            if engine.dialect.name == "sqlite":
+                # SQLite can't upgrade a read transaction to a write one safely:
+                # end it (nothing has been written yet) and queue as the writer
+                # until the request's transaction ends
+                if session.in_transaction():
+                    session.commit()
+                self._writer_locks.enter_context(write_transaction(engine))
+        return session
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        self._after_commit.append(callback)
+
+    def commit(self) -> None:
+        for session in self.sessions.values():
+            session.commit()
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            callback()
+
+    def rollback(self) -> None:
+        for session in self.sessions.values():
+            session.rollback()
+        self._after_commit = []
+
+    def close(self) -> None:
+        try:
+            for session in self.sessions.values():
+                session.close()  # rolls back what was not committed
+        finally:
+            self.sessions.clear()
+            self._writer_locks.close()
+
+    @staticmethod
+    def init_app(app: Flask) -> None:
+        app.extensions[EXTENSION_NAME] = True
+        app.after_request(_finish_unit_of_work)
+        app.teardown_request(_close_unit_of_work)
+
+
+def _current_unit_of_work() -> Optional[UnitOfWork]:
+    if not has_request_context() or EXTENSION_NAME not in current_app.extensions:
+        return None
+    if "unit_of_work" not in g:
+        g.unit_of_work = UnitOfWork(
+            read_primary=READ_PRIMARY_COOKIE in request.cookies
+        )
+    return g.unit_of_work
+
+
+def _finish_unit_of_work(response: Response) -> Response:
+    unit_of_work = g.get("unit_of_work")
+    if unit_of_work is not None:
+        if response.status_code < 400:
+            unit_of_work.commit()
+            _keep_reads_on_primary(unit_of_work, response)
+        else:
+            unit_of_work.rollback()
+    return response
+
+
+def _keep_reads_on_primary(unit_of_work: UnitOfWork, response: Response) -> None:
+    seconds = max(
+        (
+            replica_set.read_after_write
+            for replica_set in map(get_replica_set, unit_of_work._writing)
+            if replica_set is not None
+        ),
+        default=0,
+    )
+    if seconds > 0:
+        response.set_cookie(
+            READ_PRIMARY_COOKIE, "1", max_age=math.ceil(seconds), httponly=True
+        )
+
+
+def _close_unit_of_work(exc: Optional[BaseException]) -> None:
+    unit_of_work = g.pop("unit_of_work", None)
+    if unit_of_work is not None:
+        unit_of_work.close()
+
+
+@contextmanager
+def session_scope(engine: Engine, write: bool = False) -> Iterator[Session]:
+    """
+    Session for a storage method; `write` for methods that change data.
+    In a request the changes are flushed at the end of the block and
+    committed with the request.
+    """
+    unit_of_work = _current_unit_of_work()
+    if unit_of_work is None:
+        with ExitStack() as stack:
+            if write:
+                stack.enter_context(write_transaction(engine))
+            else:
+                engine = read_engine(engine)
+            session = stack.enter_context(Session(engine, expire_on_commit=False))
+            yield session
+            session.commit()
+        return
+
+    session = unit_of_work.session_for(engine, write)
+    yield session
+    session.flush()
+
+
+def read_engine(engine: Engine) -> Engine:
+    """Engine for a read of `engine` that doesn't use session_scope()."""
+    unit_of_work = _current_unit_of_work()
+    if unit_of_work is not None:
+        return unit_of_work.read_engine(engine)
+    replica_set = get_replica_set(engine)
+    replica = replica_set.pick() if replica_set is not None else None
+    return replica or engine
+
+
+def after_commit(callback: Callable[[], None]) -> None:
+    """Run `callback` once the current changes are committed (now, outside a request)."""
+    unit_of_work = _current_unit_of_work()
+    if unit_of_work is None:
+        callback()
+    else:
+        unit_of_work.after_commit(callback)
@@ -1,34 +1,51 @@
-from sqlalchemy import create_engine, select
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
-from config_reader import env_config
+from Storage.engine import StorageEngine
+from Storage.unit_of_work import read_engine, session_scope
 from entity.user import User
-from werkzeug.security import check_password_hash
+from password_hasher import get_password_hasher
 from typing import Optional
-from sqlalchemy.exc import NoResultFound
 
 
 class UserStorageSqlAlchemy:
-    def __init__(self):
-        connection_str = f"postgresql+pg8000://{env_config.postgresql_username}:{env_config.postgresql_password}@{env_config.postgresql_hostname}:{env_config.postgresql_port}/{env_config.postgresql_database}"
-        self.engine = create_engine(connection_str, echo=True)
+    engine = StorageEngine()
 
     def create_user(self, login: str, hashed_password: str) -> None:
-        with Session(self.engine) as session:
+        with session_scope(self.engine, write=True) as session:
             new_user = User(login=login, db_hashed_password=hashed_password)
             session.add(new_user)
-            session.commit()
+
+    def update_password(self, user_id: int, hashed_password: str) -> None:
+        with session_scope(self.engine, write=True) as session:
+            stmt = (
+                update(User)
+                .where(User.id == user_id)
+                .values(db_hashed_password=hashed_password)
+            )
+            session.execute(stmt)
 
     def find_or_verify_user(
         self, username: str, password: Optional[str]
     ) -> Optional[User]:
-        with Session(self.engine) as session:
+        # its own session, not the request's: the connection is back in the
+        # pool before the slow hash check.
+        # A login can read a replica; the registration check (no password)
+        # is followed by an INSERT, so it must see the primary.
+        engine = self.engine if password is None else read_engine(self.engine)
+        with Session(engine) as session:
             stmt = select(User).where(User.login == username)
-            try:
-                user = session.execute(stmt).scalar_one()
-            except NoResultFound:
-                return None  # пользователь не найден в БД
-            if password is None:
-                return user  # возвр-т польз-ля (без проверки пароля)
-            elif check_password_hash(user.db_hashed_password, password):
-                return user  # пароль совпадает
+            user = session.execute(stmt).scalar_one_or_none()
+        if user is None:
+            return None  # пользователь не найден в БД
+        if password is None:
+            return user  # возвр-т польз-ля (без проверки пароля)
+
+        password_hasher = get_password_hasher()
+        if not password_hasher.verify(user.db_hashed_password, password):
             return None  # пароль не совпадает
+
+        if password_hasher.needs_rehash(user.db_hashed_password):
+            # hashing settings changed since the user registered
+            user.db_hashed_password = password_hasher.hash(password)
+            self.update_password(user.id, user.db_hashed_password)
+        return user  # пароль совпадает
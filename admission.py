@@ -0,0 +1,98 @@
+"""
+Admission control for POST /login, checked before the database and the
+password hash are touched: a credential-stuffing burst gets 429 responses
+instead of taking the hashing pool and the connection pool from everybody.
+
+- a token bucket per client IP and one per username: `burst` attempts at
+  once, refilled at `per_minute` attempts per minute;
+- at most `max_concurrent` logins verified at the same time in this process.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, Tuple
+
+
+class LoginRejected(Exception):
+    """Too many login attempts; try again in `retry_after` seconds."""
+
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBuckets:
+    """
+    One token bucket per key, stored as (tokens, last update) in an LRU dict of
+    at most `max_keys` entries. When it is full the least recently used bucket
+    is dropped: that key starts again with a full bucket.
+    """
+
+    def __init__(self, per_minute: float, burst: int, max_keys: int) -> None:
+        self.rate = per_minute / 60  # tokens per second
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str) -> float:
+        """Takes a token: 0 if there was one, else seconds until there is one."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / self.rate if self.rate > 0 else 60.0
+            self._buckets[key] = (tokens, now)  # re-inserted = most recently used
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class LoginAdmission:
+    def __init__(
+        self,
+        ip_per_minute: float,
+        ip_burst: int,
+        username_per_minute: float,
+        username_burst: int,
+        max_keys: int,
+        max_concurrent: int,
+    ) -> None:
+        self.by_ip = TokenBuckets(ip_per_minute, ip_burst, max_keys)
+        self.by_username = TokenBuckets(username_per_minute, username_burst, max_keys)
+        self._verifications = threading.BoundedSemaphore(max_concurrent)
+        self.rejected: Dict[str, int] = {"ip": 0, "username": 0, "concurrency": 0}
+
+    @contextmanager
+    def attempt(self, ip: str, username: str) -> Iterator[None]:
+        """
+        Admits one login attempt for the block or raises LoginRejected.
+        The IP is checked first, so a blocked IP doesn't use up the tokens
+        of the usernames it tries.
+        """
+        for reason, buckets, key in (
+            ("ip", self.by_ip, ip),
+            ("username", self.by_username, username.casefold()),
+        ):
+            wait = buckets.take(key)
+            if wait > 0:
+                self.rejected[reason] += 1
+                raise LoginRejected(reason, wait)
+
+        if not self._verifications.acquire(blocking=False):
+            self.rejected["concurrency"] += 1
+            raise LoginRejected("concurrency", 1.0)
+        try:
+            yield
+        finally:
+            self._verifications.release()
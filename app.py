@@ -1,68 +1,386 @@
 from flask import (
     abort,
+    Blueprint,
     Flask,
+    Response,
     redirect,
     render_template,
     current_app,
     make_response,
     flash,
+    jsonify,
     g,
+    request,
+    session,
+    url_for,
 )
 from entity.task import Task
+import hashlib
+import json
+import math
 import uuid
+from collections import Counter
+from functools import partial
 from http import HTTPStatus
 from forms import LoginForm, RegisterForm, TaskForm
-from werkzeug.security import generate_password_hash
-from typing import cast
+from typing import Optional, cast
+from sqlalchemy import URL, Engine, make_url
 
 from Storage.task_storage_sql_alchemy import TaskStorageSqlAlchemy
 from Storage.user_storage_sql_alchemy import UserStorageSqlAlchemy
 from Storage.session_storage_sql_alchemy import SessionStorageSqlAlchemy
 from Storage.cookie_storage import CookieStorage
+from Storage.engine import get_engine, on_engine_created, pool_stats
+from Storage.memory_storage import (
+    SessionStorageMemory,
+    TaskStorageMemory,
+    UserStorageMemory,
+)
+from Storage.protocols import SessionStorage, TaskStorage, UserStorage
+from Storage.replicas import (
+    ReplicaHealthChecker,
+    ReplicaSet,
+    get_replica_set,
+    register_replicas,
+    replica_sets,
+)
+from Storage.session_sweeper import SessionSweeper
+from Storage.unit_of_work import UnitOfWork
+from Storage.signed_session_storage import SignedSessionStorage
 
 from flask_wtf.csrf import CSRFProtect
-from config_reader import Settings
+from werkzeug.middleware.proxy_fix import ProxyFix
+from admission import LoginAdmission, LoginRejected
+from config_reader import Settings, configure, get_settings
+from password_hasher import HashingOverloaded, get_password_hasher
+from metrics import Metric, RequestMetrics
+from query_budget import QueryBudgetGuard, query_budget
+from response_pipeline import ResponsePipeline
+from slow_query_log import SlowQueryLogger, start_queue_logging
 from entity.session import UserSession
 
-env_config = Settings()
-secret_key = env_config.secret_key
+COOKIE_NAME = "task_tracker_session"
 
-app = Flask(__name__)
+# all routes; create_app() registers it on the app
+main = Blueprint("main", __name__)
 
-app.config["SECRET_KEY"] = secret_key  # Set the secret key
-app.config["task_storage"] = TaskStorageSqlAlchemy()
-app.config["user_storage"] = UserStorageSqlAlchemy()
-app.config["session_storage"] = SessionStorageSqlAlchemy()
-app.config["cookie_storage"] = CookieStorage()
 
-# Initialize CSRF protection
-csrf = CSRFProtect(app)
+def create_app(settings: Optional[Settings] = None) -> Flask:
+    """
+    Build the app. Nothing connects to the database here: the storages create
+    their engine on the first request, i.e. in the worker process after a
+    prefork server has forked (see gunicorn.conf.py).
+    `settings` become the process settings, the engines are configured from them.
+    """
+    if settings is None:
+        settings = get_settings()
+    else:
+        configure(settings)
+
+    app = Flask(__name__)
+    app.config["SECRET_KEY"] = settings.secret_key  # Set the secret key
+    app.config["settings"] = settings
+    if settings.trusted_proxy_hops:
+        # behind the proxy remote_addr would be the proxy for every client
+        hops = settings.trusted_proxy_hops
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+    if settings.storage_backend == "memory":
+        app.config["task_storage"] = TaskStorageMemory()
+        app.config["user_storage"] = UserStorageMemory()
+        app.config["session_storage"] = SessionStorageMemory(
+            ttl=settings.session_ttl, renew_interval=settings.session_renew_interval
+        )
+    else:
+        app.config["task_storage"] = TaskStorageSqlAlchemy()
+        app.config["user_storage"] = UserStorageSqlAlchemy()
+        app.config["session_storage"] = SessionStorageSqlAlchemy()
+    if settings.session_mode == "signed":
+        app.config["session_storage"] = SignedSessionStorage(
+            secret_key=settings.secret_key,
+            old_keys=settings.session_signing_old_keys,
+            ttl=settings.session_ttl,
+            revocation_refresh=settings.session_revocation_refresh,
+            renew_interval=settings.session_renew_interval,
+        )
+    app.config["cookie_storage"] = CookieStorage()
+
+    session_sweeper = None
+    if settings.session_sweeper_enabled:
+        session_sweeper = SessionSweeper(
+            app.config["session_storage"],
+            interval=settings.session_sweep_interval,
+            batch_size=settings.session_sweep_batch_size,
+            pause=settings.session_sweep_pause,
+        )
+        session_sweeper.start()
+    app.extensions["session_sweeper"] = session_sweeper
+
+    # Initialize CSRF protection
+    CSRFProtect(app)
+
+    app.extensions["login_admission"] = LoginAdmission(
+        ip_per_minute=settings.login_ip_per_minute,
+        ip_burst=settings.login_ip_burst,
+        username_per_minute=settings.login_username_per_minute,
+        username_burst=settings.login_username_burst,
+        max_keys=settings.login_buckets_max_keys,
+        max_concurrent=settings.login_max_concurrent,
+    )
 
-COOKIE_NAME = "task_tracker_session"
+    if settings.db_replica_urls:
+        on_engine_created("replicas", partial(_attach_replicas, settings))
+
+    # engines are created on first use, so instrumentation is attached to
+    # every engine get_engine() creates (replicas included); another
+    # create_app() replaces it instead of adding to it
+    request_metrics = RequestMetrics()
+    if settings.metrics_enabled:
+        # before the response pipeline, so its time is part of the request latency
+        request_metrics.init_app(app, token=settings.metrics_token)
+        on_engine_created(
+            "request_metrics",
+            request_metrics.instrument_engine,
+            request_metrics.uninstrument_engine,
+        )
 
+    if settings.slow_query_log_enabled:
+        start_queue_logging(filename=settings.slow_query_log_file)
+        slow_query_logger = SlowQueryLogger(
+            threshold_ms=settings.slow_query_threshold_ms,
+            sample_rate=settings.slow_query_sample_rate,
+        )
+        on_engine_created(
+            "slow_query_log",
+            slow_query_logger.instrument_engine,
+            slow_query_logger.uninstrument_engine,
+        )
 
-def find_session() -> UserSession | None:
-    session_storage = cast(
-        SessionStorageSqlAlchemy, current_app.config["session_storage"]
+    # SQL statements per route, checked in debug mode and in tests
+    query_budget_guard = QueryBudgetGuard()
+    query_budget_guard.init_app(app)
+    on_engine_created(
+        "query_budget_guard",
+        query_budget_guard.instrument_engine,
+        query_budget_guard.uninstrument_engine,
+    )
+    app.extensions["query_budget_guard"] = query_budget_guard
+
+    response_pipeline = ResponsePipeline(
+        minify_html=settings.response_minify_enabled,
+        compress=settings.response_compression_enabled,
+        min_size=settings.response_compression_min_size,
+        gzip_level=settings.response_gzip_level,
+        brotli_quality=settings.response_brotli_quality,
     )
+    response_pipeline.init_app(app)
+    app.extensions["response_pipeline"] = response_pipeline
+
+    # one session and transaction per request for all SQL storages.
+    # Registered last: after_request handlers run in reverse order, so the
+    # commit comes before metrics and the response pipeline (its time is
+    # counted, a failed commit is a 500 before any post-processing)
+    UnitOfWork.init_app(app)
+
+    request_metrics.add_collector(partial(collect_app_metrics, app))
+    app.register_blueprint(main)
+    return app
+
+
+def _attach_replicas(settings: Settings, engine: Engine) -> None:
+    """Registers the replicas once the engine of the main database is created."""
+    if engine.url != settings.database_url or get_replica_set(engine) is not None:
+        return
+    replicas = [get_engine(make_url(url)) for url in settings.db_replica_urls]
+    register_replicas(
+        engine,
+        ReplicaSet(
+            replicas,
+            retry_interval=settings.db_replica_check_interval,
+            read_after_write=settings.db_replica_read_after_write,
+        ),
+    )
+    ReplicaHealthChecker(settings.db_replica_check_interval).start()
+
+
+_app: Optional[Flask] = None
+
+
+def __getattr__(name: str):
+    # `from app import app` (flask --app app, tests) builds the default app on
+    # first use instead of on import
+    global _app
+    if name in ("app", "query_budget_guard"):
+        if _app is None:
+            _app = create_app()
+        return _app if name == "app" else _app.extensions[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _settings() -> Settings:
+    return current_app.config["settings"]
+
+
+def _url_key(url: URL) -> str:
+    return url.render_as_string(hide_password=True)
+
+
+def _database_labels(settings: Settings, pools: dict) -> dict[str, str]:
+    """
+    "primary", "replica0", ... for the engines' URLs: metrics don't show the
+    database host and user.
+    """
+    labels = {_url_key(settings.database_url): "primary"}
+    for i, url in enumerate(settings.db_replica_urls):
+        labels.setdefault(_url_key(make_url(url)), f"replica{i}")
+    for i, url in enumerate(url for url in pools if url not in labels):
+        labels[url] = f"other{i}"
+    return labels
+
+
+def collect_app_metrics(app: Flask) -> list[Metric]:
+    """Counters of the connection pools, caches and background workers."""
+    metrics: list[Metric] = []
+    pools = pool_stats()
+    database_labels = _database_labels(app.config["settings"], pools)
+    for key, name, type_, help in (
+        ("checked_out", "db_pool_checked_out", "gauge", "Connections in use."),
+        ("checkouts", "db_pool_checkouts_total", "counter", "Connections taken from the pool."),
+        (
+            "timeouts",
+            "db_pool_timeouts_total",
+            "counter",
+            "Checkouts that timed out waiting for a connection.",
+        ),
+        (
+            "wait_seconds_total",
+            "db_pool_wait_seconds_total",
+            "counter",
+            "Time spent waiting for a connection.",
+        ),
+    ):
+        samples = [
+            ((("database", database_labels[url]),), stats[key])
+            for url, stats in pools.items()
+            if key in stats
+        ]
+        metrics.append((name, type_, help, samples))
+
+    cache = getattr(app.config["session_storage"], "cache", None)
+    if cache is not None:
+        for key, value in cache.stats().items():
+            if key in ("size", "maxsize", "hit_rate"):
+                name, type_ = f"session_cache_{key}", "gauge"
+            else:
+                name, type_ = f"session_cache_{key}_total", "counter"
+            metrics.append((name, type_, f"Session cache {key}.", [((), value)]))
+
+    for key, value in app.extensions["response_pipeline"].stats().items():
+        metrics.append(
+            (f"response_pipeline_{key}_total", "counter", f"Response pipeline {key}.", [((), value)])
+        )
+
+    metrics.append(
+        (
+            "password_hash_rejected_total",
+            "counter",
+            "Logins rejected because the hashing pool was full.",
+            [((), get_password_hasher().rejected)],
+        )
+    )
+
+    admission = app.extensions["login_admission"]
+    metrics.append(
+        (
+            "login_rejected_total",
+            "counter",
+            "Login attempts rejected by admission control.",
+            [((("reason", reason),), value) for reason, value in admission.rejected.items()],
+        )
+    )
+
+    for replica_set in replica_sets():
+        metrics.append(
+            (
+                "db_replica_healthy",
+                "gauge",
+                "1 if the replica is in rotation.",
+                [
+                    (
+                        (("database", database_labels[_url_key(engine.url)]),),
+                        int(replica_set.is_healthy(engine)),
+                    )
+                    for engine in replica_set.replicas
+                ],
+            )
+        )
+        metrics.append(
+            (
+                "db_replica_failovers_total",
+                "counter",
+                "Times a replica was taken out of rotation.",
+                [((), replica_set.failovers)],
+            )
+        )
+
+    session_sweeper = app.extensions["session_sweeper"]
+    if session_sweeper is not None:
+        for key in ("runs", "rows_purged"):
+            value = getattr(session_sweeper, key)
+            metrics.append(
+                (f"session_sweeper_{key}_total", "counter", f"Session sweeper {key}.", [((), value)])
+            )
+        for key in ("sessions_count", "last_run_seconds"):
+            value = getattr(session_sweeper, key)
+            if value is not None:  # before the first run
+                metrics.append(
+                    (f"session_sweeper_{key}", "gauge", f"Session sweeper {key}.", [((), value)])
+                )
+    return metrics
+
+
+@main.app_errorhandler(HashingOverloaded)
+def hashing_overloaded(e):
+    r = make_response(
+        "Too many login attempts at the moment, try again later",
+        HTTPStatus.SERVICE_UNAVAILABLE.value,
+    )
+    r.headers["Retry-After"] = "1"
+    return r
+
+
+@main.app_errorhandler(LoginRejected)
+def login_rejected(e: LoginRejected):
+    r = make_response(
+        "Too many login attempts, try again later",
+        HTTPStatus.TOO_MANY_REQUESTS.value,
+    )
+    r.headers["Retry-After"] = str(math.ceil(e.retry_after))
+    return r
+
+
+def find_session() -> UserSession | None:
+    session_storage = cast(SessionStorage, current_app.config["session_storage"])
     cookie_storage = cast(CookieStorage, current_app.config["cookie_storage"])
 
-    session_uuid = cookie_storage.get_cookie_value()
-    user_session = session_storage.find_session(session_uuid)
+    cookie_value = cookie_storage.get_cookie_value()
+    user_session = session_storage.find_session(cookie_value)
     if user_session:
         g.logged_in = True
+        g.session_cookie = cookie_value
         return user_session
 
     return None
 
 
-@app.route("/", methods=["GET"])
+@main.route("/", methods=["GET"])
+@query_budget(1)
 def root():
     find_session()
     return render_template("index.html")
 
 
-@app.route("/register", methods=["GET"])
+@main.route("/register", methods=["GET"])
+@query_budget(1)
 def register_get():
     if find_session():
         return redirect("/")
@@ -73,7 +391,8 @@ def register_get():
     )
 
 
-@app.route("/register", methods=["POST"])
+@main.route("/register", methods=["POST"])
+@query_budget(3)
 def register_post():
     if find_session():
         return redirect("/")
@@ -88,7 +407,7 @@ def register_post():
     username = form.username.data
     password = form.password.data
 
-    user_storage = cast(UserStorageSqlAlchemy, current_app.config["user_storage"])
+    user_storage = cast(UserStorage, current_app.config["user_storage"])
 
     is_user_already_exists = user_storage.find_or_verify_user(username, password=None)
 
@@ -99,13 +418,14 @@ def register_post():
             form=form,
         )
 
-    hashed_password = generate_password_hash(password)
+    hashed_password = get_password_hasher().hash(password)
     user_storage.create_user(username, hashed_password)
     flash("You have successfully registered")
     return redirect("/login")
 
 
-@app.route("/login", methods=["GET"])
+@main.route("/login", methods=["GET"])
+@query_budget(1)
 def login_get():
     if find_session():
         return redirect("/")
@@ -116,11 +436,9 @@ def login_get():
     )
 
 
-@app.route("/login", methods=["POST"])
+@main.route("/login", methods=["POST"])
+@query_budget(3)
 def login_post():
-    if find_session():
-        return redirect("/")
-
     form = LoginForm()
 
     if not form.validate_on_submit():
@@ -131,35 +449,38 @@ def login_post():
     username = form.username.data
     password = form.password.data
 
-    user_storage = cast(UserStorageSqlAlchemy, current_app.config["user_storage"])
+    # rate limits before any database access (raises LoginRejected -> 429)
+    admission = cast(LoginAdmission, current_app.extensions["login_admission"])
+    with admission.attempt(request.remote_addr or "", username):
+        if find_session():
+            return redirect("/")
+
+        user_storage = cast(UserStorage, current_app.config["user_storage"])
 
-    user = user_storage.find_or_verify_user(
-        username, password
-    )  # поиск и проверка пользователя
+        user = user_storage.find_or_verify_user(
+            username, password
+        )  # поиск и проверка пользователя
 
     if not user:
         flash("Invalid username or password")
         return redirect("/login")
 
     session_uuid = str(uuid.uuid4())
-    session_storage = cast(
-        SessionStorageSqlAlchemy, current_app.config["session_storage"]
-    )
-    session_storage.create_session(session_uuid, user.id)
+    session_storage = cast(SessionStorage, current_app.config["session_storage"])
+    cookie_value = session_storage.create_session(session_uuid, user.id)
     r = make_response(redirect("/tasks"))
-    r.set_cookie(COOKIE_NAME, session_uuid, path="/", max_age=60 * 60)
+    r.set_cookie(COOKIE_NAME, cookie_value, path="/", max_age=_settings().session_ttl)
     return r
 
 
-@app.route("/logout", methods=["GET"])
+@main.route("/logout", methods=["GET"])
+@query_budget(2)
 def logout():
     user_session = find_session()
     if not user_session:
         return redirect("/")
 
-    session_storage = cast(
-        SessionStorageSqlAlchemy, current_app.config["session_storage"]
-    )
+    session_storage = cast(SessionStorage, current_app.config["session_storage"])
     session_storage.delete_session(user_session.session_uuid)  # delete on server
 
     r = make_response(redirect("/"))
@@ -169,20 +490,115 @@ def logout():
     return r
 
 
-@app.route("/tasks", methods=["GET"])
+@main.route("/tasks", methods=["GET"])
+@query_budget(4)  # 3 + the occasional session renewal
 def get_tasks():
     user_session = find_session()
     if not user_session:
         return abort(HTTPStatus.UNAUTHORIZED.value)
 
-    task_storage = cast(TaskStorageSqlAlchemy, current_app.config["task_storage"])
-    chores = task_storage.read_all(user_session.user_id)
-    r = make_response(render_template("tasks.html", tasks=chores, form=TaskForm()))
-    r.set_cookie(COOKIE_NAME, user_session.session_uuid, path="/", max_age=60 * 60)
+    # sliding expiry: an active user's session and cookie are renewed
+    session_storage = cast(SessionStorage, current_app.config["session_storage"])
+    cookie_value = session_storage.renew_session(user_session, g.session_cookie)
+
+    after_id = request.args.get("after", type=int)
+    # compared with tasks.id, out of the column's range the database errors out
+    if after_id is not None and not 0 <= after_id <= TASK_ID_MAX:
+        return abort(HTTPStatus.BAD_REQUEST.value)
+    limit = _page_limit()
+
+    task_storage = cast(TaskStorage, current_app.config["task_storage"])
+
+    # the page only depends on the task list, the query string and the session
+    # (CSRF token, nav bar), so an unchanged page is answered with 304
+    version = task_storage.read_version(user_session.user_id)
+    etag = _tasks_etag(user_session, version)
+    # weak comparison: the ETag is made weak when the page is compressed
+    if request.if_none_match.contains_weak(etag):
+        r = make_response("", HTTPStatus.NOT_MODIFIED.value)
+    else:
+        r = make_response(_render_tasks_page(task_storage, user_session, after_id, limit))
+        # rendering the form may have created the CSRF token
+        etag = _tasks_etag(user_session, version)
+    r.set_etag(etag)
+    r.headers["Cache-Control"] = "private, no-cache"
+    r.set_cookie(COOKIE_NAME, cookie_value, path="/", max_age=_settings().session_ttl)
     return r
 
 
-@app.route("/tasks/create", methods=["POST"])
+def _tasks_etag(user_session: UserSession, version: str) -> str:
+    # the forms carry a CSRF token tied to the Flask session cookie, not to
+    # ours: a page cached under another (or no) Flask session must not get a 304
+    csrf_token = session.get("csrf_token")
+    return hashlib.sha256(
+        f"{user_session.session_uuid}:{version}:{csrf_token}:{request.query_string}".encode()
+    ).hexdigest()
+
+
+def _page_limit() -> int:
+    limit = request.args.get("limit", default=_settings().tasks_page_size, type=int)
+    return max(1, min(limit, _settings().tasks_page_size_max))
+
+
+def _render_tasks_page(
+    task_storage: TaskStorage, user_session: UserSession, after_id, limit
+) -> str:
+    # one extra row tells us whether there is a next page
+    chores = task_storage.read_page(user_session.user_id, after_id, limit + 1)
+    next_url = None
+    if len(chores) > limit:
+        chores = chores[:limit]
+        next_url = url_for(
+            ".get_tasks", after=chores[-1].id, limit=request.args.get("limit")
+        )
+
+    return render_template(
+        "tasks.html",
+        tasks=chores,
+        task_count=task_storage.count_tasks(user_session.user_id),
+        form=TaskForm(),
+        first_url="/tasks" if after_id is not None else None,
+        next_url=next_url,
+    )
+
+
+@main.route("/tasks/search", methods=["GET"])
+@query_budget(3)
+def search_tasks():
+    """GET /tasks/search?q=...&offset=...: the user's tasks matching q, best first."""
+    user_session = find_session()
+    if not user_session:
+        return abort(HTTPStatus.UNAUTHORIZED.value)
+
+    query = request.args.get("q", "").strip()[:TASK_NAME_MAX_LENGTH]
+    if not query:
+        return redirect("/tasks")
+    offset = max(0, request.args.get("offset", default=0, type=int))
+    limit = _page_limit()
+
+    task_storage = cast(TaskStorage, current_app.config["task_storage"])
+    # one extra row tells us whether there is a next page
+    tasks = task_storage.search(user_session.user_id, query, offset, limit + 1)
+    next_url = None
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        next_url = url_for(
+            ".search_tasks", q=query, offset=offset + limit, limit=request.args.get("limit")
+        )
+
+    return render_template(
+        "tasks.html",
+        tasks=tasks,
+        task_count=task_storage.count_tasks(user_session.user_id),
+        form=TaskForm(),
+        query=query,
+        first_url=url_for(".search_tasks", q=query) if offset else None,
+        next_url=next_url,
+    )
+
+
+@main.route("/tasks/create", methods=["POST"])
+@query_budget(3)
 def create_task():
     user_session = find_session()
     if not user_session:
@@ -193,13 +609,14 @@ def create_task():
         return abort(HTTPStatus.BAD_REQUEST.value)
 
     task_name = form.task_name.data
-    task_storage = cast(TaskStorageSqlAlchemy, current_app.config["task_storage"])
+    task_storage = cast(TaskStorage, current_app.config["task_storage"])
     new_task = Task(name=task_name, user_id=user_session.user_id)
     task_storage.create(new_task)
     return redirect("/tasks")
 
 
-@app.route("/tasks/<int:id>/update", methods=["POST"])
+@main.route("/tasks/<int:id>/update", methods=["POST"])
+@query_budget(3)
 def update_task(id: int):
     """
     Пользователь открыл в браузере существующую задачу, отредактировал её и нажал
@@ -219,29 +636,287 @@ def update_task(id: int):
     if not user_session:
         return abort(HTTPStatus.UNAUTHORIZED.value)
 
-    task_storage = cast(TaskStorageSqlAlchemy, current_app.config["task_storage"])
-    task_to_update = task_storage.read_by_id(id, user_session.user_id)
-    if task_to_update is None:
-        return abort(404, f"Task with id = {id} not found")
-
     form = TaskForm()
     if not form.validate_on_submit():
         return abort(HTTPStatus.BAD_REQUEST.value)
 
-    task_to_update.name = form.task_name.data
-
-    task_storage.update(task_to_update)
+    task_storage = cast(TaskStorage, current_app.config["task_storage"])
+    # one UPDATE ... RETURNING, no rows means there is no such task of the user
+    if not task_storage.update_name(id, user_session.user_id, form.task_name.data):
+        return abort(404, f"Task with id = {id} not found")
     return redirect("/tasks")
 
-@app.route("/tasks/<int:id>/delete", methods=["GET"])
+@main.route("/tasks/<int:id>/delete", methods=["GET"])
+@query_budget(3)
 def delete_task(id: int):
     user_session = find_session()
     if not user_session:
         return abort(HTTPStatus.UNAUTHORIZED.value)
 
-    task_storage = cast(TaskStorageSqlAlchemy, current_app.config["task_storage"])
-    task_to_delete = task_storage.read_by_id(id, user_session.user_id)
-    if task_to_delete is None:
+    task_storage = cast(TaskStorage, current_app.config["task_storage"])
+    if not task_storage.delete_by_id(id, user_session.user_id):
         return abort(404, f"Task with id = {id} not found")
-    task_storage.delete(task_to_delete)
     return redirect("/tasks")
+
+
+TASK_NAME_MIN_LENGTH = 3
+TASK_NAME_MAX_LENGTH = 100
+TASK_ID_MAX = 2**31 - 1  # tasks.id is an INTEGER column
+API_STREAM_CHUNK_SIZE = 100  # tasks per chunk of the streamed /api/tasks response
+
+
+def _parse_batch_operation(operation) -> tuple[str, int | None, str | None] | None:
+    """Returns (op, task id, task name) or None if the operation is invalid."""
+    if not isinstance(operation, dict):
+        return None
+    op = operation.get("op")
+    task_id = operation.get("id")
+    name = operation.get("name")
+
+    has_valid_id = (
+        isinstance(task_id, int)
+        and not isinstance(task_id, bool)
+        and 1 <= task_id <= TASK_ID_MAX
+    )
+    has_valid_name = (
+        isinstance(name, str)
+        and TASK_NAME_MIN_LENGTH <= len(name) <= TASK_NAME_MAX_LENGTH
+    )
+    if op == "create" and has_valid_name:
+        return op, None, name
+    if op == "update" and has_valid_id and has_valid_name:
+        return op, task_id, name
+    if op == "delete" and has_valid_id:
+        return op, task_id, None
+    return None
+
+
+@main.route("/tasks/batch", methods=["POST"])
+@query_budget(5)
+def batch_tasks():
+    """
+    Applies many task changes in one request and one DB transaction.
+
+    ```
+    POST /tasks/batch
+    X-CSRFToken: ...
+
+    {"operations": [
+        {"op": "create", "name": "..."},
+        {"op": "update", "id": 1, "name": "..."},
+        {"op": "delete", "id": 2}
+    ]}
+    ```
+
+    The response has one result per operation, in the same order.
+    Creates, updates and deletes are applied as three statements, not in the
+    order given, so an id may appear in one operation only: all operations
+    on an id given more than once are "invalid" and none of them is applied.
+    """
+    user_session = find_session()
+    if not user_session:
+        return abort(HTTPStatus.UNAUTHORIZED.value)
+
+    payload = request.get_json(silent=True)
+    operations = payload.get("operations") if isinstance(payload, dict) else None
+    if not isinstance(operations, list):
+        return abort(HTTPStatus.BAD_REQUEST.value)
+    if len(operations) > _settings().tasks_batch_max_operations:
+        return abort(HTTPStatus.REQUEST_ENTITY_TOO_LARGE.value)
+
+    parsed = [_parse_batch_operation(operation) for operation in operations]
+    # an id in several operations: the outcome would depend on the statement
+    # order, not on the given one, so none of them is applied
+    id_counts = Counter(
+        task_id for _, task_id, _ in filter(None, parsed) if task_id is not None
+    )
+    parsed = [
+        None if operation is not None and id_counts[operation[1]] > 1 else operation
+        for operation in parsed
+    ]
+    names_to_create = [name for op, _, name in filter(None, parsed) if op == "create"]
+    names_to_update = {
+        task_id: name for op, task_id, name in filter(None, parsed) if op == "update"
+    }
+    ids_to_delete = [task_id for op, task_id, _ in filter(None, parsed) if op == "delete"]
+
+    task_storage = cast(TaskStorage, current_app.config["task_storage"])
+    created_ids, updated_ids, deleted_ids = task_storage.apply_batch(
+        user_session.user_id, names_to_create, names_to_update, ids_to_delete
+    )
+
+    results = []
+    created_ids_iter = iter(created_ids)
+    for operation in parsed:
+        if operation is None:
+            results.append({"status": "invalid"})
+            continue
+        op, task_id, _ = operation
+        if op == "create":
+            results.append({"op": op, "id": next(created_ids_iter), "status": "created"})
+        elif op == "update":
+            status = "updated" if task_id in updated_ids else "not_found"
+            results.append({"op": op, "id": task_id, "status": status})
+        else:
+            status = "deleted" if task_id in deleted_ids else "not_found"
+            results.append({"op": op, "id": task_id, "status": status})
+
+    return jsonify(results=results)
+
+
+def _task_to_json(task: Task) -> dict:
+    return {
+        "id": task.id,
+        "name": task.name,
+        "created_at": task.created_at.isoformat() if task.created_at else None,
+        "updated_at": task.updated_at.isoformat() if task.updated_at else None,
+    }
+
+
+def _api_error(status: HTTPStatus, message: str = "") -> Response:
+    r = jsonify(error=message or status.phrase)
+    r.status_code = status.value
+    return r
+
+
+def _read_task_name_from_json() -> str | None:
+    payload = request.get_json(silent=True)
+    name = payload.get("name") if isinstance(payload, dict) else None
+    if (
+        not isinstance(name, str)
+        or not TASK_NAME_MIN_LENGTH <= len(name) <= TASK_NAME_MAX_LENGTH
+    ):
+        return None
+    return name
+
+
+@main.route("/api/tasks", methods=["GET"])
+@query_budget(2)
+def api_get_tasks():
+    """
+    All tasks of the user as `{"tasks": [...]}`.
+    The list is streamed while it is read from the database, so the server
+    never holds the whole list in memory.
+    """
+    user_session = find_session()
+    if not user_session:
+        return _api_error(HTTPStatus.UNAUTHORIZED)
+
+    task_storage = cast(TaskStorage, current_app.config["task_storage"])
+    tasks = task_storage.iter_all(user_session.user_id)
+
+    def generate():
+        yield '{"tasks": ['
+        chunk = []
+        separator = ""
+        for task in tasks:
+            chunk.append(separator + json.dumps(_task_to_json(task), ensure_ascii=False))
+            separator = ","
+            if len(chunk) == API_STREAM_CHUNK_SIZE:
+                yield "".join(chunk)
+                chunk = []
+        yield "".join(chunk) + "]}"
+
+    return Response(generate(), mimetype="application/json")
+
+
+@main.route("/api/tasks/count", methods=["GET"])
+@query_budget(2)
+def api_count_tasks():
+    user_session = find_session()
+    if not user_session:
+        return _api_error(HTTPStatus.UNAUTHORIZED)
+
+    task_storage = cast(TaskStorage, current_app.config["task_storage"])
+    return jsonify(count=task_storage.count_tasks(user_session.user_id))
+
+
+@main.route("/api/tasks/search", methods=["GET"])
+@query_budget(2)
+def api_search_tasks():
+    user_session = find_session()
+    if not user_session:
+        return _api_error(HTTPStatus.UNAUTHORIZED)
+
+    query = request.args.get("q", "").strip()
+    if not query or len(query) > TASK_NAME_MAX_LENGTH:
+        return _api_error(
+            HTTPStatus.BAD_REQUEST, "q should contain 1-100 characters"
+        )
+    offset = max(0, request.args.get("offset", default=0, type=int))
+    limit = _page_limit()
+
+    task_storage = cast(TaskStorage, current_app.config["task_storage"])
+    tasks = task_storage.search(user_session.user_id, query, offset, limit + 1)
+    next_offset = offset + limit if len(tasks) > limit else None
+    return jsonify(
+        tasks=[_task_to_json(task) for task in tasks[:limit]], next_offset=next_offset
+    )
+
+
+@main.route("/api/tasks/<int:id>", methods=["GET"])
+@query_budget(2)
+def api_get_task(id: int):
+    user_session = find_session()
+    if not user_session:
+        return _api_error(HTTPStatus.UNAUTHORIZED)
+
+    task_storage = cast(TaskStorage, current_app.config["task_storage"])
+    task = task_storage.read_by_id(id, user_session.user_id)
+    if task is None:
+        return _api_error(HTTPStatus.NOT_FOUND, f"Task with id = {id} not found")
+    return jsonify(task=_task_to_json(task))
+
+
+@main.route("/api/tasks", methods=["POST"])
+@query_budget(3)
+def api_create_task():
+    user_session = find_session()
+    if not user_session:
+        return _api_error(HTTPStatus.UNAUTHORIZED)
+
+    name = _read_task_name_from_json()
+    if name is None:
+        return _api_error(
+            HTTPStatus.BAD_REQUEST, "Task name should contain 3-100 characters"
+        )
+
+    task_storage = cast(TaskStorage, current_app.config["task_storage"])
+    task_id = task_storage.create(Task(name=name, user_id=user_session.user_id))
+    r = jsonify(task={"id": task_id, "name": name})
+    r.status_code = HTTPStatus.CREATED.value
+    r.headers["Location"] = url_for(".api_get_task", id=task_id)
+    return r
+
+
+@main.route("/api/tasks/<int:id>", methods=["PUT"])
+@query_budget(3)
+def api_update_task(id: int):
+    user_session = find_session()
+    if not user_session:
+        return _api_error(HTTPStatus.UNAUTHORIZED)
+
+    name = _read_task_name_from_json()
+    if name is None:
+        return _api_error(
+            HTTPStatus.BAD_REQUEST, "Task name should contain 3-100 characters"
+        )
+
+    task_storage = cast(TaskStorage, current_app.config["task_storage"])
+    if not task_storage.update_name(id, user_session.user_id, name):
+        return _api_error(HTTPStatus.NOT_FOUND, f"Task with id = {id} not found")
+    return jsonify(task={"id": id, "name": name})
+
+
+@main.route("/api/tasks/<int:id>", methods=["DELETE"])
+@query_budget(3)
+def api_delete_task(id: int):
+    user_session = find_session()
+    if not user_session:
+        return _api_error(HTTPStatus.UNAUTHORIZED)
+
+    task_storage = cast(TaskStorage, current_app.config["task_storage"])
+    if not task_storage.delete_by_id(id, user_session.user_id):
+        return _api_error(HTTPStatus.NOT_FOUND, f"Task with id = {id} not found")
+    return "", HTTPStatus.NO_CONTENT.value
+
@@ -0,0 +1,107 @@
+"""
+Throughput of the sync storages (a thread per in-flight request, like a
+threaded WSGI server) vs the asyncio storages (one event loop) for the
+/tasks read path: find_session + read_page.
+
+Needs the database from .env with an up-to-date schema:
+
+    $ python migrate.py upgrade
+    $ python -m benchmarks.bench_async_storage --concurrency 50 200 1000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from Storage.async_storage_sql_alchemy import (
+    AsyncSessionStorageSqlAlchemy,
+    AsyncTaskStorageSqlAlchemy,
+)
+from Storage.session_storage_sql_alchemy import SessionStorageSqlAlchemy
+from Storage.task_storage_sql_alchemy import TaskStorageSqlAlchemy
+from Storage.user_storage_sql_alchemy import UserStorageSqlAlchemy
+
+PAGE_SIZE = 50
+
+
+def seed(tasks_count: int) -> str:
+    """Creates a user with `tasks_count` tasks and a session, returns the session uuid."""
+    login = f"bench-{uuid.uuid4().hex[:8]}"
+    user_storage = UserStorageSqlAlchemy()
+    user_storage.create_user(login, "not-a-real-hash")
+    user = user_storage.find_or_verify_user(login, password=None)
+
+    task_storage = TaskStorageSqlAlchemy()
+    for start in range(0, tasks_count, 1000):
+        names = [f"Task {i}" for i in range(start, min(start + 1000, tasks_count))]
+        task_storage.apply_batch(user.id, names, {}, [])
+
+    session_uuid = str(uuid.uuid4())
+    SessionStorageSqlAlchemy().create_session(session_uuid, user.id)
+    return session_uuid
+
+
+def run_sync(session_uuid: str, concurrency: int, requests: int) -> float:
+    session_storage = SessionStorageSqlAlchemy()
+    session_storage.cache = None  # measure the database, not the cache
+    task_storage = TaskStorageSqlAlchemy()
+
+    def handle_request(_) -> None:
+        user_session = session_storage.find_session(session_uuid)
+        task_storage.read_page(user_session.user_id, None, PAGE_SIZE)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(handle_request, range(requests)))
+    return requests / (time.perf_counter() - started)
+
+
+async def run_async(session_uuid: str, concurrency: int, requests: int) -> float:
+    session_storage = AsyncSessionStorageSqlAlchemy()
+    session_storage.cache = None
+    task_storage = AsyncTaskStorageSqlAlchemy()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def handle_request() -> None:
+        async with semaphore:
+            user_session = await session_storage.find_session(session_uuid)
+            await task_storage.read_page(user_session.user_id, None, PAGE_SIZE)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(handle_request() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    await session_storage.engine.dispose()
+    return requests / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--tasks", type=int, default=500, help="tasks of the test user")
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    session_uuid = seed(args.tasks)
+    results = []
+    for concurrency in args.concurrency:
+        sync_rps = run_sync(session_uuid, concurrency, args.requests)
+        async_rps = asyncio.run(run_async(session_uuid, concurrency, args.requests))
+        results.append(
+            {"concurrency": concurrency, "sync_rps": sync_rps, "async_rps": async_rps}
+        )
+        print(
+            f"concurrency={concurrency:<5} sync={sync_rps:8.1f} req/s  "
+            f"async={async_rps:8.1f} req/s"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
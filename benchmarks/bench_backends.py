@@ -0,0 +1,59 @@
+"""
+Runs bench_routes once per database backend and prints the results side by
+side, to decide whether a single-node deployment is fine on SQLite:
+
+    $ python -m benchmarks.bench_backends --tasks 100000
+
+PostgreSQL is taken from .env as usual, SQLite is a fresh file in a temporary
+directory. Extra arguments are passed on to bench_routes.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKENDS = ("postgresql", "sqlite")
+
+
+def run_backend(backend: str, workdir: str, bench_args: list) -> dict:
+    output = os.path.join(workdir, f"{backend}.json")
+    env = dict(os.environ, DATABASE_BACKEND=backend, STORAGE_BACKEND="sql")
+    if backend == "sqlite":
+        env["SQLITE_PATH"] = os.path.join(workdir, "bench.db")
+    # a separate process per backend: settings and engines are read at import time
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_routes", "--output", output, *bench_args],
+        env=env,
+        check=True,
+    )
+    with open(output) as f:
+        return json.load(f)["routes"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    args, bench_args = parser.parse_known_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = {
+            backend: run_backend(backend, workdir, bench_args)
+            for backend in args.backends
+        }
+
+    print()
+    print(f"{'route':<26}" + "".join(f"{backend:>28}" for backend in results))
+    routes = results[args.backends[0]].keys()
+    for route in routes:
+        cells = "".join(
+            f"{stats[route]['p95_ms']:10.2f}ms p95 {stats[route]['throughput_rps']:8.1f}/s"
+            for stats in results.values()
+        )
+        print(f"{route:<26}{cells}")
+
+
+if __name__ == "__main__":
+    main()
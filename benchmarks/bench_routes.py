@@ -0,0 +1,244 @@
+"""
+Route-level benchmark: seeds the configured database, then drives the routes
+through the WSGI app and reports latency percentiles, throughput and SQL
+query counts per route.
+
+Point .env (or the environment) at a scratch database first, the benchmark
+writes users, sessions and tasks into it:
+
+    $ python -m benchmarks.bench_routes --tasks 100000 --output bench.json
+    $ python -m benchmarks.bench_routes --tasks 100000 --baseline bench.json
+
+With --baseline the run is compared with an earlier result and the exit code
+is 1 if any route got slower than --max-regression or runs more queries.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import uuid
+from typing import Callable, Dict, List
+
+from sqlalchemy import insert
+
+import migrations
+from admission import LoginAdmission
+from app import COOKIE_NAME, app
+from entity.session import UserSession
+from entity.task import Task
+from entity.user import User
+from password_hasher import get_password_hasher
+from query_budget import QueryCounter
+from Storage.engine import get_engine
+from Storage.task_counters import reconcile
+
+PASSWORD = "benchmark-password"
+WORDS = ["buy milk", "call mom", "write report", "fix bug", "book tickets"]
+SEED_CHUNK_SIZE = 10000
+
+
+def seed(users: int, tasks: int, tasks_per_other_user: int) -> dict:
+    """
+    Creates `users` users with one session each. The first one ("power user")
+    gets `tasks` tasks, every other user `tasks_per_other_user`.
+    """
+    engine = get_engine()
+    migrations.upgrade(engine)
+    prefix = uuid.uuid4().hex[:8]
+    hashed_password = get_password_hasher().hash(PASSWORD)
+
+    with engine.begin() as connection:
+        user_ids = connection.execute(
+            insert(User).returning(User.id, sort_by_parameter_order=True),
+            [
+                {"login": f"b{prefix}-{i}", "db_hashed_password": hashed_password}
+                for i in range(users)
+            ],
+        ).scalars().all()
+        session_uuids = [str(uuid.uuid4()) for _ in user_ids]
+        connection.execute(
+            insert(UserSession),
+            [
+                {"session_uuid": session_uuid, "user_id": user_id}
+                for session_uuid, user_id in zip(session_uuids, user_ids)
+            ],
+        )
+
+    def task_rows():
+        for n, user_id in enumerate(user_ids):
+            count = tasks if n == 0 else tasks_per_other_user
+            for i in range(count):
+                yield {"name": f"Task {i} {WORDS[i % len(WORDS)]}", "user_id": user_id}
+
+    chunk = []
+    for row in task_rows():
+        chunk.append(row)
+        if len(chunk) == SEED_CHUNK_SIZE:
+            with engine.begin() as connection:
+                connection.execute(insert(Task), chunk)
+            chunk = []
+    if chunk:
+        with engine.begin() as connection:
+            connection.execute(insert(Task), chunk)
+    reconcile(engine)  # the inserts above bypass the task counters
+
+    return {
+        "login": f"b{prefix}-0",
+        "user_id": user_ids[0],
+        "session_uuid": session_uuids[0],
+    }
+
+
+def measure(name: str, requests: int, send: Callable[[int], object]) -> dict:
+    latencies: List[float] = []
+    started = time.perf_counter()
+    with QueryCounter(get_engine()) as counter:
+        for i in range(requests):
+            request_started = time.perf_counter()
+            response = send(i)
+            latencies.append(time.perf_counter() - request_started)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{name} returned {response.status_code}")
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+    return {
+        "requests": requests,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "throughput_rps": requests / elapsed,
+        "queries_per_request": counter.count / requests,
+    }
+
+
+def run(seeded: dict, requests: int, login_requests: int) -> Dict[str, dict]:
+    app.config["TESTING"] = True
+    app.config["WTF_CSRF_ENABLED"] = False
+    # one user logs in from one address over and over: lift the login rate
+    # limits, the benchmark measures the login itself
+    app.extensions["login_admission"] = LoginAdmission(
+        ip_per_minute=60_000,
+        ip_burst=login_requests,
+        username_per_minute=60_000,
+        username_burst=login_requests,
+        max_keys=10,
+        max_concurrent=login_requests,
+    )
+    results = {}
+
+    with app.test_client() as client:
+
+        def login(i: int):
+            # logged-in clients are only redirected, every attempt must log in
+            client.delete_cookie(COOKIE_NAME)
+            return client.post(
+                "/login", data={"username": seeded["login"], "password": PASSWORD}
+            )
+
+        results["POST /login"] = measure("POST /login", login_requests, login)
+        client.set_cookie(COOKIE_NAME, seeded["session_uuid"])
+
+        results["GET /tasks"] = measure("GET /tasks", requests, lambda i: client.get("/tasks"))
+        results["GET /tasks/search"] = measure(
+            "GET /tasks/search",
+            requests,
+            lambda i: client.get(f"/tasks/search?q=Task {i}"),
+        )
+        results["POST /tasks/create"] = measure(
+            "POST /tasks/create",
+            requests,
+            lambda i: client.post("/tasks/create", data={"task_name": f"New task {i}"}),
+        )
+
+        task_storage = app.config["task_storage"]
+        task_ids = [
+            task.id
+            for task in task_storage.read_page(seeded["user_id"], None, requests)
+        ]
+        results["POST /tasks/<id>/update"] = measure(
+            "POST /tasks/<id>/update",
+            len(task_ids),
+            lambda i: client.post(
+                f"/tasks/{task_ids[i]}/update", data={"task_name": f"Renamed {i}"}
+            ),
+        )
+        results["GET /tasks/<id>/delete"] = measure(
+            "GET /tasks/<id>/delete",
+            len(task_ids),
+            lambda i: client.get(f"/tasks/{task_ids[i]}/delete"),
+        )
+    return results
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> bool:
+    ok = True
+    for route, current in results["routes"].items():
+        previous = baseline["routes"].get(route)
+        if previous is None:
+            continue
+        change = current["p95_ms"] / previous["p95_ms"] - 1
+        more_queries = current["queries_per_request"] > previous["queries_per_request"]
+        failed = change > max_regression or more_queries
+        ok = ok and not failed
+        print(
+            f"{'FAIL' if failed else 'ok  '} {route:<26} p95 {change:+7.1%}  "
+            f"queries {previous['queries_per_request']:.1f} -> "
+            f"{current['queries_per_request']:.1f}"
+        )
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=1000, help="tasks of the measured user")
+    parser.add_argument("--tasks-per-other-user", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=500, help="requests per route")
+    parser.add_argument("--login-requests", type=int, default=20)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="earlier --output file to compare with")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    seed_started = time.perf_counter()
+    seeded = seed(args.users, args.tasks, args.tasks_per_other_user)
+    print(f"Seeded in {time.perf_counter() - seed_started:.1f}s")
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "database": get_engine().dialect.name,
+            "python": platform.python_version(),
+            "users": args.users,
+            "tasks": args.tasks,
+            "tasks_per_other_user": args.tasks_per_other_user,
+        },
+        "routes": run(seeded, args.requests, args.login_requests),
+    }
+
+    for route, stats in results["routes"].items():
+        print(
+            f"{route:<26} p50 {stats['p50_ms']:7.2f}ms  p95 {stats['p95_ms']:7.2f}ms  "
+            f"p99 {stats['p99_ms']:7.2f}ms  {stats['throughput_rps']:8.1f} req/s  "
+            f"{stats['queries_per_request']:.1f} queries"
+        )
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import SecretStr
+from typing import List, Literal, Optional
+from sqlalchemy import URL
 
 """
 библиотека Pydantic используется для управления конфигурацией приложения на основе переменных окружения. 
@@ -27,11 +29,107 @@ class Settings(BaseSettings):
     """
 
     secret_key: str
-    postgresql_database: str
-    postgresql_username: str
-    postgresql_password: SecretStr
-    postgresql_hostname: str
-    postgresql_port: str
+    # "postgresql" or "sqlite" (single-node deployments, see Storage/engine.py)
+    database_backend: Literal["postgresql", "sqlite"] = "postgresql"
+
+    # only needed when database_backend is "postgresql"
+    postgresql_database: str = ""
+    postgresql_username: str = ""
+    postgresql_password: SecretStr = SecretStr("")
+    postgresql_hostname: str = ""
+    postgresql_port: str = "5432"
+
+    # only needed when database_backend is "sqlite"
+    sqlite_path: str = "task_tracker.db"
+    sqlite_cache_size_kib: int = 65536  # page cache per connection
+    sqlite_busy_timeout_ms: int = 5000  # wait for other processes' writes
+
+    # connection pool shared by all storages (see Storage/engine.py)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0  # seconds to wait for a free connection
+    db_pool_pre_ping: bool = True
+    db_pool_recycle: int = 1800  # seconds, -1 disables recycling
+    db_statement_timeout_ms: int = 30000  # 0 disables the timeout
+    db_echo: bool = False  # logs every statement, for local debugging only
+
+    # read replicas of the database (see Storage/replicas.py), empty = none
+    db_replica_urls: List[str] = []
+    db_replica_check_interval: float = 5.0  # seconds between health checks
+    db_replica_read_after_write: float = 5.0  # seconds a client reads from the primary after a write
+
+    # "sql": database_backend through SQLAlchemy, "memory": Storage/memory_storage.py
+    storage_backend: Literal["sql", "memory"] = "sql"
+
+    # in-process cache for SessionStorageSqlAlchemy.find_session
+    session_cache_enabled: bool = True
+    session_cache_size: int = 10000
+    session_cache_ttl: float = 30.0  # seconds
+    session_cache_negative_ttl: float = 5.0  # seconds to remember "not found"
+
+    # server-side session lifetime and the background purge of expired rows
+    # seconds since the last renewal, also the cookie max_age; GET /tasks renews
+    # the session and the cookie, at most every session_renew_interval seconds
+    session_ttl: int = 3600
+    session_renew_interval: int = 300
+    session_sweeper_enabled: bool = False
+    session_sweep_interval: float = 300.0  # seconds between purge runs
+    session_sweep_batch_size: int = 1000  # rows deleted per transaction
+    session_sweep_pause: float = 0.1  # seconds between batches
+
+    # "database": the cookie holds a session uuid looked up in the sessions table
+    # "signed": the cookie holds an HMAC-signed token, checked without the database
+    session_mode: Literal["database", "signed"] = "database"
+    # previous SECRET_KEY values, tokens signed with them are still accepted
+    session_signing_old_keys: List[str] = []
+    session_revocation_refresh: float = 30.0  # seconds between reloads of logouts
+
+    # /tasks pagination
+    tasks_page_size: int = 50
+    tasks_page_size_max: int = 500
+
+    # POST /tasks/batch
+    tasks_batch_max_operations: int = 1000
+
+    # password hashing pool (see password_hasher.py)
+    password_hash_method: str = "scrypt"  # werkzeug method, e.g. "pbkdf2:sha256:1000000"
+    password_hash_workers: int = 2
+    password_hash_max_queue: int = 32
+
+    # admission control for POST /login (see admission.py)
+    login_ip_per_minute: float = 20.0
+    login_ip_burst: int = 20
+    login_username_per_minute: float = 5.0
+    login_username_burst: int = 5
+    login_buckets_max_keys: int = 50000  # per table (IPs, usernames), LRU beyond
+    login_max_concurrent: int = 8  # logins verified at the same time per process
+
+    # response post-processing (see response_pipeline.py)
+    response_minify_enabled: bool = True
+    response_compression_enabled: bool = True
+    response_compression_min_size: int = 1024  # bytes, smaller bodies are sent as is
+    response_gzip_level: int = 6
+    response_brotli_quality: int = 5  # only used if the brotli package is installed
+
+    # request metrics at /metrics in Prometheus format (see metrics.py);
+    # scrapers send "Authorization: Bearer <metrics_token>", no token = no /metrics
+    metrics_enabled: bool = True
+    metrics_token: str = ""
+
+    # slow query log (see slow_query_log.py)
+    slow_query_log_enabled: bool = True
+    slow_query_threshold_ms: float = 200.0
+    slow_query_sample_rate: float = 0.0  # share of the other statements to log, 0..1
+    slow_query_log_file: str = ""  # empty = stderr
+
+    # production server (gunicorn.conf.py)
+    server_bind: str = "127.0.0.1:5000"
+    server_workers: int = 2  # processes
+    server_threads: int = 4  # request threads per process
+    # reverse proxies in front of the app whose X-Forwarded-For/-Proto are
+    # trusted (request.remote_addr is the client, not the proxy); 0 = none,
+    # clients connect directly; set it in the deployment's .env
+    trusted_proxy_hops: int = 0
 
     model_config = SettingsConfigDict(env_file=".env")
     """
@@ -41,10 +139,52 @@ class Settings(BaseSettings):
 
     """
 
+    @property
+    def database_url(self) -> URL:
+        if self.database_backend == "sqlite":
+            return URL.create("sqlite", database=self.sqlite_path)
+        return URL.create(
+            "postgresql+pg8000",
+            username=self.postgresql_username,
+            password=self.postgresql_password.get_secret_value(),
+            host=self.postgresql_hostname,
+            port=int(self.postgresql_port),
+            database=self.postgresql_database,
+        )
+
+    @property
+    def async_database_url(self) -> URL:
+        if self.database_backend == "sqlite":
+            return self.database_url.set(drivername="sqlite+aiosqlite")
+        return self.database_url.set(drivername="postgresql+asyncpg")
+
+
+_settings: Optional[Settings] = None
+
+
+def get_settings() -> Settings:
+    """Settings of the process, read on first use (not when the module is imported)."""
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
+
+
+def configure(settings: Settings) -> None:
+    """Use `settings` instead of reading the environment (create_app(settings))."""
+    global _settings
+    _settings = settings
+
+
+def __getattr__(name: str):
+    # `from config_reader import env_config` still works, it reads the settings then
+    if name == "env_config":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
-env_config = Settings()
 """
-В этой строке мы создаем экземпляр класса Settings. При создании экземпляра Pydantic автоматически загружает значения из переменных окружения и файла .env, если они указаны, и инициализирует атрибуты класса соответствующими значениями.
+В get_settings() мы создаем экземпляр класса Settings (один раз, при первом обращении). При создании экземпляра Pydantic автоматически загружает значения из переменных окружения и файла .env, если они указаны, и инициализирует атрибуты класса соответствующими значениями.
 
 Заключение
 
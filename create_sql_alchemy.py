@@ -1,13 +1,16 @@
-from sqlalchemy import create_engine
+"""Recreates the database from scratch. To keep the data use `python migrate.py upgrade`."""
 
-from config_reader import env_config
+import migrations
 from entity.base import Base
+from Storage.engine import get_engine
 
 from entity.task import Task # noqa: F401
 from entity.user import User # noqa: F401
 from entity.session import UserSession # noqa: F401
+from entity.revoked_session import RevokedSession # noqa: F401
+from entity.task_counter import UserTaskCounter # noqa: F401
 
-connection_str = f"postgresql+pg8000://{env_config.postgresql_username}:{env_config.postgresql_password}@{env_config.postgresql_hostname}:{env_config.postgresql_port}/{env_config.postgresql_database}"
-engine = create_engine(connection_str, echo=True)
+engine = get_engine()
 Base.metadata.drop_all(engine)
-Base.metadata.create_all(engine)
+migrations.schema_version.drop(engine, checkfirst=True)
+migrations.upgrade(engine)
@@ -0,0 +1,13 @@
+from sqlalchemy import String, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+import datetime
+from entity.base import Base
+
+
+class RevokedSession(Base):
+    """Signed session tokens that were logged out before they expired."""
+
+    __tablename__ = "revoked_sessions"  # название таблицы в БД (смотри через DBeaver)
+
+    session_uuid: Mapped[str] = mapped_column(String(36), primary_key=True)
+    expires_at: Mapped[datetime.datetime] = mapped_column(DateTime, index=True)
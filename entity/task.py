@@ -1,4 +1,4 @@
-from sqlalchemy import func, String, Integer, ForeignKey
+from sqlalchemy import func, String, Integer, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column
 import datetime
 from entity.base import Base
@@ -6,6 +6,7 @@ from entity.base import Base
 
 class Task(Base):
     __tablename__ = "tasks"  # название таблицы в БД (смотри через DBeaver)
+    __table_args__ = (Index("ix_tasks_user_id_id", "user_id", "id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String)
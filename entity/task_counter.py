@@ -0,0 +1,16 @@
+from sqlalchemy import ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+from entity.base import Base
+
+
+class UserTaskCounter(Base):
+    """
+    Number of tasks of a user and a counter of changes to them, updated in the
+    same transaction as the tasks (see Storage/task_counters.py).
+    """
+
+    __tablename__ = "user_task_counters"  # название таблицы в БД (смотри через DBeaver)
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    task_count: Mapped[int] = mapped_column(Integer, default=0)
+    version: Mapped[int] = mapped_column(Integer, default=0)
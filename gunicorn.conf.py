@@ -0,0 +1,19 @@
+"""
+gunicorn settings, see run.sh:
+
+    gunicorn -c gunicorn.conf.py "app:create_app()"
+"""
+
+from config_reader import get_settings
+
+_settings = get_settings()
+
+bind = _settings.server_bind
+workers = _settings.server_workers
+threads = _settings.server_threads
+
+# every worker builds its own app after the fork: connection pools and the
+# background threads (session sweeper, replica health checks, slow query log)
+# don't survive a fork. If the app is ever preloaded, Storage/engine.py drops
+# the inherited connections in each child (os.register_at_fork).
+preload_app = False
@@ -0,0 +1,224 @@
+"""
+Request metrics in Prometheus text format.
+
+Histograms are sharded per thread: every thread increments its own
+preallocated list of bucket counters, so recording takes no lock. Only the
+first observation of a thread (or of a new label set) takes a lock, and
+/metrics adds the shards up.
+"""
+
+import bisect
+import hmac
+import threading
+import time
+from http import HTTPStatus
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import Flask, Response, g, request
+from sqlalchemy import Engine, event
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 7, 10, 15, 20, 50, 100)
+
+Labels = Tuple[Tuple[str, str], ...]
+# (name, type, help, [(labels, value)])
+Metric = Tuple[str, str, str, List[Tuple[Labels, float]]]
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._shards: List[List[float]] = []  # [bucket counts..., +Inf count, sum]
+        self._shards_lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = [0.0] * (len(self.buckets) + 2)
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        shard[bisect.bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self) -> Tuple[List[float], float, float]:
+        """Cumulative bucket counts (the last one is +Inf), count and sum."""
+        totals = [0.0] * (len(self.buckets) + 2)
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for i, value in enumerate(shard):
+                totals[i] += value
+        cumulative = []
+        running = 0.0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, totals[-1]
+
+
+class HistogramFamily:
+    """Histograms of one metric, one per label values."""
+
+    def __init__(
+        self, name: str, help: str, label_names: Sequence[str], buckets: Sequence[float]
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = buckets
+        self._children: Dict[tuple, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str) -> Histogram:
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, Histogram(self.buckets))
+        return child
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, histogram in sorted(self._children.items()):
+            labels = list(zip(self.label_names, values))
+            cumulative, count, total = histogram.snapshot()
+            bounds = [_format_value(b) for b in histogram.buckets] + ["+Inf"]
+            for bound, bucket_count in zip(bounds, cumulative):
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(labels + [('le', bound)])} "
+                    f"{_format_value(bucket_count)}"
+                )
+            lines.append(f"{self.name}_count{_format_labels(labels)} {_format_value(count)}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+        return lines
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    labels = list(labels)
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class _RequestState(threading.local):
+    active = False
+    queries = 0
+    db_seconds = 0.0
+
+
+class RequestMetrics:
+    """
+    Records latency per route, method and status, and the SQL statements and
+    database time of each request (from engine events of the instrumented
+    engines). Other parts of the app add their numbers with add_collector().
+    """
+
+    def __init__(self) -> None:
+        self.request_seconds = HistogramFamily(
+            "http_request_duration_seconds",
+            "Request latency.",
+            ("route", "method", "status"),
+            LATENCY_BUCKETS,
+        )
+        self.request_queries = HistogramFamily(
+            "http_request_sql_queries",
+            "SQL statements executed per request.",
+            ("route",),
+            QUERY_COUNT_BUCKETS,
+        )
+        self.request_db_seconds = HistogramFamily(
+            "http_request_db_duration_seconds",
+            "Time spent in SQL statements per request.",
+            ("route",),
+            LATENCY_BUCKETS,
+        )
+        self._collectors: List[Callable[[], Iterable[Metric]]] = []
+        self._state = _RequestState()
+        self.token = ""
+
+    def init_app(
+        self, app: Flask, endpoint: Optional[str] = "/metrics", token: str = ""
+    ) -> None:
+        """
+        `endpoint` answers only requests with "Authorization: Bearer <token>"
+        and is not registered at all without a token.
+        """
+        # register before other after_request handlers: they run in reverse
+        # order, so the latency includes them
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+        self.token = token
+        if endpoint and token:
+            app.add_url_rule(endpoint, "metrics", self.metrics_view)
+
+    def instrument_engine(self, engine: Engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "after_cursor_execute", self._after_execute)
+
+    def uninstrument_engine(self, engine: Engine) -> None:
+        if event.contains(engine, "before_cursor_execute", self._before_execute):
+            event.remove(engine, "before_cursor_execute", self._before_execute)
+            event.remove(engine, "after_cursor_execute", self._after_execute)
+
+    def add_collector(self, collector: Callable[[], Iterable[Metric]]) -> None:
+        self._collectors.append(collector)
+
+    def _start(self) -> None:
+        g.metrics_started = time.perf_counter()
+        self._state.active = True
+        self._state.queries = 0
+        self._state.db_seconds = 0.0
+
+    def _finish(self, response: Response) -> Response:
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return response
+        route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        self.request_seconds.labels(route, request.method, str(response.status_code)).observe(
+            time.perf_counter() - started
+        )
+        self.request_queries.labels(route).observe(self._state.queries)
+        self.request_db_seconds.labels(route).observe(self._state.db_seconds)
+        return response
+
+    def _teardown(self, exc: Optional[BaseException]) -> None:
+        self._state.active = False
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self._state.active:
+            conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self._state.active and conn.info.get("metrics_started"):
+            self._state.queries += 1
+            self._state.db_seconds += time.perf_counter() - conn.info["metrics_started"].pop()
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for family in (self.request_seconds, self.request_queries, self.request_db_seconds):
+            lines.extend(family.render())
+        for collector in self._collectors:
+            for name, type_, help, samples in collector():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {type_}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def metrics_view(self) -> Response:
+        authorization = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(authorization.encode(), f"Bearer {self.token}".encode()):
+            return Response(
+                "Unauthorized", HTTPStatus.UNAUTHORIZED, {"WWW-Authenticate": "Bearer"}
+            )
+        return Response(self.render(), mimetype="text/plain; version=0.0.4")
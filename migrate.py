@@ -0,0 +1,35 @@
+import argparse
+
+import migrations
+from Storage.engine import get_engine
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Database schema migrations")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    upgrade_parser = subparsers.add_parser("upgrade", help="apply pending migrations")
+    upgrade_parser.add_argument("--to", type=int, help="stop at this version")
+    subparsers.add_parser("current", help="print the current schema version")
+    subparsers.add_parser("list", help="list all migrations")
+
+    args = parser.parse_args()
+    engine = get_engine()
+
+    if args.command == "upgrade":
+        applied = migrations.upgrade(engine, target=args.to)
+        if not applied:
+            print("Database is up to date")
+        for version in applied:
+            print(f"Applied migration {version:04d}")
+    elif args.command == "current":
+        print(migrations.current_version(engine))
+    else:
+        current = migrations.current_version(engine)
+        for version, module in migrations.discover():
+            mark = "x" if version <= current else " "
+            print(f"[{mark}] {version:04d} {module.description}")
+
+
+if __name__ == "__main__":
+    main()
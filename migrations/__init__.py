@@ -0,0 +1,121 @@
+"""
+Versioned schema migrations.
+
+Every module in migrations/versions is one migration named v<NNNN>_<name>.py
+with a `description` string and an `upgrade(connection)` function.
+Applied versions are recorded in the schema_version table, each migration
+runs in its own transaction together with its schema_version row.
+Statements that can't run in a transaction (CREATE INDEX CONCURRENTLY) go in
+an autocommit_block().
+
+Run them with `python migrate.py`.
+"""
+
+import datetime
+import importlib
+import pkgutil
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import (
+    Column,
+    Connection,
+    DateTime,
+    Engine,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    func,
+    insert,
+    select,
+    text,
+)
+
+from migrations import versions
+
+metadata = MetaData()
+
+schema_version = Table(
+    "schema_version",
+    metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False, server_default=func.now()),
+)
+
+
+def discover() -> List[Tuple[int, ModuleType]]:
+    """All migrations sorted by version."""
+    result = []
+    for module_info in pkgutil.iter_modules(versions.__path__):
+        name = module_info.name
+        if not name.startswith("v"):
+            continue
+        version = int(name[1:].split("_", 1)[0])
+        module = importlib.import_module(f"{versions.__name__}.{name}")
+        result.append((version, module))
+    result.sort(key=lambda item: item[0])
+    return result
+
+
+def current_version(engine: Engine) -> int:
+    with engine.begin() as connection:
+        schema_version.create(connection, checkfirst=True)
+        version = connection.execute(
+            select(func.max(schema_version.c.version))
+        ).scalar()
+    return version or 0
+
+
+def upgrade(engine: Engine, target: Optional[int] = None) -> List[int]:
+    """Applies pending migrations up to `target` (all by default)."""
+    applied = []
+    current = current_version(engine)
+    for version, module in discover():
+        if version <= current or (target is not None and version > target):
+            continue
+        with engine.connect() as connection:  # rolled back if not committed
+            module.upgrade(connection)
+            connection.execute(
+                insert(schema_version).values(
+                    version=version,
+                    description=module.description,
+                    applied_at=datetime.datetime.now(),
+                )
+            )
+            connection.commit()
+        applied.append(version)
+    return applied
+
+
+@contextmanager
+def autocommit_block(connection: Connection) -> Iterator[Connection]:
+    """
+    On PostgreSQL: commits what the migration did so far and runs the block
+    in autocommit mode, every statement on its own; the rest of the migration
+    gets a new transaction. Elsewhere the block stays in the transaction.
+    """
+    if connection.dialect.name != "postgresql":
+        yield connection
+        return
+    connection.commit()
+    connection.execution_options(isolation_level="AUTOCOMMIT")
+    try:
+        yield connection
+    finally:
+        connection.execution_options(isolation_level=connection.default_isolation_level)
+
+
+def drop_invalid_index(connection: Connection, name: str) -> None:
+    """
+    Drops index `name` if a failed CREATE INDEX CONCURRENTLY left it behind
+    invalid: "checkfirst" would keep it. PostgreSQL only, in an autocommit_block().
+    """
+    invalid = connection.execute(
+        text("SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"),
+        {"name": name},
+    ).scalar()
+    if invalid:
+        connection.execute(text(f'DROP INDEX CONCURRENTLY "{name}"'))
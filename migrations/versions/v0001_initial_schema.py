@@ -0,0 +1,47 @@
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    func,
+)
+
+description = "users, tasks and sessions tables"
+
+# The schema as create_sql_alchemy.py used to create it. Tables are only
+# created if missing, so databases made by that script are adopted as-is.
+metadata = MetaData()
+
+Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("login", String(25), unique=True, nullable=False),
+    Column("db_hashed_password", String(255), nullable=False),
+)
+
+Table(
+    "tasks",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("created_at", DateTime, nullable=False, server_default=func.now()),
+    Column("updated_at", DateTime, nullable=False, server_default=func.now()),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+)
+
+Table(
+    "sessions",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("session_uuid", String(36), unique=True, nullable=False),
+    Column("created_at", DateTime, nullable=False, server_default=func.now()),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+)
+
+
+def upgrade(connection) -> None:
+    metadata.create_all(connection, checkfirst=True)
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Index, Integer, MetaData, Table, text
+
+from migrations import autocommit_block, drop_invalid_index
+
+description = "index tasks(user_id, id) for per-user task listing"
+
+# just the indexed columns, the migration doesn't depend on the models
+tasks = Table("tasks", MetaData(), Column("id", Integer), Column("user_id", Integer))
+
+
+def upgrade(connection) -> None:
+    # read_all / read_page / read_by_id all filter by user_id and order by id
+    if connection.dialect.name != "postgresql":
+        connection.execute(
+            text("CREATE INDEX IF NOT EXISTS ix_tasks_user_id_id ON tasks (user_id, id)")
+        )
+        return
+    # CONCURRENTLY: tasks stay writable while the index is built, which a
+    # plain CREATE INDEX would block; it can't run in a transaction
+    index = Index(
+        "ix_tasks_user_id_id", tasks.c.user_id, tasks.c.id, postgresql_concurrently=True
+    )
+    with autocommit_block(connection):
+        drop_invalid_index(connection, index.name)
+        index.create(connection, checkfirst=True)
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, Table, text
+
+from migrations import autocommit_block, drop_invalid_index
+
+description = "index sessions(user_id) and sessions(created_at)"
+
+# just the indexed columns, the migration doesn't depend on the models
+sessions = Table(
+    "sessions", MetaData(), Column("user_id", Integer), Column("created_at", DateTime)
+)
+
+
+def upgrade(connection) -> None:
+    if connection.dialect.name != "postgresql":
+        connection.execute(
+            text("CREATE INDEX IF NOT EXISTS ix_sessions_user_id ON sessions (user_id)")
+        )
+        connection.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_sessions_created_at ON sessions (created_at)"
+            )
+        )
+        return
+    # sessions is read on every request: keep it writable during the build
+    # (see v0002)
+    indexes = [
+        Index("ix_sessions_user_id", sessions.c.user_id, postgresql_concurrently=True),
+        Index("ix_sessions_created_at", sessions.c.created_at, postgresql_concurrently=True),
+    ]
+    with autocommit_block(connection):
+        for index in indexes:
+            drop_invalid_index(connection, index.name)
+            index.create(connection, checkfirst=True)
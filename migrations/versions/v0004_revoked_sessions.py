@@ -0,0 +1,16 @@
+from sqlalchemy import Column, DateTime, MetaData, String, Table
+
+description = "revoked_sessions table for signed session tokens"
+
+metadata = MetaData()
+
+Table(
+    "revoked_sessions",
+    metadata,
+    Column("session_uuid", String(36), primary_key=True),
+    Column("expires_at", DateTime, nullable=False, index=True),
+)
+
+
+def upgrade(connection) -> None:
+    metadata.create_all(connection)
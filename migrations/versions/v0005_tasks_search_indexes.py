@@ -0,0 +1,49 @@
+from sqlalchemy import (
+    Column,
+    Index,
+    MetaData,
+    String,
+    Table,
+    column,
+    func,
+    literal_column,
+    text,
+)
+
+from migrations import autocommit_block, drop_invalid_index
+
+description = "full-text and trigram indexes on tasks.name (PostgreSQL only)"
+
+# just the indexed column, the migration doesn't depend on the models
+tasks = Table(
+    "tasks",
+    MetaData(),
+    Column("name", String),
+    # expression index instead of a tsvector column: nothing to keep in sync,
+    # the query must use the same expression, to_tsvector('simple', name)
+    Index(
+        "ix_tasks_name_tsvector",
+        func.to_tsvector(literal_column("'simple'::regconfig"), column("name")),
+        postgresql_using="gin",
+        postgresql_concurrently=True,
+    ),
+    Index(
+        "ix_tasks_name_trgm",
+        "name",
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+        postgresql_concurrently=True,
+    ),
+)
+
+
+def upgrade(connection) -> None:
+    # TaskStorageSqlAlchemy.search falls back to LIKE on other databases
+    if connection.dialect.name != "postgresql":
+        return
+    connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    # GIN builds on a big table are slow: keep tasks writable meanwhile (see v0002)
+    with autocommit_block(connection):
+        for index in sorted(tasks.indexes, key=lambda index: index.name):
+            drop_invalid_index(connection, index.name)
+            index.create(connection, checkfirst=True)
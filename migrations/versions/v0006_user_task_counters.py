@@ -0,0 +1,24 @@
+from sqlalchemy import Column, ForeignKey, Integer, MetaData, Table, text
+
+description = "user_task_counters table, filled from tasks"
+
+metadata = MetaData()
+
+Table("users", metadata, Column("id", Integer, primary_key=True))
+Table(
+    "user_task_counters",
+    metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("task_count", Integer, nullable=False),
+    Column("version", Integer, nullable=False),
+)
+
+
+def upgrade(connection) -> None:
+    metadata.tables["user_task_counters"].create(connection, checkfirst=True)
+    connection.execute(
+        text(
+            "INSERT INTO user_task_counters (user_id, task_count, version) "
+            "SELECT user_id, count(*), 1 FROM tasks GROUP BY user_id"
+        )
+    )
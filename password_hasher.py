@@ -0,0 +1,81 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from config_reader import get_settings
+
+T = TypeVar("T")
+
+
+class HashingOverloaded(Exception):
+    """Too many password hashes are already running or waiting."""
+
+
+class PasswordHasher:
+    """
+    Runs the slow password hashing functions in a small dedicated thread pool.
+    hashlib releases the GIL while hashing, so request threads keep serving
+    other routes, and at most `workers + max_queue` hashes are in flight:
+    beyond that HashingOverloaded is raised instead of queueing forever.
+    """
+
+    def __init__(self, method: str, workers: int, max_queue: int) -> None:
+        self.method = method
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hasher"
+        )
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._method_prefix: Optional[str] = None
+        self.rejected = 0
+
+    def run(self, fn: Callable[..., T], *args) -> T:
+        """Runs fn(*args) in the pool and waits for the result."""
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashingOverloaded()
+        try:
+            future = self._executor.submit(self._run_and_release, fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        return future.result()
+
+    def _run_and_release(self, fn: Callable[..., T], *args) -> T:
+        try:
+            return fn(*args)
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        return self.run(generate_password_hash, password, self.method)
+
+    def verify(self, hashed_password: str, password: str) -> bool:
+        return self.run(check_password_hash, hashed_password, password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """True if the hash was made with other method or cost parameters."""
+        if self._method_prefix is None:
+            # "scrypt" is stored as "scrypt:32768:8:1$salt$hash", so take the
+            # full method string from a real hash once
+            self._method_prefix = self.hash("").split("$", 1)[0]
+        return hashed_password.split("$", 1)[0] != self._method_prefix
+
+
+_password_hasher: Optional[PasswordHasher] = None
+_password_hasher_lock = threading.Lock()
+
+
+def get_password_hasher() -> PasswordHasher:
+    global _password_hasher
+    if _password_hasher is None:
+        with _password_hasher_lock:
+            if _password_hasher is None:
+                env_config = get_settings()
+                _password_hasher = PasswordHasher(
+                    method=env_config.password_hash_method,
+                    workers=env_config.password_hash_workers,
+                    max_queue=env_config.password_hash_max_queue,
+                )
+    return _password_hasher
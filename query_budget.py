@@ -0,0 +1,124 @@
+"""
+Query budgets: every route declares how many SQL statements it may run with
+@query_budget(n). In debug mode a request over its budget logs a warning, in
+tests (app.testing) it raises QueryBudgetExceeded, so an extra query (an N+1
+loop, a lazy load) fails the test instead of slipping in unnoticed.
+
+Budgets are counted with a cold session cache, i.e. find_session hits the
+database. Transaction control statements (BEGIN on SQLite) are not counted.
+"""
+
+import logging
+import threading
+from typing import Callable, List, Optional, TypeVar
+
+from flask import Flask, Response, current_app, request
+from sqlalchemy import Engine, event
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable)
+
+_TRANSACTION_CONTROL = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE")
+
+
+def _is_counted(statement: str) -> bool:
+    return not statement.lstrip().upper().startswith(_TRANSACTION_CONTROL)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(queries: int) -> Callable[[F], F]:
+    """Put it under @app.route: the view may run at most `queries` statements."""
+
+    def decorator(view: F) -> F:
+        view.query_budget = queries  # type: ignore[attr-defined]
+        return view
+
+    return decorator
+
+
+class QueryCounter:
+    """
+    Counts statements the current thread runs on `engines` inside the block:
+
+        with QueryCounter(engine) as counter:
+            ...
+        assert counter.count == 2
+    """
+
+    def __init__(self, *engines: Engine) -> None:
+        self.engines = engines
+        self.count = 0
+        self.statements: List[str] = []
+        self._thread_id: Optional[int] = None
+
+    def __enter__(self) -> "QueryCounter":
+        self._thread_id = threading.get_ident()
+        for engine in self.engines:
+            event.listen(engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        for engine in self.engines:
+            event.remove(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self._thread_id and _is_counted(statement):
+            self.count += 1
+            self.statements.append(statement)
+
+
+class _RequestQueries(threading.local):
+    active = False
+    statements: List[str] = []
+
+
+class QueryBudgetGuard:
+    """Checks every request of a debug or testing app against its view's budget."""
+
+    def __init__(self) -> None:
+        self._queries = _RequestQueries()
+
+    def init_app(self, app: Flask) -> None:
+        app.before_request(self._start)
+        app.after_request(self._check)
+        app.teardown_request(self._teardown)
+
+    def instrument_engine(self, engine: Engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def uninstrument_engine(self, engine: Engine) -> None:
+        if event.contains(engine, "before_cursor_execute", self._on_execute):
+            event.remove(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self._queries.active and _is_counted(statement):
+            self._queries.statements.append(statement)
+
+    def _start(self) -> None:
+        self._queries.active = current_app.debug or current_app.testing
+        self._queries.statements = []
+
+    def _check(self, response: Response) -> Response:
+        if not self._queries.active:
+            return response
+        view = current_app.view_functions.get(request.endpoint or "")
+        budget = getattr(view, "query_budget", None)
+        statements = self._queries.statements
+        if budget is None or len(statements) <= budget:
+            return response
+
+        message = (
+            f"{request.method} {request.path} ran {len(statements)} SQL statements, "
+            f"the budget of {request.endpoint} is {budget}:\n" + "\n".join(statements)
+        )
+        if current_app.testing:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+        return response
+
+    def _teardown(self, exc: Optional[BaseException]) -> None:
+        self._queries.active = False
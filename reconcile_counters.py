@@ -0,0 +1,20 @@
+import argparse
+
+from Storage.engine import get_engine
+from Storage.task_counters import reconcile
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Recount tasks per user and fix user_task_counters that drifted"
+    )
+    parser.add_argument("--batch-size", type=int, default=1000, help="users per transaction")
+    parser.add_argument("--pause", type=float, default=0.1, help="seconds between batches")
+    args = parser.parse_args()
+
+    fixed = reconcile(get_engine(), batch_size=args.batch_size, pause=args.pause)
+    print(f"Fixed {fixed} counters")
+
+
+if __name__ == "__main__":
+    main()
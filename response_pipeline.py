@@ -0,0 +1,117 @@
+import gzip
+import time
+
+from flask import Flask, Response, request
+
+from utils import minify
+
+try:
+    import brotli
+except ImportError:  # in requirements.txt; without it only gzip is used
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    "text/html",
+    "text/css",
+    "text/plain",
+    "application/javascript",
+    "application/json",
+}
+
+
+class ResponsePipeline:
+    """
+    after_request stage that minifies HTML responses and compresses bodies of
+    at least `min_size` bytes with brotli or gzip, whichever the client
+    accepts (brotli only if the brotli package is installed).
+    Streamed responses are passed through untouched.
+    """
+
+    def __init__(
+        self,
+        minify_html: bool,
+        compress: bool,
+        min_size: int,
+        gzip_level: int,
+        brotli_quality: int,
+    ) -> None:
+        self.minify_html = minify_html
+        self.compress = compress
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+        self.responses_minified = 0
+        self.responses_compressed = 0
+        self.bytes_saved_by_minify = 0
+        self.bytes_saved_by_compression = 0
+        self.seconds_spent = 0.0
+
+    def init_app(self, app: Flask) -> None:
+        app.after_request(self.process)
+
+    def process(self, response: Response) -> Response:
+        if (
+            response.direct_passthrough
+            or response.is_streamed
+            or response.status_code in (204, 304)
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+
+        started = time.perf_counter()
+        if self.minify_html and response.mimetype == "text/html":
+            self._minify(response)
+        if self.compress and response.mimetype in COMPRESSIBLE_MIMETYPES:
+            self._compress(response)
+        self.seconds_spent += time.perf_counter() - started
+        return response
+
+    def _minify(self, response: Response) -> None:
+        html = response.get_data(as_text=True)
+        size_before = response.content_length
+        response.set_data(minify(html))
+        self.responses_minified += 1
+        self.bytes_saved_by_minify += size_before - response.content_length
+
+    def _choose_encoding(self) -> str | None:
+        accepted = request.accept_encodings
+        if brotli is not None and accepted["br"]:
+            return "br"
+        if accepted["gzip"]:
+            return "gzip"
+        return None
+
+    def _compress(self, response: Response) -> None:
+        response.vary.add("Accept-Encoding")
+        if response.content_length < self.min_size:
+            return
+        encoding = self._choose_encoding()
+        if encoding is None:
+            return
+
+        data = response.get_data()
+        if encoding == "br":
+            compressed = brotli.compress(data, quality=self.brotli_quality)
+        else:
+            compressed = gzip.compress(data, compresslevel=self.gzip_level)
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        self.responses_compressed += 1
+        self.bytes_saved_by_compression += len(data) - len(compressed)
+
+        # the compressed body is a different representation, so a strong ETag
+        # of the uncompressed body becomes weak
+        etag, is_weak = response.get_etag()
+        if etag and not is_weak:
+            response.set_etag(etag, weak=True)
+
+    def stats(self) -> dict:
+        return {
+            "responses_minified": self.responses_minified,
+            "responses_compressed": self.responses_compressed,
+            "bytes_saved_by_minify": self.bytes_saved_by_minify,
+            "bytes_saved_by_compression": self.bytes_saved_by_compression,
+            "seconds_spent": self.seconds_spent,
+        }
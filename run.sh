@@ -1,5 +1,6 @@
 #!/usr/bin/env bash
 
 source .venv/bin/activate
-flask --debug --app app run
+# for development with the reloader and debugger: flask --debug --app app run
+gunicorn -c gunicorn.conf.py "app:create_app()"
 deactivate
@@ -0,0 +1,147 @@
+"""
+Structured log of slow SQL statements, instead of logging every statement
+with echo=True.
+
+A statement is logged when it takes at least `threshold_ms`, and any other
+statement with probability `sample_rate`. Records are JSON with the statement,
+its duration, the route that ran it and the shape of the bind parameters
+(types only, never values: they contain password hashes and session ids).
+Logging goes through a QueueHandler, so the request thread only puts the
+record on a queue and a QueueListener thread does the writing.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from flask import has_request_context, request
+from sqlalchemy import Engine, event
+
+LOGGER_NAME = "task_tracker.slow_query"
+
+
+def parameter_shape(parameters: Any, executemany: bool) -> Any:
+    """Types of the bind parameters: ("int", "str") or {"login": "str"}."""
+    if executemany:
+        rows = list(parameters or [])
+        return {"rows": len(rows), "row": parameter_shape(rows[0], False) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def _current_route() -> Optional[str]:
+    if not has_request_context():
+        return None  # sweeper thread, scripts
+    rule = request.url_rule
+    return f"{request.method} {rule.rule if rule is not None else request.path}"
+
+
+class SlowQueryLogger:
+    def __init__(
+        self,
+        threshold_ms: float,
+        sample_rate: float,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.threshold = threshold_ms / 1000
+        self.sample_rate = sample_rate
+        self.logger = logger or logging.getLogger(LOGGER_NAME)
+
+    def instrument_engine(self, engine: Engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "after_cursor_execute", self._after_execute)
+
+    def uninstrument_engine(self, engine: Engine) -> None:
+        if event.contains(engine, "before_cursor_execute", self._before_execute):
+            event.remove(engine, "before_cursor_execute", self._before_execute)
+            event.remove(engine, "after_cursor_execute", self._after_execute)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("slow_query_started")
+        if not started:
+            return
+        duration = time.perf_counter() - started.pop()
+        is_slow = duration >= self.threshold
+        if not is_slow and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            return
+        record = {
+            "slow": is_slow,
+            "duration_ms": round(duration * 1000, 3),
+            "route": _current_route(),
+            "statement": " ".join(statement.split()),
+            "parameters": parameter_shape(parameters, executemany),
+        }
+        self.logger.log(
+            logging.WARNING if is_slow else logging.INFO, json.dumps(record)
+        )
+
+
+# logger name -> (its QueueHandler, the listener writing its records)
+_queue_logging: Dict[
+    str, Tuple[logging.handlers.QueueHandler, logging.handlers.QueueListener]
+] = {}
+_queue_logging_lock = threading.Lock()
+
+
+def start_queue_logging(
+    logger_name: str = LOGGER_NAME, filename: Optional[str] = None
+) -> logging.handlers.QueueListener:
+    """
+    Sends `logger_name` records through a queue to a background thread that
+    writes them to `filename` (stderr if empty). Stopped at exit.
+    Calling it again for the same logger replaces the earlier queue and
+    listener, so records are never written twice.
+    """
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler: logging.Handler = (
+        logging.FileHandler(filename) if filename else logging.StreamHandler()
+    )
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    listener = logging.handlers.QueueListener(records, handler)
+    queue_handler = logging.handlers.QueueHandler(records)
+
+    logger = logging.getLogger(logger_name)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    with _queue_logging_lock:
+        if not _queue_logging:
+            atexit.register(stop_queue_logging)
+        previous = _queue_logging.pop(logger_name, None)
+        if previous is not None:
+            _stop(logger, *previous)
+        logger.addHandler(queue_handler)
+        listener.start()
+        _queue_logging[logger_name] = (queue_handler, listener)
+    return listener
+
+
+def stop_queue_logging() -> None:
+    """Stops every listener started by start_queue_logging(), after the queued records."""
+    with _queue_logging_lock:
+        for logger_name, (queue_handler, listener) in list(_queue_logging.items()):
+            _stop(logging.getLogger(logger_name), queue_handler, listener)
+        _queue_logging.clear()
+
+
+def _stop(
+    logger: logging.Logger,
+    queue_handler: logging.handlers.QueueHandler,
+    listener: logging.handlers.QueueListener,
+) -> None:
+    logger.removeHandler(queue_handler)
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
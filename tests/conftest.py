@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import URL
+
+import migrations
+from admission import LoginAdmission
+from app import app
+from query_budget import QueryCounter
+from Storage.cookie_storage import CookieStorage
+from Storage.engine import get_engine
+from Storage.session_storage_sql_alchemy import SessionStorageSqlAlchemy
+from Storage.task_storage_sql_alchemy import TaskStorageSqlAlchemy
+from Storage.user_storage_sql_alchemy import UserStorageSqlAlchemy
+
+
+@pytest.fixture(autouse=True)
+def login_admission():
+    """Every test starts with full login rate limit buckets."""
+    previous = app.extensions["login_admission"]
+    app.extensions["login_admission"] = admission = LoginAdmission(
+        ip_per_minute=20,
+        ip_burst=20,
+        username_per_minute=5,
+        username_burst=5,
+        max_keys=1000,
+        max_concurrent=8,
+    )
+    yield admission
+    app.extensions["login_admission"] = previous
+
+
+@pytest.fixture
+def sql_app(tmp_path):
+    """
+    The app with the real SQLAlchemy storages on a fresh SQLite database,
+    for tests that count queries. Routes that exceed their @query_budget
+    raise QueryBudgetExceeded.
+    """
+    engine = get_engine(URL.create("sqlite", database=str(tmp_path / "test.db")))
+    migrations.upgrade(engine)
+
+    storages = {
+        "task_storage": TaskStorageSqlAlchemy(),
+        "user_storage": UserStorageSqlAlchemy(),
+        "session_storage": SessionStorageSqlAlchemy(),
+    }
+    for storage in storages.values():
+        storage.engine = engine
+    storages["cookie_storage"] = CookieStorage()  # other tests leave a mock here
+    previous = {name: app.config.get(name) for name in storages}
+    app.config.update(storages, TESTING=True, WTF_CSRF_ENABLED=False)
+    app.config["engine"] = engine
+
+    yield app
+
+    app.config.update(previous)
+    app.config.pop("engine")
+    engine.dispose()
+
+
+@pytest.fixture
+def count_queries(sql_app):
+    """count_queries() -> QueryCounter of the sql_app database, use it as `with`."""
+    return lambda: QueryCounter(sql_app.config["engine"])
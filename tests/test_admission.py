@@ -0,0 +1,138 @@
+import threading
+
+import pytest
+from utils import StorageMock
+
+import admission as admission_module
+from admission import LoginAdmission, LoginRejected, TokenBuckets
+import config_reader
+from app import app, collect_app_metrics, create_app
+from config_reader import Settings
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(admission_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_token_bucket_burst_and_refill(clock):
+    buckets = TokenBuckets(per_minute=6, burst=2, max_keys=10)
+
+    assert buckets.take("1.2.3.4") == 0
+    assert buckets.take("1.2.3.4") == 0
+    assert buckets.take("1.2.3.4") == pytest.approx(10.0)  # one token per 10 s
+    assert buckets.take("5.6.7.8") == 0
+
+    clock[0] += 10
+    assert buckets.take("1.2.3.4") == 0
+    assert buckets.take("1.2.3.4") > 0
+
+
+def test_token_buckets_are_bounded(clock):
+    buckets = TokenBuckets(per_minute=6, burst=1, max_keys=2)
+    buckets.take("a")
+    buckets.take("b")
+    buckets.take("a")  # "b" is now the least recently used
+    buckets.take("c")
+
+    assert len(buckets) == 2
+    assert buckets.take("a") > 0
+    assert buckets.take("b") == 0  # was dropped, starts again full
+
+
+def test_concurrent_verifications_are_limited():
+    admission = LoginAdmission(60, 10, 60, 10, max_keys=10, max_concurrent=1)
+    entered, release = threading.Event(), threading.Event()
+
+    def verify():
+        with admission.attempt("1.2.3.4", "alice"):
+            entered.set()
+            release.wait()
+
+    thread = threading.Thread(target=verify)
+    thread.start()
+    entered.wait()
+    with pytest.raises(LoginRejected) as rejected:
+        with admission.attempt("1.2.3.4", "bob"):
+            pass
+    release.set()
+    thread.join()
+
+    assert rejected.value.reason == "concurrency"
+    assert admission.rejected == {"ip": 0, "username": 0, "concurrency": 1}
+    with admission.attempt("1.2.3.4", "bob"):
+        pass
+
+
+def test_login_rejected_before_database(login_admission):
+    app.config["TESTING"] = True
+    app.config["WTF_CSRF_ENABLED"] = False
+    app.config["cookie_storage"] = StorageMock({"get_cookie_value": lambda: None})
+    app.config["session_storage"] = StorageMock({"find_session": lambda uuid: None})
+    verified = []
+    app.config["user_storage"] = StorageMock(
+        {"find_or_verify_user": lambda username, password: verified.append(username)}
+    )
+    client = app.test_client()
+
+    for _ in range(5):
+        response = client.post("/login", data={"username": "Dina", "password": "wrong"})
+        assert response.status_code == 302
+    # the username is counted case-insensitively
+    response = client.post("/login", data={"username": "DINA", "password": "wrong"})
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) == 12  # 5 attempts per minute
+    assert verified == ["Dina"] * 5
+    assert login_admission.rejected["username"] == 1
+    metrics = {name: samples for name, _, _, samples in collect_app_metrics(app)}
+    assert ((("reason", "username"),), 1) in metrics["login_rejected_total"]
+
+
+def _proxied_app(monkeypatch, trusted_proxy_hops: int):
+    monkeypatch.setattr(config_reader, "_settings", config_reader.get_settings())
+    proxied_app = create_app(
+        Settings(
+            secret_key="test",
+            storage_backend="memory",
+            session_sweeper_enabled=False,
+            slow_query_log_enabled=False,
+            trusted_proxy_hops=trusted_proxy_hops,
+        )
+    )
+    proxied_app.config["TESTING"] = True
+    proxied_app.config["WTF_CSRF_ENABLED"] = False
+    proxied_app.extensions["login_admission"] = LoginAdmission(
+        1, 1, 60, 10, max_keys=10, max_concurrent=8
+    )
+    client = proxied_app.test_client()
+
+    def login(client_ip: str) -> int:
+        return client.post(
+            "/login",
+            data={"username": "Dina", "password": "wrong"},
+            headers={"X-Forwarded-For": client_ip},
+        ).status_code
+
+    return login
+
+
+def test_login_limited_per_forwarded_client(monkeypatch):
+    login = _proxied_app(monkeypatch, trusted_proxy_hops=1)
+
+    # all requests come through the same proxy address
+    assert login("203.0.113.1") == 302
+    assert login("203.0.113.1") == 429
+    assert login("203.0.113.2") == 302
+    assert login("198.51.100.7, 203.0.113.2") == 429  # only the last hop is trusted
+
+
+def test_forwarded_for_ignored_by_default(monkeypatch):
+    assert Settings.model_fields["trusted_proxy_hops"].default == 0
+    login = _proxied_app(monkeypatch, trusted_proxy_hops=0)
+
+    # a client connecting directly can't pick its own address
+    assert login("203.0.113.1") == 302
+    assert login("203.0.113.2") == 429
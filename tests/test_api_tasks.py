@@ -0,0 +1,134 @@
+import datetime
+import pytest
+from utils import StorageMock
+from entity.session import UserSession
+from entity.task import Task
+from typing import Optional
+
+from app import app
+
+
+@pytest.fixture
+def client():
+    """A test client for the app."""
+
+    app.config["TESTING"] = True
+    app.config["WTF_CSRF_ENABLED"] = False
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def logged_in():
+    test_session_uuid = "e6bb1782-fbab-4c25-8bfd-92757bcdf1db"
+
+    def find_session_mock(session_uuid: str) -> Optional[UserSession]:
+        assert session_uuid == test_session_uuid
+        return UserSession(id=1, session_uuid=test_session_uuid, user_id=1)
+
+    app.config["session_storage"] = StorageMock({"find_session": find_session_mock})
+
+    app.config["cookie_storage"] = StorageMock(
+        {
+            "get_cookie_value": lambda: test_session_uuid,
+        }
+    )
+
+
+def test_api_unauthorized(client):
+    app.config["session_storage"] = StorageMock({"find_session": lambda uuid: None})
+    app.config["cookie_storage"] = StorageMock({"get_cookie_value": lambda: None})
+
+    response = client.get("/api/tasks")
+
+    assert response.status_code == 401
+    assert response.get_json() == {"error": "Unauthorized"}
+
+
+def test_api_get_tasks(client, logged_in):
+    created_at = datetime.datetime(2024, 12, 1, 10, 0, 0)
+
+    def iter_all_mock(user_id):
+        assert user_id == 1
+        for i in range(1, 251):
+            yield Task(
+                id=i,
+                name=f"Задача {i}",
+                user_id=1,
+                created_at=created_at,
+                updated_at=created_at,
+            )
+
+    app.config["task_storage"] = StorageMock({"iter_all": iter_all_mock})
+
+    response = client.get("/api/tasks")
+    tasks = response.get_json()["tasks"]
+
+    assert response.status_code == 200
+    assert len(tasks) == 250
+    assert tasks[0] == {
+        "id": 1,
+        "name": "Задача 1",
+        "created_at": "2024-12-01T10:00:00",
+        "updated_at": "2024-12-01T10:00:00",
+    }
+
+
+def test_api_get_tasks_empty(client, logged_in):
+    app.config["task_storage"] = StorageMock({"iter_all": lambda user_id: iter([])})
+
+    response = client.get("/api/tasks")
+
+    assert response.get_json() == {"tasks": []}
+
+
+def test_api_create_task(client, logged_in):
+    def create_mock(task: Task) -> int:
+        assert task.name == "Пилатес"
+        assert task.user_id == 1
+        return 7
+
+    app.config["task_storage"] = StorageMock({"create": create_mock})
+
+    response = client.post("/api/tasks", json={"name": "Пилатес"})
+
+    assert response.status_code == 201
+    assert response.headers.get("Location") == "/api/tasks/7"
+    assert response.get_json() == {"task": {"id": 7, "name": "Пилатес"}}
+
+    response = client.post("/api/tasks", json={"name": "x"})
+    assert response.status_code == 400
+
+
+def test_api_update_task(client, logged_in):
+    def update_name_mock(task_id: int, user_id: int, name: str) -> bool:
+        assert user_id == 1
+        assert name == "Пилатес"
+        return task_id == 1
+
+    app.config["task_storage"] = StorageMock({"update_name": update_name_mock})
+
+    response = client.put("/api/tasks/1", json={"name": "Пилатес"})
+    assert response.status_code == 200
+    assert response.get_json() == {"task": {"id": 1, "name": "Пилатес"}}
+
+    response = client.put("/api/tasks/2", json={"name": "Пилатес"})
+    assert response.status_code == 404
+
+
+def test_api_delete_task(client, logged_in):
+    deleted = []
+
+    def delete_by_id_mock(task_id: int, user_id: int) -> bool:
+        assert user_id == 1
+        deleted.append(task_id)
+        return task_id == 1
+
+    app.config["task_storage"] = StorageMock({"delete_by_id": delete_by_id_mock})
+
+    response = client.delete("/api/tasks/1")
+    assert response.status_code == 204
+    assert deleted == [1]
+
+    response = client.delete("/api/tasks/2")
+    assert response.status_code == 404
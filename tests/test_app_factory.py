@@ -0,0 +1,108 @@
+import logging
+import subprocess
+import sys
+from pathlib import Path
+
+from sqlalchemy import URL, event
+
+import config_reader
+from app import create_app
+from config_reader import Settings
+from slow_query_log import LOGGER_NAME, stop_queue_logging
+from Storage.engine import get_engine
+from Storage.memory_storage import TaskStorageMemory
+from Storage.unit_of_work import _finish_unit_of_work
+from Storage.task_storage_sql_alchemy import TaskStorageSqlAlchemy
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_import_creates_nothing():
+    code = (
+        "import app, config_reader, Storage.engine as engine;"
+        "assert config_reader._settings is None;"
+        "assert not engine._engines"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+
+
+def test_create_app(monkeypatch):
+    monkeypatch.setattr(config_reader, "_settings", config_reader.get_settings())
+    settings = Settings(
+        secret_key="other",
+        storage_backend="memory",
+        session_sweeper_enabled=False,
+        slow_query_log_enabled=False,
+    )
+
+    app = create_app(settings)
+
+    assert config_reader.get_settings() is settings
+    assert app.config["SECRET_KEY"] == "other"
+    assert isinstance(app.config["task_storage"], TaskStorageMemory)
+    assert app.test_client().get("/").status_code == 200
+
+
+def test_unit_of_work_commits_before_other_after_request_handlers(monkeypatch):
+    monkeypatch.setattr(config_reader, "_settings", config_reader.get_settings())
+    app = create_app(
+        Settings(
+            secret_key="other",
+            storage_backend="memory",
+            session_sweeper_enabled=False,
+            slow_query_log_enabled=False,
+        )
+    )
+
+    # Flask runs after_request handlers in reverse order of registration
+    assert app.after_request_funcs[None][-1] is _finish_unit_of_work
+
+
+def test_storage_engine_is_lazy(tmp_path):
+    storage = TaskStorageSqlAlchemy()
+    assert "engine" not in storage.__dict__
+
+    engine = get_engine(URL.create("sqlite", database=str(tmp_path / "test.db")))
+    storage.engine = engine
+    assert storage.engine is engine
+
+
+def test_create_app_twice_instruments_once(monkeypatch, tmp_path):
+    monkeypatch.setattr(config_reader, "_settings", config_reader.get_settings())
+    settings = Settings(
+        secret_key="other",
+        session_sweeper_enabled=False,
+        slow_query_log_enabled=True,
+        slow_query_log_file=str(tmp_path / "slow.log"),
+    )
+    engine = get_engine(URL.create("sqlite", database=str(tmp_path / "test.db")))
+
+    first = create_app(settings)
+    second = create_app(settings)
+
+    first_guard = first.extensions["query_budget_guard"]
+    second_guard = second.extensions["query_budget_guard"]
+    assert not event.contains(engine, "before_cursor_execute", first_guard._on_execute)
+    assert event.contains(engine, "before_cursor_execute", second_guard._on_execute)
+    assert len(logging.getLogger(LOGGER_NAME).handlers) == 1
+    stop_queue_logging()
+
+
+def test_reset_after_fork_drops_inherited_pool(tmp_path):
+    # in a child process: the reset replaces this process's engines lock
+    code = f"""
+from sqlalchemy import URL, text
+from Storage.engine import _reset_after_fork, get_engine
+
+engine = get_engine(URL.create("sqlite", database={str(tmp_path / "test.db")!r}))
+with engine.connect() as connection:
+    connection.execute(text("SELECT 1"))
+inherited = engine.pool
+assert inherited.checkedin() == 1
+
+_reset_after_fork()
+
+assert engine.pool is not inherited
+assert engine.pool.checkedin() == 0
+"""
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
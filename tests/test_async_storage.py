@@ -0,0 +1,165 @@
+import asyncio
+import datetime
+import inspect
+
+import pytest
+from sqlalchemy import URL, func, update
+
+import migrations
+from entity.session import UserSession
+from entity.task import Task
+from password_hasher import get_password_hasher
+from Storage.async_storage_sql_alchemy import (
+    AsyncSessionStorageSqlAlchemy,
+    AsyncTaskStorageSqlAlchemy,
+    AsyncUserStorageSqlAlchemy,
+)
+from Storage.engine import get_async_engine, get_engine
+from Storage.protocols import SessionStorage, TaskStorage, UserStorage
+from Storage.task_counters import read_counter
+from Storage.ttl_cache import TTLCache
+from Storage.unit_of_work import session_scope
+
+
+@pytest.fixture
+def engines(tmp_path):
+    """The schema on a fresh SQLite file, and an aiosqlite engine on it."""
+    path = str(tmp_path / "test.db")
+    engine = get_engine(URL.create("sqlite", database=path))
+    migrations.upgrade(engine)
+    async_engine = get_async_engine(URL.create("sqlite+aiosqlite", database=path))
+    yield engine, async_engine
+    asyncio.run(async_engine.dispose())
+
+
+def _counter(engine, user_id: int):
+    with session_scope(engine) as session:
+        counter = read_counter(session, user_id)
+        return counter.task_count, counter.version
+
+
+def test_task_changes_update_counters(engines):
+    engine, async_engine = engines
+    users = AsyncUserStorageSqlAlchemy(async_engine)
+    tasks = AsyncTaskStorageSqlAlchemy(async_engine)
+
+    async def scenario():
+        await users.create_user("alice", "hash")
+        task_id = await tasks.create(Task(name="Пилатес", user_id=1))
+        task = await tasks.read_by_id(task_id, 1)
+        task.name = "Йога"
+        await tasks.update(task)
+        await tasks.apply_batch(1, ["a", "b"], {task_id: "Бег"}, [])
+        await tasks.delete(task)
+
+    asyncio.run(scenario())
+
+    assert _counter(engine, 1) == (2, 4)
+
+
+def test_same_methods_as_the_protocols():
+    for protocol, storage_class in [
+        (TaskStorage, AsyncTaskStorageSqlAlchemy),
+        (UserStorage, AsyncUserStorageSqlAlchemy),
+        (SessionStorage, AsyncSessionStorageSqlAlchemy),
+    ]:
+        for name, method in inspect.getmembers(protocol, inspect.isfunction):
+            if name.startswith("_"):
+                continue
+            async_method = getattr(storage_class, name)
+            assert inspect.iscoroutinefunction(async_method) or (
+                inspect.isasyncgenfunction(async_method)
+            ), name
+
+
+def test_task_storage(engines):
+    _, async_engine = engines
+    users = AsyncUserStorageSqlAlchemy(async_engine)
+    storage = AsyncTaskStorageSqlAlchemy(async_engine)
+
+    async def scenario():
+        await users.create_user("alice", "hash")
+        await users.create_user("bob", "hash")
+        first_id = await storage.create(Task(name="Отдохнуть", user_id=1))
+        await storage.create(Task(name="Чужая задача", user_id=2))
+        created_ids, updated_ids, deleted_ids = await storage.apply_batch(
+            1, ["Сходить в магазин", "Погулять", "Пилатес"], {first_id: "Пилатес"}, [2]
+        )
+        assert created_ids == [3, 4, 5]
+        assert updated_ids == {first_id}
+        assert deleted_ids == set()  # task 2 belongs to user 2
+
+        assert [task.id for task in await storage.read_page(1, None, 2)] == [1, 3]
+        assert [task.id for task in await storage.read_page(1, 3, 10)] == [4, 5]
+        assert [task.id async for task in storage.iter_all(1, batch_size=2)] == [
+            1, 3, 4, 5
+        ]
+        assert await storage.read_by_id(2, 1) is None  # someone else's task
+        assert [task.id for task in await storage.search(1, "пилатес", 0, 10)] == [5, 1]
+        assert await storage.count_tasks(1) == 4
+
+        version = await storage.read_version(1)
+        assert await storage.update_name(3, 1, "Купить хлеб")
+        assert not await storage.update_name(2, 1, "Не моя")
+        assert await storage.read_version(1) != version
+        assert await storage.delete_by_id(4, 1)
+        assert not await storage.delete_by_id(4, 1)
+        assert [task.name for task in await storage.read_all(1)] == [
+            "Пилатес", "Купить хлеб", "Пилатес"
+        ]
+        assert await storage.count_tasks(1) == 3
+
+    asyncio.run(scenario())
+
+
+def test_user_storage(engines):
+    _, async_engine = engines
+    storage = AsyncUserStorageSqlAlchemy(async_engine)
+    hashed_password = get_password_hasher().hash("secret")
+
+    async def scenario():
+        await storage.create_user("alice", hashed_password)
+        assert (await storage.find_or_verify_user("alice", None)).id == 1
+        assert (await storage.find_or_verify_user("alice", "secret")).id == 1
+        assert await storage.find_or_verify_user("alice", "wrong") is None
+        assert await storage.find_or_verify_user("bob", "secret") is None
+
+        await storage.update_password(1, "other hash")
+        assert (await storage.find_or_verify_user("alice", None)).db_hashed_password == (
+            "other hash"
+        )
+
+    asyncio.run(scenario())
+
+
+def test_session_storage_expiry(engines):
+    engine, async_engine = engines
+    users = AsyncUserStorageSqlAlchemy(async_engine)
+    storage = AsyncSessionStorageSqlAlchemy(async_engine)
+    storage.ttl = datetime.timedelta(seconds=60)
+    storage.cache = TTLCache(maxsize=10, ttl=3600, negative_ttl=1, clock=lambda: 0.0)
+
+    async def create():
+        await users.create_user("alice", "hash")
+        assert await storage.create_session("old", 1) == "old"
+        await storage.create_session("new", 1)
+
+    asyncio.run(create())
+    with session_scope(engine, write=True) as session:
+        session.execute(
+            update(UserSession)
+            .where(UserSession.session_uuid == "old")
+            .values(created_at=func.datetime("now", "-120 seconds"))
+        )
+
+    async def check():
+        assert await storage.find_session("old") is None
+        assert (await storage.find_session("new")).user_id == 1
+        expires_at, _ = storage.cache._data["new"]  # cached until it expires
+        assert 55 < expires_at <= 60
+        assert await storage.delete_expired(limit=10) == 1
+        assert await storage.count_sessions() == 1
+        await storage.delete_session("new")
+        assert await storage.find_session("new") is None
+
+    asyncio.run(check())
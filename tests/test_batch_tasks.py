@@ -0,0 +1,142 @@
+import pytest
+from utils import StorageMock
+from entity.session import UserSession
+from typing import Optional
+
+from app import app
+
+
+@pytest.fixture
+def client():
+    """A test client for the app."""
+
+    app.config["TESTING"] = True
+    app.config["WTF_CSRF_ENABLED"] = False
+    with app.test_client() as client:
+        yield client
+
+
+def test_batch_tasks_unauthorized(client):
+    test_session_uuid = "e6bb1782-fbab-4c25-8bfd-92757bcdf1db"
+
+    def find_session_mock(session_uuid: str) -> Optional[UserSession]:
+        assert session_uuid == test_session_uuid
+        return None
+
+    app.config["session_storage"] = StorageMock({"find_session": find_session_mock})
+
+    app.config["cookie_storage"] = StorageMock(
+        {
+            "get_cookie_value": lambda: test_session_uuid,
+        }
+    )
+
+    response = client.post("/tasks/batch", json={"operations": []})
+
+    assert response.status_code == 401
+
+
+def test_batch_tasks_bad_request(client):
+    test_session_uuid = "e6bb1782-fbab-4c25-8bfd-92757bcdf1db"
+
+    def find_session_mock(session_uuid: str) -> Optional[UserSession]:
+        return UserSession(id=1, session_uuid=test_session_uuid, user_id=1)
+
+    app.config["session_storage"] = StorageMock({"find_session": find_session_mock})
+
+    app.config["cookie_storage"] = StorageMock(
+        {
+            "get_cookie_value": lambda: test_session_uuid,
+        }
+    )
+
+    response = client.post("/tasks/batch", json={"operations": "create"})
+
+    assert response.status_code == 400
+
+
+def test_batch_tasks_authorized(client):
+    test_session_uuid = "e6bb1782-fbab-4c25-8bfd-92757bcdf1db"
+
+    def find_session_mock(session_uuid: str) -> Optional[UserSession]:
+        assert session_uuid == test_session_uuid
+        return UserSession(id=1, session_uuid=test_session_uuid, user_id=1)
+
+    app.config["session_storage"] = StorageMock({"find_session": find_session_mock})
+
+    app.config["cookie_storage"] = StorageMock(
+        {
+            "get_cookie_value": lambda: test_session_uuid,
+        }
+    )
+
+    def apply_batch_mock(user_id, names_to_create, names_to_update, ids_to_delete):
+        assert user_id == 1
+        assert names_to_create == ["Погулять в парке", "Пилатес"]
+        assert names_to_update == {1: "Отдохнуть"}
+        assert ids_to_delete == [2, 3]
+        return [10, 11], {1}, {2}
+
+    app.config["task_storage"] = StorageMock({"apply_batch": apply_batch_mock})
+
+    response = client.post(
+        "/tasks/batch",
+        json={
+            "operations": [
+                {"op": "create", "name": "Погулять в парке"},
+                {"op": "update", "id": 1, "name": "Отдохнуть"},
+                {"op": "delete", "id": 2},
+                {"op": "create", "name": "Пилатес"},
+                {"op": "delete", "id": 3},
+                {"op": "create", "name": "x"},  # too short
+            ]
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "results": [
+            {"op": "create", "id": 10, "status": "created"},
+            {"op": "update", "id": 1, "status": "updated"},
+            {"op": "delete", "id": 2, "status": "deleted"},
+            {"op": "create", "id": 11, "status": "created"},
+            {"op": "delete", "id": 3, "status": "not_found"},
+            {"status": "invalid"},
+        ]
+    }
+
+
+def test_batch_tasks_rejects_repeated_and_out_of_range_ids(client):
+    app.config["session_storage"] = StorageMock(
+        {"find_session": lambda session_uuid: UserSession(id=1, user_id=1)}
+    )
+    app.config["cookie_storage"] = StorageMock({"get_cookie_value": lambda: "uuid"})
+
+    def apply_batch_mock(user_id, names_to_create, names_to_update, ids_to_delete):
+        assert names_to_update == {4: "Пилатес"}
+        assert ids_to_delete == []
+        return [], {4}, set()
+
+    app.config["task_storage"] = StorageMock({"apply_batch": apply_batch_mock})
+
+    response = client.post(
+        "/tasks/batch",
+        json={
+            "operations": [
+                {"op": "delete", "id": 1},
+                {"op": "update", "id": 1, "name": "Отдохнуть"},
+                {"op": "update", "id": 2, "name": "Погулять"},
+                {"op": "update", "id": 2, "name": "Погулять в парке"},
+                {"op": "delete", "id": 3},
+                {"op": "delete", "id": 3},
+                {"op": "delete", "id": 2**70},
+                {"op": "update", "id": 4, "name": "Пилатес"},
+            ]
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "results": [{"status": "invalid"}] * 7
+        + [{"op": "update", "id": 4, "status": "updated"}]
+    }
@@ -1,7 +1,6 @@
 import pytest
 from utils import minify, StorageMock
 from entity.session import UserSession
-from entity.task import Task
 from typing import Optional
 
 from app import app
@@ -35,7 +34,7 @@ def test_delete_task_unauthorized(client):
     assert response.status_code == 401
     assert (
         minify(response.get_data(as_text=True))
-        == "<!doctype html><html lang=en><title>401 Unauthorized</title><h1>Unauthorized</h1><p>The server could not verify that you are authorized to access the URL requested. You either supplied the wrong credentials (e.g. a bad password), or your browser doesn&#39;t understand how to supply the credentials required.</p>"
+        == "<!doctype html> <html lang=en> <title>401 Unauthorized</title> <h1>Unauthorized</h1> <p>The server could not verify that you are authorized to access the URL requested. You either supplied the wrong credentials (e.g. a bad password), or your browser doesn&#39;t understand how to supply the credentials required.</p>"
     )
 
 
@@ -55,22 +54,30 @@ def test_delete_task_authorized(client):
         }
     )
 
-    def read_by_id_mock(id, user_id):
+    def delete_by_id_mock(id, user_id):
         assert id == 1
         assert user_id == 1
-        return Task(id=1, name="Отдохнуть", user_id=1)
-
-    def delete_mock(task_to_delete: Task):
-        assert task_to_delete.id == 1
-        assert task_to_delete.user_id == 1
+        return True
 
     app.config["task_storage"] = StorageMock(
         {
-            "read_by_id": read_by_id_mock,
-            "delete": delete_mock,
+            "delete_by_id": delete_by_id_mock,
         }
     )
 
     response = client.get("/tasks/1/delete")  # query of HTTP request
     assert response.status_code == 302
-    assert response.headers.get("Location") == "/tasks"
\ No newline at end of file
+    assert response.headers.get("Location") == "/tasks"
+
+
+def test_delete_task_not_found(client):
+    app.config["session_storage"] = StorageMock(
+        {"find_session": lambda session_uuid: UserSession(id=1, user_id=1)}
+    )
+    app.config["cookie_storage"] = StorageMock({"get_cookie_value": lambda: "uuid"})
+    app.config["task_storage"] = StorageMock(
+        {"delete_by_id": lambda id, user_id: False}  # no rows deleted
+    )
+
+    response = client.get("/tasks/1/delete")
+    assert response.status_code == 404
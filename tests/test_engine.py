@@ -0,0 +1,49 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import exc
+
+from Storage.engine import TimedQueuePool, get_engine, pool_stats
+from Storage.task_storage_sql_alchemy import TaskStorageSqlAlchemy
+from Storage.user_storage_sql_alchemy import UserStorageSqlAlchemy
+from Storage.session_storage_sql_alchemy import SessionStorageSqlAlchemy
+
+
+def test_storages_share_one_engine() -> None:
+    engine = get_engine()
+
+    assert TaskStorageSqlAlchemy().engine is engine
+    assert UserStorageSqlAlchemy().engine is engine
+    assert SessionStorageSqlAlchemy().engine is engine
+    assert engine.echo is False
+
+
+def test_pool_stats() -> None:
+    engine = get_engine()
+    stats = pool_stats()[engine.url.render_as_string(hide_password=True)]
+
+    assert stats["size"] == 5
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 0
+
+
+def test_pool_counts_only_timeouts() -> None:
+    def connect():
+        if failing:
+            raise sqlite3.OperationalError("unable to open database file")
+        return sqlite3.connect(":memory:")
+
+    failing = False
+    pool = TimedQueuePool(connect, pool_size=1, max_overflow=0, timeout=0.01)
+    held = pool.connect()
+    with pytest.raises(exc.TimeoutError):
+        pool.connect()
+    held.close()
+    pool.dispose()  # the next checkout connects again
+
+    failing = True
+    with pytest.raises(sqlite3.OperationalError):
+        pool.connect()
+
+    assert pool.stats.timeouts == 1
+    assert pool.stats.checkouts == 1
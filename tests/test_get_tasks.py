@@ -24,7 +24,12 @@ def test_get_tasks_unauthorized(client):
         assert session_uuid == test_session_uuid
         return None
 
-    app.config["session_storage"] = StorageMock({"find_session": find_session_mock})
+    app.config["session_storage"] = StorageMock(
+        {
+            "find_session": find_session_mock,
+            "renew_session": lambda user_session, cookie_value: cookie_value,
+        }
+    )
 
     app.config["cookie_storage"] = StorageMock(
         {
@@ -53,7 +58,12 @@ def test_get_tasks_authorized(client):
         assert session_uuid == test_session_uuid
         return UserSession(id=1, session_uuid=test_session_uuid, user_id=1)
 
-    app.config["session_storage"] = StorageMock({"find_session": find_session_mock})
+    app.config["session_storage"] = StorageMock(
+        {
+            "find_session": find_session_mock,
+            "renew_session": lambda user_session, cookie_value: cookie_value,
+        }
+    )
 
     app.config["cookie_storage"] = StorageMock(
         {
@@ -61,18 +71,31 @@ def test_get_tasks_authorized(client):
         }
     )
 
-    def read_all_mock(user_id):
+    def read_page_mock(user_id, after_id, limit):
         assert user_id == 1
+        assert after_id is None
+        assert limit == 51  # page size + 1 to detect the next page
         return [
             Task(id=1, name="Отдохнуть", user_id=1),
             Task(id=2, name="Сходить в магазин", user_id=1),
         ]
 
-    app.config["task_storage"] = StorageMock({"read_all": read_all_mock})
+    app.config["task_storage"] = StorageMock(
+        {
+            "read_version": lambda user_id: "2:7",
+            "count_tasks": lambda user_id: 2,
+            "read_page": read_page_mock,
+        }
+    )
 
     response = client.get("/tasks")
 
     assert response.status_code == 200
+    # the cookie expiry slides along with the session's
+    assert response.headers["Set-Cookie"].startswith(
+        f"task_tracker_session={test_session_uuid};"
+    )
+    assert "Max-Age=3600" in response.headers["Set-Cookie"]
     assert minify(response.get_data(as_text=True)) == minify(
         """
 <!DOCTYPE html>
@@ -91,7 +114,7 @@ def test_get_tasks_authorized(client):
         <nav>
             <a href="/">Home</a>
             
-                <a href="/tasks">Tasks</a>
+                <a href="/tasks">Tasks (2)</a>
                 <a href="/logout">Logout</a>    
         </nav>
         <hr>
@@ -108,6 +131,10 @@ def test_get_tasks_authorized(client):
                             <input class="btn btn-primary" id="submit" name="submit" type="submit" value="Add Task"> 
                         </div>
                     </form>
+                    <form action="/tasks/search" method="get" class="input-group mb-3" role="search">
+                        <input type="search" name="q" class="form-control" placeholder="Search tasks" value="" maxlength="100">
+                        <button type="submit" class="btn btn-outline-secondary">Search</button>
+                    </form>
                     <ul class="list-group" id="todo-list">                        
                         <form action="/tasks/1/update" method="post">
                             <li class="list-group-item d-flex justify-content-between align-items-center">                            
@@ -179,3 +206,154 @@ def test_get_tasks_authorized(client):
 </html>
 """
     )
+
+
+def test_get_tasks_next_page(client):
+    test_session_uuid = "e6bb1782-fbab-4c25-8bfd-92757bcdf1db"
+
+    def find_session_mock(session_uuid: str) -> Optional[UserSession]:
+        return UserSession(id=1, session_uuid=test_session_uuid, user_id=1)
+
+    app.config["session_storage"] = StorageMock(
+        {
+            "find_session": find_session_mock,
+            "renew_session": lambda user_session, cookie_value: cookie_value,
+        }
+    )
+
+    app.config["cookie_storage"] = StorageMock(
+        {
+            "get_cookie_value": lambda: test_session_uuid,
+        }
+    )
+
+    def read_page_mock(user_id, after_id, limit):
+        assert user_id == 1
+        assert after_id == 5
+        assert limit == 3
+        return [
+            Task(id=6, name="Отдохнуть", user_id=1),
+            Task(id=7, name="Сходить в магазин", user_id=1),
+            Task(id=9, name="Погулять в парке", user_id=1),
+        ]
+
+    app.config["task_storage"] = StorageMock(
+        {
+            "read_version": lambda user_id: "2:7",
+            "count_tasks": lambda user_id: 2,
+            "read_page": read_page_mock,
+        }
+    )
+
+    response = client.get("/tasks?after=5&limit=2")
+    html = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert "/tasks/7/delete" in html
+    assert "/tasks/9/delete" not in html  # only used to detect the next page
+    assert '<a href="/tasks?after=7&amp;limit=2"' in html
+    assert '<a href="/tasks" class="btn btn-link">&laquo; First page</a>' in html
+
+
+def test_get_tasks_not_modified(client):
+    test_session_uuid = "e6bb1782-fbab-4c25-8bfd-92757bcdf1db"
+
+    def find_session_mock(session_uuid: str) -> Optional[UserSession]:
+        return UserSession(id=1, session_uuid=test_session_uuid, user_id=1)
+
+    app.config["session_storage"] = StorageMock(
+        {
+            "find_session": find_session_mock,
+            "renew_session": lambda user_session, cookie_value: cookie_value,
+        }
+    )
+
+    app.config["cookie_storage"] = StorageMock(
+        {
+            "get_cookie_value": lambda: test_session_uuid,
+        }
+    )
+
+    version = "2:2:2024-12-01 10:00:00"
+
+    def read_version_mock(user_id):
+        assert user_id == 1
+        return version
+
+    def read_page_mock(user_id, after_id, limit):
+        return [Task(id=1, name="Отдохнуть", user_id=1)]
+
+    app.config["task_storage"] = StorageMock(
+        {
+            "read_version": read_version_mock,
+            "count_tasks": lambda user_id: 2,
+            "read_page": read_page_mock,
+        }
+    )
+
+    response = client.get("/tasks")
+    etag = response.headers.get("ETag")
+    assert response.status_code == 200
+    assert etag
+
+    def read_page_fail(user_id, after_id, limit):
+        raise AssertionError("tasks must not be loaded for an unchanged page")
+
+    app.config["task_storage"].read_page = read_page_fail
+    response = client.get("/tasks", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.get_data() == b""
+
+    version = "3:3:2024-12-01 10:05:00"  # a task was added
+    app.config["task_storage"].read_page = read_page_mock
+    response = client.get("/tasks", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers.get("ETag") != etag
+
+
+def test_get_tasks_modified_for_another_csrf_session(client):
+    """A cached page's CSRF token is useless once the Flask session cookie is gone."""
+    app.config["WTF_CSRF_ENABLED"] = True
+    test_session_uuid = "e6bb1782-fbab-4c25-8bfd-92757bcdf1db"
+    app.config["session_storage"] = StorageMock(
+        {
+            "find_session": lambda session_uuid: UserSession(id=1, user_id=1),
+            "renew_session": lambda user_session, cookie_value: cookie_value,
+        }
+    )
+    app.config["cookie_storage"] = StorageMock({"get_cookie_value": lambda: test_session_uuid})
+    app.config["task_storage"] = StorageMock(
+        {
+            "read_version": lambda user_id: "1:1",
+            "count_tasks": lambda user_id: 1,
+            "read_page": lambda user_id, after_id, limit: [
+                Task(id=1, name="Отдохнуть", user_id=1)
+            ],
+        }
+    )
+    try:
+        etag = client.get("/tasks").headers["ETag"]
+        assert client.get("/tasks", headers={"If-None-Match": etag}).status_code == 304
+
+        client.delete_cookie("session")  # Flask's, with the CSRF token
+        response = client.get("/tasks", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert 'name="csrf_token"' in response.get_data(as_text=True)
+    finally:
+        app.config["WTF_CSRF_ENABLED"] = False
+
+
+@pytest.mark.parametrize("after", ["-1", str(2**31), str(2**70)])
+def test_get_tasks_after_out_of_range(client, after):
+    app.config["session_storage"] = StorageMock(
+        {
+            "find_session": lambda session_uuid: UserSession(id=1, user_id=1),
+            "renew_session": lambda user_session, cookie_value: cookie_value,
+        }
+    )
+    app.config["cookie_storage"] = StorageMock({"get_cookie_value": lambda: "uuid"})
+    app.config["task_storage"] = StorageMock({})
+
+    response = client.get(f"/tasks?after={after}")
+
+    assert response.status_code == 400
@@ -150,9 +150,9 @@ def test_login_success(client):
         assert session_uuid is None
         return None
 
-    def create_session_mock(session_uuid, id) -> None:
+    def create_session_mock(session_uuid, id) -> str:
         assert id == 1
-        return None
+        return session_uuid
 
     app.config["session_storage"] = StorageMock(
         {
@@ -187,4 +187,5 @@ def test_login_success(client):
     )
 
     assert response.status_code == 302
-    assert response.headers.get("Location") == "/tasks"
\ No newline at end of file
+    assert response.headers.get("Location") == "/tasks"
+    assert response.headers.get("Set-Cookie").startswith("task_tracker_session=")
\ No newline at end of file
@@ -0,0 +1,114 @@
+import datetime
+
+import pytest
+
+from app import app
+from Storage.cookie_storage import CookieStorage
+from Storage.memory_storage import (
+    SessionStorageMemory,
+    TaskStorageMemory,
+    UserStorageMemory,
+)
+from Storage.protocols import SessionStorage, TaskStorage, UserStorage
+from Storage.session_storage_sql_alchemy import SessionStorageSqlAlchemy
+from Storage.signed_session_storage import SignedSessionStorage
+from Storage.task_storage_sql_alchemy import TaskStorageSqlAlchemy
+from Storage.user_storage_sql_alchemy import UserStorageSqlAlchemy
+from entity.task import Task
+
+
+def test_storages_implement_protocols() -> None:
+    for storage in [TaskStorageSqlAlchemy(), TaskStorageMemory()]:
+        assert isinstance(storage, TaskStorage)
+    for storage in [UserStorageSqlAlchemy(), UserStorageMemory()]:
+        assert isinstance(storage, UserStorage)
+    for storage in [
+        SessionStorageSqlAlchemy(),
+        SessionStorageMemory(ttl=3600),
+        SignedSessionStorage("key", [], ttl=3600, revocation_refresh=30),
+    ]:
+        assert isinstance(storage, SessionStorage)
+
+
+def test_task_storage_memory() -> None:
+    storage = TaskStorageMemory()
+    first_id = storage.create(Task(name="Отдохнуть", user_id=1))
+    storage.create(Task(name="Чужая задача", user_id=2))
+    created_ids, updated_ids, deleted_ids = storage.apply_batch(
+        1, ["Сходить в магазин", "Погулять", "Пилатес"], {first_id: "Пилатес", 100: "Нет"}, [2]
+    )
+    assert created_ids == [3, 4, 5]
+    assert updated_ids == {first_id}
+    assert deleted_ids == set()  # task 2 belongs to user 2
+
+    assert [task.id for task in storage.read_page(1, None, 2)] == [1, 3]
+    assert [task.id for task in storage.read_page(1, 3, 10)] == [4, 5]
+    assert [task.id for task in storage.iter_all(1, batch_size=2)] == [1, 3, 4, 5]
+    assert storage.read_by_id(2, 1) is None  # someone else's task
+
+    version = storage.read_version(1)
+    task = storage.read_by_id(4, 1)
+    storage.delete(task)
+    assert storage.read_version(1) != version
+    assert [task.id for task in storage.read_all(1)] == [1, 3, 5]
+    assert storage.read_by_id(1, 1).name == "Пилатес"
+
+
+def test_session_storage_memory_expiry() -> None:
+    storage = SessionStorageMemory(ttl=3600)
+    storage.create_session("old", 1)
+    storage.create_session("new", 1)
+    storage._sessions["old"].created_at -= datetime.timedelta(hours=2)
+
+    assert storage.find_session("old") is None
+    assert storage.find_session("new").user_id == 1
+    assert storage.delete_expired(limit=10) == 1
+    assert storage.count_sessions() == 1
+
+
+def test_session_storage_memory_renewal() -> None:
+    storage = SessionStorageMemory(ttl=3600, renew_interval=300)
+    storage.create_session("old", 1)
+    storage.create_session("new", 1)
+    created_at = storage._sessions["new"].created_at
+    storage._sessions["old"].created_at -= datetime.timedelta(minutes=50)
+
+    for session_uuid in ("old", "new"):
+        user_session = storage.find_session(session_uuid)
+        assert storage.renew_session(user_session, session_uuid) == session_uuid
+
+    assert storage._sessions["new"].created_at == created_at  # renewed recently
+    assert storage._sessions["old"].created_at >= created_at
+    assert list(storage._sessions) == ["new", "old"]  # the oldest first
+
+
+@pytest.fixture
+def memory_app():
+    storage_keys = ["task_storage", "user_storage", "session_storage", "cookie_storage"]
+    saved = {key: app.config[key] for key in storage_keys}
+    app.config["TESTING"] = True
+    app.config["WTF_CSRF_ENABLED"] = False
+    app.config["task_storage"] = TaskStorageMemory()
+    app.config["user_storage"] = UserStorageMemory()
+    app.config["session_storage"] = SessionStorageMemory(ttl=3600)
+    app.config["cookie_storage"] = CookieStorage()
+    with app.test_client() as client:
+        yield client
+    app.config.update(saved)
+
+
+def test_app_with_memory_backend(memory_app) -> None:
+    client = memory_app
+    password = {"password": "12345678", "confirm": "12345678"}
+
+    response = client.post("/register", data={"username": "Dina", **password})
+    assert response.status_code == 302
+    response = client.post("/login", data={"username": "Dina", "password": "12345678"})
+    assert response.headers.get("Location") == "/tasks"
+
+    client.post("/tasks/create", data={"task_name": "Отдохнуть"})
+    client.post("/tasks/1/update", data={"task_name": "Пилатес"})
+    assert "Пилатес" in client.get("/tasks").get_data(as_text=True)
+
+    client.get("/tasks/1/delete")
+    assert "Пилатес" not in client.get("/tasks").get_data(as_text=True)
@@ -0,0 +1,125 @@
+import threading
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+import config_reader
+from app import app, create_app
+from metrics import Histogram, RequestMetrics
+from Storage.engine import get_engine
+from Storage.session_sweeper import SessionSweeper
+
+AUTHORIZATION = {"Authorization": "Bearer secret"}
+
+
+def test_histogram_adds_up_thread_shards() -> None:
+    histogram = Histogram([1, 5])
+
+    def observe() -> None:
+        for value in (0.5, 3, 10):
+            histogram.observe(value)
+
+    threads = [threading.Thread(target=observe) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    cumulative, count, total = histogram.snapshot()
+    assert cumulative == [4, 8, 12]
+    assert count == 12
+    assert total == 4 * 13.5
+
+
+def test_queries_and_db_time_per_request() -> None:
+    engine = create_engine("sqlite://")
+    test_app = Flask(__name__)
+    request_metrics = RequestMetrics()
+    request_metrics.init_app(test_app, token="secret")
+    request_metrics.instrument_engine(engine)
+
+    @test_app.route("/items/<int:item_id>")
+    def item(item_id: int):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT 2"))
+        return "ok"
+
+    client = test_app.test_client()
+    client.get("/items/1")
+    client.get("/items/2")
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 3"))  # outside a request, not counted
+
+    body = client.get("/metrics", headers=AUTHORIZATION).get_data(as_text=True)
+    assert (
+        'http_request_duration_seconds_count{route="/items/<int:item_id>",method="GET",status="200"} 2'
+        in body
+    )
+    assert 'http_request_sql_queries_sum{route="/items/<int:item_id>"} 4' in body
+    assert 'http_request_sql_queries_bucket{route="/items/<int:item_id>",le="1"} 0' in body
+    assert 'http_request_sql_queries_bucket{route="/items/<int:item_id>",le="2"} 2' in body
+
+
+@pytest.fixture
+def metrics_app(monkeypatch, tmp_path):
+    monkeypatch.setattr(config_reader, "_settings", config_reader.get_settings())
+    settings = config_reader.get_settings().model_copy(
+        update={
+            "metrics_token": "secret",
+            "database_backend": "sqlite",
+            "sqlite_path": str(tmp_path / "test.db"),
+            "storage_backend": "memory",
+            "session_sweeper_enabled": False,
+            "slow_query_log_enabled": False,
+        }
+    )
+    with get_engine(settings.database_url).connect() as connection:
+        connection.execute(text("SELECT 1"))
+    return create_app(settings)
+
+
+def test_metrics_endpoint(metrics_app, tmp_path) -> None:
+    client = metrics_app.test_client()
+    client.get("/")
+
+    response = client.get("/metrics", headers=AUTHORIZATION)
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    body = response.get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{route="/",method="GET",status="200"}' in body
+    assert "# TYPE response_pipeline_responses_minified_total counter" in body
+    assert "password_hash_rejected_total 0" in body
+    for name in ("checkouts", "timeouts", "wait_seconds"):
+        assert f"# TYPE db_pool_{name}_total counter" in body
+    assert "# TYPE db_pool_checked_out gauge" in body
+    # databases are labelled by role, not by host, user or path
+    assert 'db_pool_checkouts_total{database="primary"}' in body
+    assert str(tmp_path) not in body
+
+
+def test_metrics_endpoint_needs_token(metrics_app) -> None:
+    client = metrics_app.test_client()
+
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    # no token configured: no endpoint
+    assert app.test_client().get("/metrics").status_code == 404
+
+
+def test_metrics_session_sweeper(metrics_app) -> None:
+    sweeper = SessionSweeper(
+        metrics_app.config["session_storage"], interval=300, batch_size=10, pause=0
+    )
+    metrics_app.extensions["session_sweeper"] = sweeper
+    sweeper.purge_expired()
+
+    body = metrics_app.test_client().get("/metrics", headers=AUTHORIZATION).get_data(as_text=True)
+
+    assert "# TYPE session_sweeper_runs_total counter" in body
+    assert "session_sweeper_runs_total 1" in body
+    assert "# TYPE session_sweeper_rows_purged_total counter" in body
+    assert "# TYPE session_sweeper_sessions_count gauge" in body
+    assert "# TYPE session_sweeper_last_run_seconds gauge" in body
@@ -0,0 +1,106 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import Index, create_engine, inspect
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+import migrations
+from entity.base import Base
+from entity.task import Task  # noqa: F401
+from entity.user import User  # noqa: F401
+from entity.session import UserSession  # noqa: F401
+from entity.revoked_session import RevokedSession  # noqa: F401
+from entity.task_counter import UserTaskCounter  # noqa: F401
+from migrations.versions import (
+    v0002_tasks_user_id_index,
+    v0003_sessions_indexes,
+    v0005_tasks_search_indexes,
+)
+
+
+def test_upgrade_applies_all_migrations_once(tmp_path) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    versions = [version for version, _ in migrations.discover()]
+
+    assert migrations.upgrade(engine) == versions
+    assert migrations.current_version(engine) == versions[-1]
+    assert migrations.upgrade(engine) == []
+
+
+def test_upgrade_matches_models(tmp_path) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    migrations.upgrade(engine)
+    inspector = inspect(engine)
+
+    for table in Base.metadata.sorted_tables:
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        assert columns == set(table.columns.keys())
+        assert indexes == {index.name for index in table.indexes}
+
+
+class FakePostgresConnection:
+    """Records what a migration does, with the isolation level at the time."""
+
+    dialect = postgresql.dialect()
+    default_isolation_level = "READ COMMITTED"
+
+    def __init__(self) -> None:
+        self.isolation_level = self.default_isolation_level
+        self.calls = []
+
+    def commit(self) -> None:
+        self.calls.append(("commit", self.isolation_level))
+
+    def execution_options(self, isolation_level: str) -> "FakePostgresConnection":
+        self.isolation_level = isolation_level
+        return self
+
+    def execute(self, statement, parameters=None):
+        self.calls.append((str(statement), self.isolation_level))
+        return SimpleNamespace(scalar=lambda: None)  # no invalid index left
+
+
+@pytest.mark.parametrize(
+    "migration, statements",
+    [
+        (
+            v0002_tasks_user_id_index,
+            ["CREATE INDEX CONCURRENTLY ix_tasks_user_id_id ON tasks (user_id, id)"],
+        ),
+        (
+            v0003_sessions_indexes,
+            [
+                "CREATE INDEX CONCURRENTLY ix_sessions_user_id ON sessions (user_id)",
+                "CREATE INDEX CONCURRENTLY ix_sessions_created_at ON sessions (created_at)",
+            ],
+        ),
+        (
+            v0005_tasks_search_indexes,
+            [
+                "CREATE INDEX CONCURRENTLY ix_tasks_name_trgm ON tasks "
+                "USING gin (name gin_trgm_ops)",
+                "CREATE INDEX CONCURRENTLY ix_tasks_name_tsvector ON tasks "
+                "USING gin (to_tsvector('simple'::regconfig, name))",
+            ],
+        ),
+    ],
+)
+def test_indexes_are_built_concurrently(monkeypatch, migration, statements) -> None:
+    connection = FakePostgresConnection()
+
+    def create(index, bind, checkfirst):
+        ddl = str(CreateIndex(index).compile(dialect=bind.dialect))
+        bind.calls.append((ddl, bind.isolation_level))
+
+    monkeypatch.setattr(Index, "create", create)
+    migration.upgrade(connection)
+
+    created = [call for call in connection.calls if call[0].startswith("CREATE INDEX")]
+    assert created == [(statement, "AUTOCOMMIT") for statement in statements]
+    # what the migration did before is committed first
+    assert connection.calls.index(("commit", "READ COMMITTED")) < connection.calls.index(
+        created[0]
+    )
+    assert connection.isolation_level == "READ COMMITTED"  # for the rest of the migration
@@ -0,0 +1,43 @@
+import threading
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from password_hasher import HashingOverloaded, PasswordHasher
+
+
+def test_hash_and_verify() -> None:
+    hasher = PasswordHasher("pbkdf2:sha256:1000", workers=1, max_queue=1)
+    hashed_password = hasher.hash("12345678")
+
+    assert hasher.verify(hashed_password, "12345678")
+    assert not hasher.verify(hashed_password, "87654321")
+
+
+def test_needs_rehash() -> None:
+    hasher = PasswordHasher("pbkdf2:sha256:1000", workers=1, max_queue=1)
+
+    assert not hasher.needs_rehash(hasher.hash("12345678"))
+    assert hasher.needs_rehash(generate_password_hash("12345678", "pbkdf2:sha256:2000"))
+
+
+def test_rejects_when_queue_is_full() -> None:
+    hasher = PasswordHasher("pbkdf2:sha256:1000", workers=1, max_queue=0)
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_hash() -> None:
+        started.set()
+        release.wait()
+
+    thread = threading.Thread(target=hasher.run, args=(slow_hash,))
+    thread.start()
+    started.wait()
+
+    with pytest.raises(HashingOverloaded):
+        hasher.verify("pbkdf2:sha256:1000$salt$hash", "12345678")
+    assert hasher.rejected == 1
+
+    release.set()
+    thread.join()
+    assert hasher.hash("12345678")  # the slot is free again
@@ -0,0 +1,79 @@
+import logging
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from query_budget import QueryBudgetExceeded, QueryBudgetGuard, query_budget
+
+
+@pytest.fixture
+def client(sql_app):
+    client = sql_app.test_client()
+    client.post(
+        "/register",
+        data={"username": "alice", "password": "password1", "confirm": "password1"},
+    )
+    client.post("/login", data={"username": "alice", "password": "password1"})
+    client.post("/tasks/create", data={"task_name": "Task 1"})
+    client.post("/tasks/create", data={"task_name": "Task 2"})
+    return client
+
+
+@pytest.mark.parametrize(
+    "method, url, kwargs, expected_queries",
+    [
+        ("GET", "/tasks", {}, 3),
+        ("POST", "/tasks/create", {"data": {"task_name": "New task"}}, 3),
+        ("POST", "/tasks/1/update", {"data": {"task_name": "Renamed"}}, 3),
+        ("GET", "/tasks/1/delete", {}, 3),
+        ("GET", "/api/tasks/2", {}, 2),
+        ("GET", "/tasks/search?q=task", {}, 3),
+        ("GET", "/api/tasks/count", {}, 2),
+        ("POST", "/tasks/batch", {"json": {"operations": [{"op": "create", "name": "abc"}]}}, 3),
+    ],
+)
+def test_hot_routes_query_count(
+    sql_app, client, count_queries, method, url, kwargs, expected_queries
+) -> None:
+    sql_app.config["session_storage"].cache.clear()  # count the session lookup too
+
+    with count_queries() as counter:
+        response = client.open(url, method=method, **kwargs)
+
+    assert response.status_code < 400
+    # update the number in the same change if a route really needs another query
+    assert counter.count == expected_queries, counter.statements
+
+
+def _app_with_budget(testing: bool, debug: bool) -> Flask:
+    engine = create_engine("sqlite://")
+    test_app = Flask(__name__)
+    test_app.testing = testing
+    test_app.debug = debug
+    guard = QueryBudgetGuard()
+    guard.init_app(test_app)
+    guard.instrument_engine(engine)
+
+    @test_app.route("/")
+    @query_budget(1)
+    def index():
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT 2"))
+        return "ok"
+
+    return test_app
+
+
+def test_over_budget_fails_in_tests() -> None:
+    with pytest.raises(QueryBudgetExceeded):
+        _app_with_budget(testing=True, debug=False).test_client().get("/")
+
+
+def test_over_budget_warns_in_debug_mode(caplog) -> None:
+    with caplog.at_level(logging.WARNING, logger="query_budget"):
+        response = _app_with_budget(testing=False, debug=True).test_client().get("/")
+
+    assert response.status_code == 200
+    assert "ran 2 SQL statements, the budget of index is 1" in caplog.text
@@ -0,0 +1,102 @@
+import pytest
+from sqlalchemy import URL
+
+import migrations
+from entity.task import Task
+from app import COOKIE_NAME
+from password_hasher import get_password_hasher
+from Storage.engine import get_engine
+from Storage.replicas import ReplicaSet, _replica_sets, register_replicas
+from Storage.session_storage_sql_alchemy import SessionStorageSqlAlchemy
+from Storage.unit_of_work import READ_PRIMARY_COOKIE
+from Storage.user_storage_sql_alchemy import UserStorageSqlAlchemy
+
+SESSION_UUID = "e6bb1782-fbab-4c25-8bfd-92757bcdf1db"
+
+
+@pytest.fixture
+def replica(sql_app, tmp_path):
+    """A second SQLite database registered as the replica of the app's one."""
+    primary = sql_app.config["engine"]
+    replica = get_engine(URL.create("sqlite", database=str(tmp_path / "replica.db")))
+    migrations.upgrade(replica)
+    register_replicas(primary, ReplicaSet([replica], retry_interval=60, read_after_write=5))
+    yield replica
+    _replica_sets.pop(primary)
+
+
+def _login(client, sql_app, replica):
+    """The user and the session exist on both databases, as if replicated."""
+    for engine in (sql_app.config["engine"], replica):
+        user_storage, session_storage = UserStorageSqlAlchemy(), SessionStorageSqlAlchemy()
+        user_storage.engine = session_storage.engine = engine
+        user_storage.create_user("alice", "hash")
+        cookie_value = session_storage.create_session(SESSION_UUID, 1)
+    client.set_cookie(COOKIE_NAME, cookie_value)
+
+
+def test_reads_go_to_replica(sql_app, replica):
+    task_storage = sql_app.config["task_storage"]
+    sql_app.config["user_storage"].create_user("alice", "hash")
+    task_storage.create(Task(name="На основной базе", user_id=1))
+
+    # the replica is empty: it has not caught up with the primary
+    assert task_storage.read_all(1) == []
+    assert list(task_storage.iter_all(1)) == []
+
+
+def test_read_after_write_stays_on_primary(sql_app, replica):
+    task_storage = sql_app.config["task_storage"]
+    sql_app.config["user_storage"].create_user("alice", "hash")
+
+    with sql_app.test_request_context():
+        assert task_storage.read_all(1) == []  # replica
+        task_storage.create(Task(name="Пилатес", user_id=1))
+        assert [t.name for t in task_storage.read_all(1)] == ["Пилатес"]
+
+
+def test_login_reads_replica_registration_reads_primary(sql_app, replica):
+    password_hasher = get_password_hasher()
+    for engine in (sql_app.config["engine"], replica):
+        user_storage = UserStorageSqlAlchemy()
+        user_storage.engine = engine
+        user_storage.create_user("alice", password_hasher.hash(f"on {engine.url.database}"))
+
+    user_storage = sql_app.config["user_storage"]
+    with sql_app.test_request_context():
+        assert user_storage.find_or_verify_user("alice", f"on {replica.url.database}")
+    user_storage.create_user("bob", "hash")  # not replicated yet
+    assert user_storage.find_or_verify_user("bob", None) is not None
+
+
+def test_write_pins_client_to_primary(sql_app, replica):
+    client = sql_app.test_client()
+    _login(client, sql_app, replica)
+
+    response = client.post("/tasks/create", data={"task_name": "Пилатес"})
+    assert response.status_code == 302
+    assert client.get_cookie(READ_PRIMARY_COOKIE) is not None
+    assert "Пилатес" in client.get("/tasks").get_data(as_text=True)
+
+    client.delete_cookie(READ_PRIMARY_COOKIE)
+    assert "Пилатес" not in client.get("/api/tasks").get_data(as_text=True)
+
+
+def test_replica_set_round_robin_and_failover(tmp_path):
+    first, second = (
+        get_engine(URL.create("sqlite", database=str(tmp_path / f"{name}.db")))
+        for name in ("first", "second")
+    )
+    replica_set = ReplicaSet([first, second], retry_interval=60, read_after_write=5)
+
+    assert {replica_set.pick(), replica_set.pick()} == {first, second}
+
+    replica_set.mark_down(first)
+    assert [replica_set.pick() for _ in range(3)] == [second] * 3
+    assert replica_set.failovers == 1
+
+    replica_set.mark_down(second)
+    assert replica_set.pick() is None
+
+    replica_set.check_health()  # both answer SELECT 1 again
+    assert replica_set.is_healthy(first) and replica_set.is_healthy(second)
@@ -0,0 +1,69 @@
+import gzip
+
+import pytest
+from flask import Flask
+
+from response_pipeline import ResponsePipeline
+
+PAGE = "<ul>\n" + "    <li>task</li>\n" * 200 + "</ul>"
+
+
+@pytest.fixture
+def pipeline():
+    return ResponsePipeline(
+        minify_html=True, compress=True, min_size=1024, gzip_level=6, brotli_quality=5
+    )
+
+
+@pytest.fixture
+def client(pipeline):
+    app = Flask(__name__)
+    pipeline.init_app(app)
+
+    @app.route("/page")
+    def page():
+        return PAGE
+
+    @app.route("/small")
+    def small():
+        return "<p>\n  small\n</p>"
+
+    with app.test_client() as client:
+        yield client
+
+
+def test_minify_without_compression(client, pipeline):
+    response = client.get("/page")
+
+    assert response.get_data(as_text=True) == "<ul> " + "<li>task</li> " * 200 + "</ul>"
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert pipeline.bytes_saved_by_minify == len(PAGE) - len(response.get_data())
+
+
+def test_gzip(client, pipeline):
+    response = client.get("/page", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.get_data()).decode() == (
+        "<ul> " + "<li>task</li> " * 200 + "</ul>"
+    )
+    assert pipeline.responses_compressed == 1
+
+
+def test_brotli_preferred(client, pipeline):
+    brotli = pytest.importorskip("brotli")
+    response = client.get("/page", headers={"Accept-Encoding": "gzip, br"})
+
+    assert response.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(response.get_data()).decode() == (
+        "<ul> " + "<li>task</li> " * 200 + "</ul>"
+    )
+
+
+def test_small_response_is_not_compressed(client, pipeline):
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in response.headers
+    assert response.get_data(as_text=True) == "<p>\n  small\n</p>"
+    assert pipeline.responses_compressed == 0
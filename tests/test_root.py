@@ -32,7 +32,8 @@ def test_root_authorized(client):
     assert response.status_code == 200
     assert minify(response.get_data(as_text=True)) == minify(
         """
-<!DOCTYPE html><html lang="en">
+<!DOCTYPE html>
+<html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
@@ -76,7 +77,8 @@ def test_root_unauthorized(client):
     assert response.status_code == 200
     assert minify(response.get_data(as_text=True)) == minify(
         """
-<!DOCTYPE html><html lang="en">
+<!DOCTYPE html>
+<html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
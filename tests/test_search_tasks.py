@@ -0,0 +1,92 @@
+import pytest
+from utils import StorageMock
+from entity.session import UserSession
+from entity.task import Task
+
+from app import app
+from Storage.memory_storage import TaskStorageMemory
+
+
+@pytest.fixture
+def client():
+    """A test client for the app."""
+
+    app.config["TESTING"] = True
+    app.config["WTF_CSRF_ENABLED"] = False
+    app.config["session_storage"] = StorageMock(
+        {"find_session": lambda session_uuid: UserSession(id=1, user_id=1)}
+    )
+    app.config["cookie_storage"] = StorageMock({"get_cookie_value": lambda: "uuid"})
+    with app.test_client() as client:
+        yield client
+
+
+def _search_mock(user_id: int, query: str, offset: int, limit: int):
+    assert user_id == 1
+    assert query == "молоко"
+    tasks = [Task(id=i, name=f"Купить молоко {i}", user_id=1) for i in range(3, 0, -1)]
+    return tasks[offset : offset + limit]
+
+
+def test_search_tasks_page(client):
+    app.config["task_storage"] = StorageMock(
+        {"search": _search_mock, "count_tasks": lambda user_id: 3}
+    )
+
+    response = client.get("/tasks/search?q=молоко&limit=2")
+    html = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert "Купить молоко 3" in html and "Купить молоко 2" in html
+    assert "Купить молоко 1" not in html
+    assert "Tasks (3)" in html
+    assert "/tasks/search?q=%D0%BC%D0%BE%D0%BB%D0%BE%D0%BA%D0%BE&amp;offset=2&amp;limit=2" in html
+
+    response = client.get("/tasks/search?q=молоко&offset=2&limit=2")
+    html = response.get_data(as_text=True)
+    assert "Купить молоко 1" in html
+    assert "First page" in html and "Next page" not in html
+
+
+def test_search_tasks_empty_query_redirects(client):
+    response = client.get("/tasks/search?q=+")
+
+    assert response.status_code == 302
+    assert response.headers.get("Location") == "/tasks"
+
+
+def test_api_search_tasks(client):
+    app.config["task_storage"] = StorageMock({"search": _search_mock})
+
+    response = client.get("/api/tasks/search?q=молоко&limit=2")
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [task["id"] for task in body["tasks"]] == [3, 2]
+    assert body["next_offset"] == 2
+
+    assert client.get("/api/tasks/search?q=").status_code == 400
+
+
+def test_search_storages(sql_app):
+    sql_app.config["user_storage"].create_user("alice", "hash")
+    sql_app.config["user_storage"].create_user("bob", "hash")
+    storages = [sql_app.config["task_storage"], TaskStorageMemory()]
+    for task_storage in storages:
+        for name in ["Купить молоко", "Скидка 50% на МОЛОКО", "Позвонить маме"]:
+            task_storage.create(Task(name=name, user_id=1))
+        task_storage.create(Task(name="Молоко соседа", user_id=2))
+
+        assert [t.name for t in task_storage.search(1, "молоко", 0, 10)] == [
+            "Скидка 50% на МОЛОКО",
+            "Купить молоко",
+        ]
+        assert [t.name for t in task_storage.search(1, "молоко", 1, 10)] == [
+            "Купить молоко"
+        ]
+        # LIKE wildcards in the query are matched literally
+        assert [t.name for t in task_storage.search(1, "50%", 0, 10)] == [
+            "Скидка 50% на МОЛОКО"
+        ]
+        assert task_storage.search(1, "%", 0, 10)[0].name == "Скидка 50% на МОЛОКО"
+        assert task_storage.search(1, "_", 0, 10) == []
@@ -0,0 +1,100 @@
+import datetime
+from contextlib import contextmanager
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import URL, create_engine, text
+from sqlalchemy.dialects import postgresql
+
+import Storage.session_storage_sql_alchemy as session_storage_module
+from entity.session import UserSession
+from Storage.session_storage_sql_alchemy import SessionStorageSqlAlchemy
+from Storage.ttl_cache import TTLCache
+
+
+def _storage(engine, ttl: float) -> SessionStorageSqlAlchemy:
+    storage = SessionStorageSqlAlchemy()
+    storage.engine = engine
+    storage.ttl = datetime.timedelta(seconds=ttl)
+    storage.cache = TTLCache(maxsize=10, ttl=3600, negative_ttl=1, clock=lambda: 0.0)
+    return storage
+
+
+def test_find_session_caches_until_expiry(sql_app):
+    sql_app.config["user_storage"].create_user("alice", "hash")
+    storage = _storage(sql_app.config["engine"], ttl=60)
+    storage.create_session("uuid-1", 1)
+
+    assert storage.find_session("uuid-1").user_id == 1
+    expires_at, _ = storage.cache._data["uuid-1"]
+    assert 55 < expires_at <= 60
+
+    storage.cache.clear()
+    storage.ttl = datetime.timedelta(seconds=-1)
+    assert storage.find_session("uuid-1") is None
+
+
+def test_renew_session_slides_the_expiry(sql_app, count_queries):
+    sql_app.config["user_storage"].create_user("alice", "hash")
+    storage = _storage(sql_app.config["engine"], ttl=60)
+    storage.renew_interval = 10
+    storage.create_session("uuid-1", 1)
+
+    with count_queries() as counter:
+        assert storage.renew_session(storage.find_session("uuid-1"), "uuid-1") == "uuid-1"
+    assert counter.count == 1  # a fresh session isn't written to
+
+    with sql_app.config["engine"].begin() as connection:
+        connection.execute(
+            text(
+                "UPDATE sessions SET created_at = datetime('now', '-50 seconds') "
+                "WHERE session_uuid = 'uuid-1'"
+            )
+        )
+    storage.cache.clear()
+    user_session = storage.find_session("uuid-1")
+    assert storage.renew_session(user_session, "uuid-1") == "uuid-1"
+    # renewed once, not again on the next requests
+    with count_queries() as counter:
+        storage.renew_session(storage.find_session("uuid-1"), "uuid-1")
+    assert counter.count == 0
+
+    storage.cache.clear()
+    storage.find_session("uuid-1")
+    expires_at, _ = storage.cache._data["uuid-1"]
+    assert 55 < expires_at <= 60
+
+
+def test_find_session_with_postgresql_types(monkeypatch):
+    """pg8000 returns a naive created_at, an aware now() and Decimal for EXTRACT."""
+    engine = create_engine(
+        URL.create("postgresql+pg8000", username="u", host="localhost", database="db")
+    )
+    storage = _storage(engine, ttl=1800)
+    statements = []
+
+    class FakeResult:
+        def one_or_none(self):
+            created_at = datetime.datetime(2024, 12, 1, 10, 0, 0)
+            user_session = UserSession(
+                id=1, session_uuid="uuid-1", user_id=1, created_at=created_at
+            )
+            return user_session, Decimal("1799.5")
+
+    class FakeSession:
+        def execute(self, stmt):
+            statements.append(stmt)
+            return FakeResult()
+
+    @contextmanager
+    def fake_session_scope(engine, write=False):
+        yield FakeSession()
+
+    monkeypatch.setattr(session_storage_module, "session_scope", fake_session_scope)
+
+    assert storage.find_session("uuid-1").user_id == 1
+    expires_at, _ = storage.cache._data["uuid-1"]
+    assert expires_at == pytest.approx(1799.5)
+
+    sql = str(statements[0].compile(dialect=postgresql.dialect()))
+    assert "EXTRACT(epoch FROM sessions.created_at - now())" in sql
@@ -0,0 +1,31 @@
+from Storage.session_sweeper import SessionSweeper
+
+
+class FakeSessionStorage:
+    def __init__(self, expired: int, active: int) -> None:
+        self.expired = expired
+        self.active = active
+        self.batches = []
+
+    def delete_expired(self, limit: int) -> int:
+        deleted = min(limit, self.expired)
+        self.expired -= deleted
+        self.batches.append(deleted)
+        return deleted
+
+    def count_sessions(self) -> int:
+        return self.expired + self.active
+
+
+def test_purge_expired_in_batches() -> None:
+    storage = FakeSessionStorage(expired=25, active=3)
+    sweeper = SessionSweeper(storage, interval=60, batch_size=10, pause=0)
+
+    assert sweeper.purge_expired() == 25
+    assert storage.batches == [10, 10, 5]
+    assert sweeper.rows_purged == 25
+    assert sweeper.sessions_count == 3
+
+    assert sweeper.purge_expired() == 0
+    assert sweeper.rows_purged == 25
+    assert sweeper.runs == 2
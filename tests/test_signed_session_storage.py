@@ -0,0 +1,80 @@
+import time
+
+import pytest
+from sqlalchemy import create_engine
+
+import migrations
+from Storage.signed_session_storage import SignedSessionStorage
+
+
+@pytest.fixture
+def storage(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    migrations.upgrade(engine)
+    storage = SignedSessionStorage(
+        secret_key="new key", old_keys=["old key"], ttl=3600, revocation_refresh=30
+    )
+    storage.engine = engine
+    return storage
+
+
+def test_signed_session_roundtrip(storage) -> None:
+    token = storage.create_session("e6bb1782-fbab-4c25-8bfd-92757bcdf1db", 1)
+    user_session = storage.find_session(token)
+
+    assert user_session.session_uuid == "e6bb1782-fbab-4c25-8bfd-92757bcdf1db"
+    assert user_session.user_id == 1
+
+
+def test_signed_session_rejects_bad_tokens(storage) -> None:
+    token = storage.create_session("e6bb1782-fbab-4c25-8bfd-92757bcdf1db", 1)
+    version, payload, signature = token.split(".")
+
+    assert storage.find_session(None) is None
+    assert storage.find_session("e6bb1782-fbab-4c25-8bfd-92757bcdf1db") is None
+    assert storage.find_session(f"{version}.{payload}.{signature[:-2]}AA") is None
+
+    other = SignedSessionStorage("unknown key", [], ttl=3600, revocation_refresh=30)
+    assert storage.find_session(other.create_session("x", 1)) is None
+
+
+def test_signed_session_key_rotation(storage) -> None:
+    old = SignedSessionStorage("old key", [], ttl=3600, revocation_refresh=30)
+
+    assert storage.find_session(old.create_session("x", 2)).user_id == 2
+
+
+def test_signed_session_renewal(storage) -> None:
+    token = storage.create_session("x", 1)
+    assert storage.renew_session(storage.find_session(token), token) == token
+
+    storage.ttl = 3600 + 600  # as if the token had been issued 10 minutes ago
+    user_session = storage.find_session(token)
+    renewed = storage.renew_session(user_session, token)
+    assert renewed != token
+    assert storage.find_session(renewed).session_uuid == "x"
+
+
+def test_signed_session_expired(storage) -> None:
+    storage.ttl = -1
+    token = storage.create_session("x", 1)
+
+    assert storage.find_session(token) is None
+
+
+def test_signed_session_revoked_on_logout(storage) -> None:
+    token = storage.create_session("e6bb1782-fbab-4c25-8bfd-92757bcdf1db", 1)
+    storage.delete_session("e6bb1782-fbab-4c25-8bfd-92757bcdf1db")
+
+    assert storage.find_session(token) is None
+
+    # another process learns about the logout from the database
+    other = SignedSessionStorage("new key", [], ttl=3600, revocation_refresh=30)
+    other.engine = storage.engine
+    assert other.find_session(token) is None
+    assert other.count_sessions() == 1
+
+    time.sleep(0.01)
+    storage.ttl = 0  # pretend the revocation has outlived the token
+    storage.delete_session("0c3f7d0c-0000-4000-8000-000000000000")
+    assert storage.delete_expired(limit=10) == 1
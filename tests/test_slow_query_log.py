@@ -0,0 +1,48 @@
+import json
+import logging
+
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from slow_query_log import SlowQueryLogger, parameter_shape
+
+
+def test_parameter_shape_has_no_values() -> None:
+    assert parameter_shape(("alice", 42), False) == ["str", "int"]
+    assert parameter_shape({"login": "alice"}, False) == {"login": "str"}
+    assert parameter_shape([("a", 1), ("b", 2)], True) == {"rows": 2, "row": ["str", "int"]}
+
+
+def _log_records(threshold_ms: float, sample_rate: float, caplog) -> list:
+    engine = create_engine("sqlite://")
+    logger = logging.getLogger("test_slow_query_log")
+    SlowQueryLogger(threshold_ms, sample_rate, logger).instrument_engine(engine)
+    test_app = Flask(__name__)
+
+    @test_app.route("/users/<login>")
+    def user(login: str):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT :login"), {"login": login})
+        return "ok"
+
+    with caplog.at_level(logging.INFO, logger="test_slow_query_log"):
+        test_app.test_client().get("/users/secret-login")
+    return [json.loads(record.getMessage()) for record in caplog.records]
+
+
+def test_slow_statement_is_logged(caplog) -> None:
+    records = _log_records(threshold_ms=0, sample_rate=0, caplog=caplog)
+
+    assert len(records) == 1
+    assert records[0]["slow"] is True
+    assert records[0]["route"] == "GET /users/<login>"
+    assert records[0]["statement"] == "SELECT ?"
+    assert records[0]["parameters"] == ["str"]
+    assert "secret-login" not in caplog.text
+
+
+def test_fast_statements_are_sampled(caplog) -> None:
+    assert _log_records(threshold_ms=10000, sample_rate=0, caplog=caplog) == []
+
+    records = _log_records(threshold_ms=10000, sample_rate=1, caplog=caplog)
+    assert records[0]["slow"] is False
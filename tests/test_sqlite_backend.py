@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+from sqlalchemy import URL
+
+import migrations
+from entity.task import Task
+from Storage.engine import get_engine, write_transaction
+from Storage.session_storage_sql_alchemy import SessionStorageSqlAlchemy
+from Storage.task_storage_sql_alchemy import TaskStorageSqlAlchemy
+from Storage.user_storage_sql_alchemy import UserStorageSqlAlchemy
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = get_engine(URL.create("sqlite", database=str(tmp_path / "test.db")))
+    migrations.upgrade(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_connection_pragmas(engine) -> None:
+    with engine.connect() as connection:
+        pragma = lambda name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()  # noqa: E731
+
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("foreign_keys") == 1
+        assert pragma("cache_size") < 0  # negative = size in KiB
+
+
+def test_storages_on_sqlite(engine) -> None:
+    user_storage = UserStorageSqlAlchemy()
+    task_storage = TaskStorageSqlAlchemy()
+    session_storage = SessionStorageSqlAlchemy()
+    for storage in (user_storage, task_storage, session_storage):
+        storage.engine = engine
+
+    user_storage.create_user("alice", "hash")
+    user = user_storage.find_or_verify_user("alice", None)
+    session_storage.create_session("uuid-1", user.id)
+    assert session_storage.find_session("uuid-1").user_id == user.id
+
+    task_id = task_storage.create(Task(name="Task 1", user_id=user.id))
+    created_ids, updated_ids, deleted_ids = task_storage.apply_batch(
+        user.id, ["Task 2"], {task_id: "Renamed"}, []
+    )
+    assert updated_ids == {task_id}
+    assert [task.name for task in task_storage.read_all(user.id)] == ["Renamed", "Task 2"]
+
+    assert task_storage.update_name(task_id, user.id, "Renamed again") is True
+    assert task_storage.update_name(task_id, user.id + 1, "Not mine") is False
+    assert task_storage.read_by_id(task_id, user.id).name == "Renamed again"
+    assert task_storage.delete_by_id(task_id, user.id) is True
+    assert task_storage.delete_by_id(task_id, user.id) is False
+
+    session_storage.delete_session("uuid-1")
+    assert session_storage.find_session("uuid-1") is None
+    assert session_storage.delete_expired(100) == 0
+
+
+def test_concurrent_writers_do_not_fail(engine) -> None:
+    user_storage = UserStorageSqlAlchemy()
+    task_storage = TaskStorageSqlAlchemy()
+    user_storage.engine = task_storage.engine = engine
+    user_storage.create_user("bob", "hash")
+    errors = []
+
+    def write(n: int) -> None:
+        try:
+            for i in range(20):
+                task_storage.create(Task(name=f"Task {n}-{i}", user_id=1))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(task_storage.read_all(1)) == 160
+
+
+def test_write_transaction_is_a_no_op_for_other_databases() -> None:
+    engine = get_engine()  # PostgreSQL from .env, never connected here
+
+    with write_transaction(engine):
+        with write_transaction(engine):
+            pass
@@ -0,0 +1,56 @@
+from sqlalchemy import delete, insert
+
+from entity.task import Task
+from Storage.task_counters import reconcile
+
+
+def test_counters_follow_task_changes(sql_app):
+    sql_app.config["user_storage"].create_user("alice", "hash")
+    task_storage = sql_app.config["task_storage"]
+    versions = [task_storage.read_version(1)]
+
+    task_id = task_storage.create(Task(name="Task 1", user_id=1))
+    versions.append(task_storage.read_version(1))
+    task_storage.update_name(task_id, 1, "Renamed")
+    versions.append(task_storage.read_version(1))
+    created_ids, _, _ = task_storage.apply_batch(1, ["Task 2", "Task 3"], {}, [task_id])
+    versions.append(task_storage.read_version(1))
+    task_storage.delete_by_id(created_ids[0], 1)
+    versions.append(task_storage.read_version(1))
+    task_storage.delete_by_id(created_ids[0], 1)  # nothing deleted, nothing changes
+    versions.append(task_storage.read_version(1))
+
+    assert versions == ["0:0", "1:1", "1:2", "2:3", "1:4", "1:4"]
+    assert task_storage.count_tasks(1) == 1
+    assert task_storage.count_tasks(2) == 0
+
+
+def test_reconcile_fixes_drift(sql_app):
+    engine = sql_app.config["engine"]
+    for login in ("alice", "bob", "carol"):
+        sql_app.config["user_storage"].create_user(login, "hash")
+    task_storage = sql_app.config["task_storage"]
+    task_storage.create(Task(name="Task 1", user_id=1))
+    task_storage.create(Task(name="Task 2", user_id=3))
+    # changes that bypass the storage
+    with engine.begin() as connection:
+        connection.execute(insert(Task), [{"name": f"Bulk {i}", "user_id": 2} for i in range(5)])
+        connection.execute(delete(Task).where(Task.user_id == 3))
+
+    assert reconcile(engine, batch_size=2) == 2
+    assert [task_storage.count_tasks(user_id) for user_id in (1, 2, 3)] == [1, 5, 0]
+    assert reconcile(engine, batch_size=2) == 0
+
+
+def test_tasks_page_shows_count(sql_app):
+    client = sql_app.test_client()
+    client.post(
+        "/register",
+        data={"username": "alice", "password": "password1", "confirm": "password1"},
+    )
+    client.post("/login", data={"username": "alice", "password": "password1"})
+    client.post("/tasks/create", data={"task_name": "Task 1"})
+    client.post("/api/tasks", json={"name": "Task 2"})
+
+    assert '<a href="/tasks">Tasks (2)</a>' in client.get("/tasks").get_data(as_text=True)
+    assert client.get("/api/tasks/count").get_json() == {"count": 2}
@@ -0,0 +1,52 @@
+from Storage.ttl_cache import MISSING, TTLCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_ttl_cache_hit_and_expiry() -> None:
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=30, negative_ttl=5, clock=clock)
+
+    assert cache.get("a") is MISSING
+    cache.set("a", 1)
+    cache.set("b", None)  # negative entry
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+
+    clock.now = 10  # negative TTL is over, positive is not
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+
+    clock.now = 31
+    assert cache.get("a") is MISSING
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["misses"] == 3
+    assert cache.stats()["expirations"] == 2
+
+
+def test_ttl_cache_lru_eviction() -> None:
+    cache = TTLCache(maxsize=2, ttl=30, negative_ttl=5)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "b" is now least recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_ttl_cache_invalidate() -> None:
+    cache = TTLCache(maxsize=2, ttl=30, negative_ttl=5)
+    cache.set("a", 1)
+    cache.invalidate("a")
+
+    assert cache.get("a") is MISSING
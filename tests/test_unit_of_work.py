@@ -0,0 +1,101 @@
+import pytest
+from flask import Flask
+from sqlalchemy import URL, event
+
+import migrations
+from entity.task import Task
+from Storage.engine import get_engine
+from Storage.task_storage_sql_alchemy import TaskStorageSqlAlchemy
+from Storage.unit_of_work import UnitOfWork, after_commit
+from Storage.user_storage_sql_alchemy import UserStorageSqlAlchemy
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = get_engine(URL.create("sqlite", database=str(tmp_path / "test.db")))
+    migrations.upgrade(engine)
+    user_storage = UserStorageSqlAlchemy()
+    user_storage.engine = engine
+    user_storage.create_user("alice", "hash")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def task_storage(engine):
+    task_storage = TaskStorageSqlAlchemy()
+    task_storage.engine = engine
+    return task_storage
+
+
+@pytest.fixture
+def test_app():
+    test_app = Flask(__name__)
+    UnitOfWork.init_app(test_app)
+    return test_app
+
+
+def test_commit_on_success_rollback_on_error(test_app, task_storage) -> None:
+    @test_app.route("/create/<name>/<int:status>")
+    def create(name: str, status: int):
+        task_storage.create(Task(name=name, user_id=1))
+        return "", status
+
+    client = test_app.test_client()
+    client.get("/create/kept/201")
+    client.get("/create/dropped/400")
+
+    assert [task.name for task in task_storage.read_all(1)] == ["kept"]
+
+
+def test_one_checkout_and_identity_map(test_app, engine, task_storage) -> None:
+    task_id = task_storage.create(Task(name="Task 1", user_id=1))
+    checkouts = []
+    event.listen(engine, "checkout", lambda *args: checkouts.append(1))
+
+    @test_app.route("/rename")
+    def rename():
+        task = task_storage.read_by_id(task_id, 1)
+        assert task_storage.read_by_id(task_id, 1) is task
+        task.name = "Renamed"
+        task_storage.update(task)
+        return "ok"
+
+    test_app.test_client().get("/rename")
+
+    # SQLite ends the read transaction before it starts writing, PostgreSQL
+    # would keep using the first connection
+    assert len(checkouts) <= 2
+    assert task_storage.read_by_id(task_id, 1).name == "Renamed"
+
+
+def test_after_commit_runs_after_the_request_commits(test_app, task_storage) -> None:
+    calls = []
+
+    @test_app.route("/")
+    def index():
+        task_storage.create(Task(name="Task 1", user_id=1))
+        after_commit(lambda: calls.append("committed"))
+        assert calls == []
+        return "ok"
+
+    test_app.test_client().get("/")
+    assert calls == ["committed"]
+
+    after_commit(lambda: calls.append("now"))  # outside a request
+    assert calls == ["committed", "now"]
+
+
+def test_reads_share_one_checkout(test_app, engine, task_storage) -> None:
+    checkouts = []
+    event.listen(engine, "checkout", lambda *args: checkouts.append(1))
+
+    @test_app.route("/")
+    def index():
+        task_storage.read_version(1)
+        task_storage.read_page(1, None, 10)
+        task_storage.read_by_id(1, 1)
+        return "ok"
+
+    test_app.test_client().get("/")
+    assert len(checkouts) == 1
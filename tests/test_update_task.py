@@ -1,7 +1,6 @@
 import pytest
 from utils import minify, StorageMock
 from entity.session import UserSession
-from entity.task import Task
 from typing import Optional
 
 from app import app
@@ -61,20 +60,15 @@ def test_update_task_authorized(client):
         }
     )
 
-    def read_by_id_mock(task_id: int, user_id: int) -> Task:
+    def update_name_mock(task_id: int, user_id: int, name: str) -> bool:
         assert task_id == 1
         assert user_id == 1
-        return Task(id=1, name="Отдохнуть", user_id=1)
-
-    def update_mock(task: Task):
-        assert task.id == 1
-        assert task.name == "Пилатес"
-        assert task.user_id == 1
+        assert name == "Пилатес"
+        return True
 
     app.config["task_storage"] = StorageMock(
         {
-            "read_by_id": read_by_id_mock,
-            "update": update_mock,
+            "update_name": update_name_mock,
         }
     )
 
@@ -1,13 +1,52 @@
 import re
 
+# contents of these tags are whitespace-sensitive and are left as they are
+_RAW_BLOCK_RE = re.compile(
+    r"(<(pre|textarea|script|style)\b.*?</\2\s*>)", re.IGNORECASE | re.DOTALL
+)
+# a tag (quoted attribute values may contain "<" and ">"), or whitespace
+# between two tags
+_MARKUP_RE = re.compile(r"""(<(?:"[^"]*"|'[^']*'|[^<>"'])+>)|(?<=>)\s+(?=<)""")
+_TAG_WHITESPACE_RE = re.compile(r"(\"[^\"]*\"|'[^']*')|\s+")
+_TAG_END_RE = re.compile(r"\s(/?>)$")
+_LEADING_WHITESPACE_RE = re.compile(r"^\s+")
+_TRAILING_WHITESPACE_RE = re.compile(r"\s+$")
+
+
+def _minify_tag(tag: str) -> str:
+    # collapse whitespace between attributes, keep quoted values as they are
+    tag = _TAG_WHITESPACE_RE.sub(lambda m: m.group(1) or " ", tag)
+    return _TAG_END_RE.sub(r"\1", tag)
+
+
+def _minify_markup(html: str) -> str:
+    # whitespace between tags becomes one space, not nothing: between inline
+    # elements ("<a>Home</a> <a>Tasks</a>") it is rendered
+    return _MARKUP_RE.sub(
+        lambda m: _minify_tag(m.group(1)) if m.group(1) else " ", html
+    )
+
 
 def minify(html: str) -> str:
     """
-    Remove line breaks and spaces betweeen HTML tags
-    TODO: fix test_minify_line_break and delete pytest.mark.skip
-    Example: "<tag> </tag>   " -> "<tag></tag>"
+    Collapse line breaks and spaces between HTML tags and between tag
+    attributes to one space. <pre>, <textarea>, <script> and <style> blocks
+    are kept unchanged.
+    Example: "<tag>   </tag>   " -> "<tag> </tag>"
     """
-    return re.sub(r">\s+<", "><", html).strip()
+    parts = _RAW_BLOCK_RE.split(html)
+    result = []
+    # split() returns [markup, raw block, tag name, markup, raw block, tag name, ...]
+    for i in range(0, len(parts), 3):
+        markup = _minify_markup(parts[i])
+        if i > 0:
+            markup = _LEADING_WHITESPACE_RE.sub(" ", markup)  # after a raw block
+        if i + 1 < len(parts):
+            markup = _TRAILING_WHITESPACE_RE.sub(" ", markup)  # before a raw block
+        result.append(markup)
+        if i + 1 < len(parts):
+            result.append(parts[i + 1])
+    return "".join(result).strip()
 
 
 class StorageMock: